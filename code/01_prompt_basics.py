@@ -3,12 +3,20 @@ import openai
 from dotenv import load_dotenv
 import os
 
+from llm_telemetry import track
+from rate_limiter import show_queue_position
+from prompt_registry import registry as prompt_registry
+from conversation_memory import ConversationMemory, MemoryStore, make_llm_summarizer
+
 # 환경 변수 로드
 load_dotenv()
 
 # OpenAI API 키 설정
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# LLM 호출 기록 (지연 시간, 토큰, 비용)
+llm = track(openai, page="01_prompt_basics", prompt_type="character_chat")
+
 # 페이지 설정
 st.set_page_config(
     page_title="01강: 프롬프트 기초 - 동화 캐릭터 변신 챗봇",
@@ -140,11 +148,16 @@ with col2:
         height=100
     )
     
-    # 최종 프롬프트
+    # 캐릭터 프롬프트는 캐릭터별로 한 번만 정리/해시 (내용이 같으면 매번 같은 글자 → 프롬프트 캐시)
+    character_prompt = prompt_registry.register(f"fairy_tale:{selected_tale}", base_prompt)
+    
+    # 최종 프롬프트 (추가 지시사항은 고정 프롬프트 뒤에 따로 붙여 앞부분이 바뀌지 않게 함)
+    extra_prompt = None
     if additional_instructions.strip():
-        final_prompt = base_prompt + f"\n\n**추가 지시사항:**\n{additional_instructions}"
+        extra_prompt = f"**추가 지시사항:**\n{additional_instructions}"
+        final_prompt = character_prompt.text + "\n\n" + extra_prompt
     else:
-        final_prompt = base_prompt
+        final_prompt = character_prompt.text
     
     # 프롬프트 미리보기
     with st.expander("📝 현재 프롬프트 확인", expanded=False):
@@ -154,49 +167,63 @@ with col2:
 st.markdown("---")
 st.header("💭 대화 시작하기")
 
-# 세션 상태 초기화
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# 세션 상태 초기화 - 캐릭터마다 대화를 따로 기억 (캐릭터를 바꿔도 다른 캐릭터의 대화가 섞이지 않음)
+# 최근 대화 + 이전 대화 요약만 토큰 예산 안에서 보내므로 대화가 길어져도 한 턴 비용이 거의 일정함
+if "character_memories" not in st.session_state:
+    st.session_state.character_memories = MemoryStore(
+        lambda: ConversationMemory(
+            max_tokens=1500, keep_recent=8,
+            summarize=make_llm_summarizer(llm.with_prompt_type("summary")),
+        ),
+        max_entries=len(fairy_tales), idle_seconds=30 * 60, max_history=100,
+    )
+conversation = st.session_state.character_memories.get(selected_tale)
 
 # 대화 기록 표시
-for message in st.session_state.messages:
+for message in conversation.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
 # 사용자 입력
 if prompt := st.chat_input("메시지를 입력하세요..."):
     # 사용자 메시지 추가
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    conversation.add("user", prompt)
     with st.chat_message("user"):
         st.markdown(prompt)
     
     # AI 응답 생성
     with st.chat_message("assistant"):
         with st.spinner(f"{fairy_tales[selected_tale]['character']}가 생각하고 있습니다..."):
+            queue_box = st.empty()  # 수업 중 요청이 몰리면 대기 순서 표시
             try:
                 # AI 응답 요청
-                response = openai.chat.completions.create(
+                response = llm.with_on_wait(show_queue_position(queue_box)).chat.completions.create(
                     model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": final_prompt},
-                        {"role": "user", "content": prompt}
-                    ],
+                    # 고정 캐릭터 프롬프트 → 추가 지시사항 → 대화 요약 → 최근 대화 순서
+                    # (추가 지시사항도 1500토큰 예산에 포함)
+                    messages=conversation.build(system_prompt=character_prompt.text, extra=extra_prompt),
                     temperature=temperature,
-                    max_tokens=500
+                    max_tokens=500,
+                    **character_prompt.cache_options
                 )
+                queue_box.empty()
                 
                 ai_response = response.choices[0].message.content
                 st.markdown(ai_response)
                 
                 # AI 메시지 추가
-                st.session_state.messages.append({"role": "assistant", "content": ai_response})
+                conversation.add("assistant", ai_response)
                 
             except Exception as e:
+                queue_box.empty()
                 st.error(f"AI 응답 생성 오류: {e}")
 
-# 대화 초기화 버튼
+# 대화 초기화 버튼 (지금 캐릭터와의 대화만 지움)
+if conversation.memory.summary:
+    st.caption(f"🧠 {fairy_tales[selected_tale]['character']}가 이전 대화를 요약해서 기억하고 있어요 "
+               f"(보낸 대화 약 {conversation.memory.last_tokens}토큰)")
 if st.button("🔄 대화 초기화"):
-    st.session_state.messages = []
+    st.session_state.character_memories.reset(selected_tale)
     st.rerun()
 
 # 실습 과제
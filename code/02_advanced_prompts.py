@@ -4,6 +4,12 @@ from dotenv import load_dotenv
 import os
 import json
 import pandas as pd
+import time
+
+from openai_client import get_openai_client
+from prompt_chain import PromptChain, ChainStep
+from structured_output import ConditionalRole, StudentJSONAnalysis, request_structured
+from llm_telemetry import track
 
 # 환경 변수 로드
 load_dotenv()
@@ -37,6 +43,51 @@ with st.sidebar:
     3. **프롬프트 체인**: 여러 단계를 연결한 복잡한 작업 수행하기
     """)
 
+# 프롬프트 체인 단계별 의존 관계 (인덱스): 모든 체인은 앞 단계 결과가 필요한 순차 작업
+# (예: 2단계 목표 설정 → 3단계 세부 계획). 서로 독립인 단계가 있는 체인만 같은 줄에 두면 동시에 실행됨
+CHAIN_DEPENDENCIES = [[], [0], [1], [2]]
+
+def build_chain_steps(task_type: str, chain_steps: list) -> list:
+    """작업 단계 설명으로 체인 단계(ChainStep) 목록 생성"""
+    def make_prompt(index):
+        def render(context, previous):
+            if previous:
+                previous_block = f"""
+**이전 단계 결과:**
+{json.dumps(previous, ensure_ascii=False, indent=2)}
+
+이전 단계 결과를 바탕으로"""
+            else:
+                previous_block = "\n학생 데이터를 기반으로"
+            return f"""
+{context['task_type']}의 {index + 1}번째 단계를 수행하세요.
+
+**작업 유형**: {context['task_type']}
+**{index + 1}단계**: {chain_steps[index]}
+{previous_block} 이 단계를 완료하고, 다음 단계에서 사용할 수 있도록 
+중간 결과를 정리해주세요.
+
+**응답 형식:**
+{{
+    "step": "{index + 1}단계",
+    "status": "완료",
+    "result": "{index + 1}단계 결과 요약",
+    "next_step_data": "다음 단계에서 사용할 데이터",
+    "insights": ["주요 인사이트들"]
+}}
+"""
+        return render
+
+    return [
+        ChainStep(
+            f"{index + 1}단계",
+            make_prompt(index),
+            depends_on=[f"{dep + 1}단계" for dep in CHAIN_DEPENDENCIES[index]],
+            title=chain_steps[index],
+        )
+        for index in range(len(chain_steps))
+    ]
+
 # 탭 구성
 tab1, tab2, tab3 = st.tabs(["📊 JSON 응답", "🎭 조건부 역할", "🔗 프롬프트 체인"])
 
@@ -191,155 +242,162 @@ with tab1:
 반드시 위 형식에 맞춰 JSON으로만 응답하세요.
 """
             
-            try:
-                with st.spinner("AI가 분석 중..."):
-                    response = openai.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "당신은 교육 전문가입니다. 항상 요청된 JSON 형식으로만 응답하세요."},
-                            {"role": "user", "content": json_prompt}
-                        ],
-                        temperature=0.3,
-                        max_tokens=800
-                    )
-                    
-                    ai_response = response.choices[0].message.content
-                    
-                    # JSON 파싱 시도
-                    try:
-                        parsed_response = json.loads(ai_response)
-                        st.success("✅ AI가 구조화된 응답을 생성했습니다!")
-                        st.json(parsed_response)
+                try:
+                    with st.spinner("AI가 분석 중..."):
+                        # 스트리밍 중에는 지금까지 받은 필드를 바로 보여줌
+                        partial_box = st.empty()
+                        result = request_structured(
+                            track(get_openai_client(openai.api_key), "02_advanced_prompts", "json_analysis"),
+                            [
+                                {"role": "system", "content": "당신은 교육 전문가입니다. 항상 요청된 JSON 형식으로만 응답하세요."},
+                                {"role": "user", "content": json_prompt}
+                            ],
+                            StudentJSONAnalysis,
+                            temperature=0.3,
+                            max_tokens=800,
+                            on_partial=partial_box.json,
+                        )
+                        partial_box.empty()
                         
-                        # 분석 결과 시각화
-                        if "analysis" in parsed_response:
-                            analysis = parsed_response["analysis"]
-                            
-                            # 전체 성적 수준을 상단에 강조 표시
-                            st.markdown("---")
-                            st.subheader("📊 AI 분석 결과")
-                            
-                            # 전체 성적 수준을 큰 카드로 표시
-                            overall_perf = analysis.get("overall_performance", "N/A")
-                            if "상" in overall_perf:
-                                perf_color = "🟢"
-                                perf_bg = "background-color: #d4edda; border: 1px solid #c3e6cb; border-radius: 10px; padding: 20px;"
-                            elif "중" in overall_perf:
-                                perf_color = "🟡"
-                                perf_bg = "background-color: #fff3cd; border: 1px solid #ffeaa7; border-radius: 10px; padding: 20px;"
-                            else:
-                                perf_color = "🔴"
-                                perf_bg = "background-color: #f8d7da; border: 1px solid #f5c6cb; border-radius: 10px; padding: 20px;"
-                            
-                            st.markdown(f"""
-                            <div style="{perf_bg}">
-                                <h3 style="text-align: center; margin: 0; color: #2c3e50;">
-                                    {perf_color} 전체 성적 수준: <strong>{overall_perf}</strong>
-                                </h3>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # 상세 분석을 3개 컬럼으로 나누어 표시
-                            col_analysis1, col_analysis2, col_analysis3 = st.columns(3)
+                        ai_response = result.raw
+                        
+                        # 복구/검증된 JSON 표시
+                        if result.data:
+                            parsed_response = result.data
+                            st.success("✅ AI가 구조화된 응답을 생성했습니다!")
+                            if result.notes():
+                                st.caption(result.notes())
+                            st.json(parsed_response)
                             
-                            with col_analysis1:
-                                st.markdown("""
-                                <div style="background-color: #e8f5e8; border: 1px solid #c8e6c9; border-radius: 10px; padding: 15px; text-align: center;">
-                                    <h4 style="color: #2e7d32; margin: 0 0 10px 0;">🎯 강점 과목</h4>
-                                </div>
-                                """, unsafe_allow_html=True)
+                            # 분석 결과 시각화
+                            if result.ok:
+                                analysis = parsed_response["analysis"]
                                 
-                                strengths = analysis.get("strengths", [])
-                                if strengths:
-                                    for i, strength in enumerate(strengths, 1):
-                                        st.markdown(f"""
-                                        <div style="background-color: #f1f8e9; border-left: 4px solid #4caf50; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
-                                            <strong>{i}.</strong> {strength}
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                                else:
-                                    st.info("강점 과목 정보가 없습니다.")
-                            
-                            with col_analysis2:
-                                st.markdown("""
-                                <div style="background-color: #fff3e0; border: 1px solid #ffcc02; border-radius: 10px; padding: 15px; text-align: center;">
-                                    <h4 style="color: #ef6c00; margin: 0 0 10px 0;">⚠️ 약점 과목</h4>
-                                </div>
-                                """, unsafe_allow_html=True)
+                                # 전체 성적 수준을 상단에 강조 표시
+                                st.markdown("---")
+                                st.subheader("📊 AI 분석 결과")
                                 
-                                weaknesses = analysis.get("weaknesses", [])
-                                if weaknesses:
-                                    for i, weakness in enumerate(weaknesses, 1):
-                                        st.markdown(f"""
-                                        <div style="background-color: #fff8e1; border-left: 4px solid #ff9800; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
-                                            <strong>{i}.</strong> {weakness}
-                                        </div>
-                                        """, unsafe_allow_html=True)
+                                # 전체 성적 수준을 큰 카드로 표시
+                                overall_perf = analysis.get("overall_performance", "N/A")
+                                if "상" in overall_perf:
+                                    perf_color = "🟢"
+                                    perf_bg = "background-color: #d4edda; border: 1px solid #c3e6cb; border-radius: 10px; padding: 20px;"
+                                elif "중" in overall_perf:
+                                    perf_color = "🟡"
+                                    perf_bg = "background-color: #fff3cd; border: 1px solid #ffeaa7; border-radius: 10px; padding: 20px;"
                                 else:
-                                    st.info("약점 과목 정보가 없습니다.")
-                            
-                            with col_analysis3:
-                                st.markdown("""
-                                <div style="background-color: #e3f2fd; border: 1px solid #90caf9; border-radius: 10px; padding: 15px; text-align: center;">
-                                    <h4 style="color: #1565c0; margin: 0 0 10px 0;">💡 개선 방안</h4>
+                                    perf_color = "🔴"
+                                    perf_bg = "background-color: #f8d7da; border: 1px solid #f5c6cb; border-radius: 10px; padding: 20px;"
+                                
+                                st.markdown(f"""
+                                <div style="{perf_bg}">
+                                    <h3 style="text-align: center; margin: 0; color: #2c3e50;">
+                                        {perf_color} 전체 성적 수준: <strong>{overall_perf}</strong>
+                                    </h3>
                                 </div>
                                 """, unsafe_allow_html=True)
                                 
-                                recommendations = analysis.get("recommendations", [])
-                                if recommendations:
-                                    for i, rec in enumerate(recommendations, 1):
-                                        st.markdown(f"""
-                                        <div style="background-color: #f3e5f5; border-left: 4px solid #9c27b0; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
-                                            <strong>{i}.</strong> {rec}
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                                else:
-                                    st.info("개선 방안 정보가 없습니다.")
-                            
-                            # 학습 계획 정보도 추가로 표시
-                            if "study_plan" in parsed_response:
-                                st.markdown("---")
-                                st.subheader("📚 학습 계획")
-                                
-                                study_plan = parsed_response["study_plan"]
-                                col_plan1, col_plan2 = st.columns(2)
+                                # 상세 분석을 3개 컬럼으로 나누어 표시
+                                col_analysis1, col_analysis2, col_analysis3 = st.columns(3)
                                 
-                                with col_plan1:
+                                with col_analysis1:
                                     st.markdown("""
-                                    <div style="background-color: #fce4ec; border: 1px solid #f8bbd9; border-radius: 10px; padding: 15px;">
-                                        <h5 style="color: #c2185b; margin: 0 0 10px 0;">🎯 우선 학습 과목</h5>
+                                    <div style="background-color: #e8f5e8; border: 1px solid #c8e6c9; border-radius: 10px; padding: 15px; text-align: center;">
+                                        <h4 style="color: #2e7d32; margin: 0 0 10px 0;">🎯 강점 과목</h4>
                                     </div>
                                     """, unsafe_allow_html=True)
                                     
-                                    priority_subjects = study_plan.get("priority_subjects", [])
-                                    if priority_subjects:
-                                        for subject in priority_subjects:
+                                    strengths = analysis.get("strengths", [])
+                                    if strengths:
+                                        for i, strength in enumerate(strengths, 1):
                                             st.markdown(f"""
-                                            <div style="background-color: #fdf2f8; padding: 8px 12px; margin: 5px 0; border-radius: 5px; border-left: 4px solid #ec4899;">
-                                                🎯 {subject}
+                                            <div style="background-color: #f1f8e9; border-left: 4px solid #4caf50; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
+                                                <strong>{i}.</strong> {strength}
                                             </div>
                                             """, unsafe_allow_html=True)
+                                    else:
+                                        st.info("강점 과목 정보가 없습니다.")
                                 
-                                with col_plan2:
+                                with col_analysis2:
                                     st.markdown("""
-                                    <div style="background-color: #e0f2f1; border: 1px solid #80cbc4; border-radius: 10px; padding: 15px;">
-                                        <h5 style="color: #00695c; margin: 0 0 10px 0;">⏰ 주간 학습 시간</h5>
+                                    <div style="background-color: #fff3e0; border: 1px solid #ffcc02; border-radius: 10px; padding: 15px; text-align: center;">
+                                        <h4 style="color: #ef6c00; margin: 0 0 10px 0;">⚠️ 약점 과목</h4>
                                     </div>
                                     """, unsafe_allow_html=True)
                                     
-                                    weekly_hours = study_plan.get("weekly_hours", "N/A")
-                                    st.markdown(f"""
-                                    <div style="background-color: #f0f9f8; padding: 15px; margin: 5px 0; border-radius: 5px; border-left: 4px solid #26a69a; text-align: center;">
-                                        <h4 style="margin: 0; color: #00695c;">⏰ {weekly_hours}</h4>
+                                    weaknesses = analysis.get("weaknesses", [])
+                                    if weaknesses:
+                                        for i, weakness in enumerate(weaknesses, 1):
+                                            st.markdown(f"""
+                                            <div style="background-color: #fff8e1; border-left: 4px solid #ff9800; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
+                                                <strong>{i}.</strong> {weakness}
+                                            </div>
+                                            """, unsafe_allow_html=True)
+                                    else:
+                                        st.info("약점 과목 정보가 없습니다.")
+                                
+                                with col_analysis3:
+                                    st.markdown("""
+                                    <div style="background-color: #e3f2fd; border: 1px solid #90caf9; border-radius: 10px; padding: 15px; text-align: center;">
+                                        <h4 style="color: #1565c0; margin: 0 0 10px 0;">💡 개선 방안</h4>
                                     </div>
                                     """, unsafe_allow_html=True)
-                        
-                    except json.JSONDecodeError:
-                        st.warning("⚠️ AI 응답이 JSON 형식이 아닙니다. 다시 시도해보세요.")
-                        st.code(ai_response, language="text")
-                        
-            except Exception as e:
-                st.error(f"AI 응답 생성 오류: {e}")
+                                    
+                                    recommendations = analysis.get("recommendations", [])
+                                    if recommendations:
+                                        for i, rec in enumerate(recommendations, 1):
+                                            st.markdown(f"""
+                                            <div style="background-color: #f3e5f5; border-left: 4px solid #9c27b0; padding: 8px 12px; margin: 5px 0; border-radius: 5px;">
+                                                <strong>{i}.</strong> {rec}
+                                            </div>
+                                            """, unsafe_allow_html=True)
+                                    else:
+                                        st.info("개선 방안 정보가 없습니다.")
+                                
+                                # 학습 계획 정보도 추가로 표시
+                                if "study_plan" in parsed_response:
+                                    st.markdown("---")
+                                    st.subheader("📚 학습 계획")
+                                    
+                                    study_plan = parsed_response["study_plan"]
+                                    col_plan1, col_plan2 = st.columns(2)
+                                    
+                                    with col_plan1:
+                                        st.markdown("""
+                                        <div style="background-color: #fce4ec; border: 1px solid #f8bbd9; border-radius: 10px; padding: 15px;">
+                                            <h5 style="color: #c2185b; margin: 0 0 10px 0;">🎯 우선 학습 과목</h5>
+                                        </div>
+                                        """, unsafe_allow_html=True)
+                                        
+                                        priority_subjects = study_plan.get("priority_subjects", [])
+                                        if priority_subjects:
+                                            for subject in priority_subjects:
+                                                st.markdown(f"""
+                                                <div style="background-color: #fdf2f8; padding: 8px 12px; margin: 5px 0; border-radius: 5px; border-left: 4px solid #ec4899;">
+                                                    🎯 {subject}
+                                                </div>
+                                                """, unsafe_allow_html=True)
+                                    
+                                    with col_plan2:
+                                        st.markdown("""
+                                        <div style="background-color: #e0f2f1; border: 1px solid #80cbc4; border-radius: 10px; padding: 15px;">
+                                            <h5 style="color: #00695c; margin: 0 0 10px 0;">⏰ 주간 학습 시간</h5>
+                                        </div>
+                                        """, unsafe_allow_html=True)
+                                        
+                                        weekly_hours = study_plan.get("weekly_hours", "N/A")
+                                        st.markdown(f"""
+                                        <div style="background-color: #f0f9f8; padding: 15px; margin: 5px 0; border-radius: 5px; border-left: 4px solid #26a69a; text-align: center;">
+                                            <h4 style="margin: 0; color: #00695c;">⏰ {weekly_hours}</h4>
+                                        </div>
+                                        """, unsafe_allow_html=True)
+                            
+                        else:
+                            st.warning("⚠️ AI 응답이 JSON 형식이 아닙니다. 다시 시도해보세요.")
+                            st.code(ai_response, language="text")
+                            
+                except Exception as e:
+                    st.error(f"AI 응답 생성 오류: {e}")
 
     with col2:
         st.subheader("💡 JSON 응답의 장점")
@@ -413,21 +471,27 @@ with tab2:
         if st.button("🎭 AI에게 조건부 역할 요청"):
             try:
                 with st.spinner("AI가 역할을 분석 중..."):
-                    response = openai.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
+                    partial_box = st.empty()
+                    result = request_structured(
+                        track(get_openai_client(openai.api_key), "02_advanced_prompts", "conditional_role"),
+                        [
                             {"role": "system", "content": "당신은 교육 전문가입니다. 조건에 따라 적절한 역할을 수행하고 JSON으로 응답하세요."},
                             {"role": "user", "content": conditional_prompt}
                         ],
+                        ConditionalRole,
                         temperature=0.5,
-                        max_tokens=600
+                        max_tokens=600,
+                        on_partial=partial_box.json,
                     )
+                    partial_box.empty()
                     
-                    ai_response = response.choices[0].message.content
+                    ai_response = result.raw
                     
-                    try:
-                        parsed_response = json.loads(ai_response)
+                    if result.data:
+                        parsed_response = result.data
                         st.success("✅ AI가 조건에 맞는 역할로 응답했습니다!")
+                        if result.notes():
+                            st.caption(result.notes())
                         
                         # 역할 정보 표시
                         role_info = parsed_response
@@ -455,7 +519,7 @@ with tab2:
                         st.write("**💪 격려의 말:**")
                         st.write(role_info.get('encouragement', 'N/A'))
                         
-                    except json.JSONDecodeError:
+                    else:
                         st.warning("⚠️ AI 응답이 JSON 형식이 아닙니다.")
                         st.code(ai_response, language="text")
                         
@@ -524,110 +588,52 @@ with tab3:
         for step in chain_steps:
             st.write(f"• {step}")
         
+        # 단계별 결과는 캐시되어, 같은 입력으로 다시 실행하면 바뀐 단계부터만 호출
+        client = track(get_openai_client(openai.api_key), "02_advanced_prompts", "prompt_chain") if openai.api_key else None
+        chain = PromptChain(build_chain_steps(task_type, chain_steps), client)
+        st.write("**⚡ 실행 순서:** " + " → ".join(" + ".join(level) for level in chain.levels()))
+        
         # 프롬프트 체인 실행
         if st.button("🚀 프롬프트 체인 실행"):
-            try:
-                # 1단계 실행
-                st.write("**🔄 1단계 실행 중...**")
-                step1_prompt = f"""
-{task_type}의 첫 번째 단계를 수행하세요.
-
-**작업 유형**: {task_type}
-**1단계**: {chain_steps[0]}
-
-학생 데이터를 기반으로 첫 번째 단계를 완료하고, 다음 단계로 넘어갈 수 있도록 
-중간 결과를 정리해주세요.
-
-**응답 형식:**
-{{
-    "step": "1단계",
-    "status": "완료",
-    "result": "1단계 결과 요약",
-    "next_step_data": "2단계에서 사용할 데이터",
-    "insights": ["주요 인사이트들"]
-}}
-"""
+            if client is None:
+                st.error("⚠️ OpenAI API 키가 설정되지 않았습니다.")
+            else:
+                status_boxes = {name: st.empty() for name in chain.steps}
+                for name, box in status_boxes.items():
+                    box.write(f"⏳ {name} 대기 중")
                 
-                with st.spinner("1단계 실행 중..."):
-                    response1 = openai.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "당신은 교육 전문가입니다. 단계별로 체계적으로 작업을 수행하세요."},
-                            {"role": "user", "content": step1_prompt}
-                        ],
-                        temperature=0.3,
-                        max_tokens=500
+                def show_start(name):
+                    status_boxes[name].write(f"🔄 {name} 실행 중...")
+                
+                def show_step(result):
+                    icons = {"ok": "✅", "invalid": "⚠️", "error": "❌", "skipped": "⏭️"}
+                    note = " (캐시)" if result["cached"] else ""
+                    status_boxes[result["name"]].write(
+                        f"{icons[result['status']]} {result['name']} {result['seconds']:.2f}초{note}"
                     )
-                    
-                    step1_result = response1.choices[0].message.content
-                    
-                    try:
-                        parsed_step1 = json.loads(step1_result)
-                        st.success("✅ 1단계 완료!")
-                        
-                        # 1단계 결과 표시
-                        with st.expander("📊 1단계 결과", expanded=True):
-                            st.json(parsed_step1)
-                        
-                        # 2단계 실행
-                        st.write("**🔄 2단계 실행 중...**")
-                        step2_prompt = f"""
-{task_type}의 두 번째 단계를 수행하세요.
-
-**작업 유형**: {task_type}
-**2단계**: {chain_steps[1]}
-
-**1단계 결과:**
-{json.dumps(parsed_step1, ensure_ascii=False, indent=2)}
-
-1단계 결과를 바탕으로 두 번째 단계를 수행하고, 다음 단계로 넘어갈 수 있도록 
-중간 결과를 정리해주세요.
-
-**응답 형식:**
-{{
-    "step": "2단계",
-    "status": "완료",
-    "result": "2단계 결과 요약",
-    "next_step_data": "3단계에서 사용할 데이터",
-    "insights": ["주요 인사이트들"]
-}}
-"""
-                        
-                        with st.spinner("2단계 실행 중..."):
-                            response2 = openai.chat.completions.create(
-                                model="gpt-4o-mini",
-                                messages=[
-                                    {"role": "system", "content": "당신은 교육 전문가입니다. 1단계 결과를 바탕으로 2단계를 수행하세요."},
-                                    {"role": "user", "content": step2_prompt}
-                                ],
-                                temperature=0.3,
-                                max_tokens=500
-                            )
-                            
-                            step2_result = response2.choices[0].message.content
-                            
-                            try:
-                                parsed_step2 = json.loads(step2_result)
-                                st.success("✅ 2단계 완료!")
-                                
-                                # 2단계 결과 표시
-                                with st.expander("📊 2단계 결과", expanded=True):
-                                    st.json(parsed_step2)
-                                
-                                # 최종 요약
-                                st.info("🎯 **프롬프트 체인 실행 완료!**")
-                                st.write("AI가 단계별로 체계적으로 작업을 수행했습니다.")
-                                
-                            except json.JSONDecodeError:
-                                st.warning("2단계 응답이 JSON 형식이 아닙니다.")
-                                st.code(step2_result, language="text")
-                                
-                    except json.JSONDecodeError:
-                        st.warning("1단계 응답이 JSON 형식이 아닙니다.")
-                        st.code(step1_result, language="text")
-                        
-            except Exception as e:
-                st.error(f"프롬프트 체인 실행 오류: {e}")
+                
+                started = time.perf_counter()
+                results = chain.run({"task_type": task_type}, on_start=show_start, on_step=show_step)
+                elapsed = time.perf_counter() - started
+                
+                for result in results.values():
+                    with st.expander(f"📊 {result['name']} 결과", expanded=result["status"] != "ok"):
+                        if result["output"] is not None:
+                            st.json(result["output"])
+                        elif result["raw"]:
+                            st.warning(f"{result['name']} 응답이 JSON 형식이 아닙니다.")
+                            st.code(result["raw"], language="text")
+                        else:
+                            st.error(result["error"])
+                
+                # 단계별 실행 시간
+                st.dataframe(pd.DataFrame([
+                    {"단계": r["name"], "상태": r["status"], "실행 시간(초)": r["seconds"], "캐시": r["cached"]}
+                    for r in results.values()
+                ]), hide_index=True)
+                total_step_time = sum(r["seconds"] for r in results.values())
+                st.info(f"🎯 **프롬프트 체인 실행 완료!** 전체 {elapsed:.2f}초 "
+                        f"(단계 시간 합계 {total_step_time:.2f}초)")
 
     with col2:
         st.subheader("🔗 프롬프트 체인의 장점")
@@ -3,10 +3,23 @@ import openai
 from dotenv import load_dotenv
 import os
 import json
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from datetime import datetime
+
+from openai_client import get_openai_client
+from student_repository import get_repository
+from student_data_loader import (
+    DEFAULT_PATH as STUDENT_DATA_PATH, load_student_file, load_uploaded_file, save_student_file,
+)
+from batch_analysis import (
+    ANALYSIS_TYPES, SYSTEM_PROMPT as STUDENT_SYSTEM_PROMPT, build_student_prompt,
+    iter_class_analysis, build_report, report_to_excel, report_to_json,
+    build_batch_requests, submit_batch, fetch_batch_output, parse_batch_output,
+)
+from structured_output import CLASS_ANALYSIS_SCHEMAS, STUDENT_ANALYSIS_SCHEMAS, request_structured
+from llm_telemetry import track
 
 # 환경 변수 로드
 load_dotenv()
@@ -44,15 +57,36 @@ with st.sidebar:
 def load_student_data():
     """학생 데이터 로드 (엑셀 파일 업로드 또는 기존 파일)"""
     try:
-        # 엑셀 파일이 있으면 로드
-        if os.path.exists("student_data.xlsx"):
-            df = pd.read_excel("student_data.xlsx", engine='openpyxl')
-            st.success("✅ student_data.xlsx 파일을 성공적으로 로드했습니다!")
+        # 엑셀 파일이 있으면 로드 (내용이 같으면 캐시에서 바로 읽음)
+        if os.path.exists(STUDENT_DATA_PATH):
+            df, load_stats = load_student_file(STUDENT_DATA_PATH)
+            st.success(f"✅ {os.path.basename(STUDENT_DATA_PATH)} 파일을 성공적으로 로드했습니다!")
+            show_load_time(load_stats)
             return df
     except Exception as e:
         st.warning(f"⚠️ 엑셀 파일 로드 중 오류가 발생했습니다: {e}")
         return None
 
+def show_load_time(load_stats: dict):
+    """데이터 로드 시간 표시"""
+    source_names = {"memory": "메모리 캐시", "disk": "디스크 캐시", "file": "원본 파일"}
+    st.caption(f"⏱️ {load_stats['rows']}행 로드 {load_stats['seconds'] * 1000:.0f}ms "
+               f"({source_names[load_stats['source']]})")
+
+def save_class_report(results: list, analysis_type: str):
+    """학급 분석 결과를 엑셀/JSON 보고서로 저장 (실시간 분석과 배치 결과 모두 같은 보고서)"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    st.session_state['class_report'] = {
+        "excel": report_to_excel(results),
+        "json": report_to_json(results, analysis_type),
+        "timestamp": timestamp,
+    }
+    with open(f"학급분석_{timestamp}.xlsx", "wb") as f:
+        f.write(st.session_state['class_report']["excel"])
+    with open(f"학급분석_{timestamp}.json", "w", encoding="utf-8") as f:
+        f.write(st.session_state['class_report']["json"])
+    st.success(f"💾 보고서가 학급분석_{timestamp}.xlsx / .json으로 저장되었습니다!")
+
 # 탭 구성
 tab1, tab2, tab3, tab4 = st.tabs(["📁 데이터 업로드", "📈 데이터 시각화", "🤖 AI 개인 분석", "🎯 AI 교육 전략"])
 
@@ -70,9 +104,10 @@ with tab1:
     
     if uploaded_file is not None:
         try:
-            # 엑셀 파일 읽기
-            df = pd.read_excel(uploaded_file, engine='openpyxl')
+            # 엑셀 파일 읽기 (같은 파일은 한 번만 파싱)
+            df, load_stats = load_uploaded_file(uploaded_file)
             st.success(f"✅ 파일 업로드 성공! {len(df)}명의 학생 데이터를 로드했습니다.")
+            show_load_time(load_stats)
             
             # 데이터 미리보기
             st.subheader("📋 데이터 미리보기")
@@ -91,9 +126,12 @@ with tab1:
                 for col in df.columns:
                     st.write(f"• {col}: {df.dtypes[col]}")
             
-            # 파일 저장
-            df.to_excel("student_data.xlsx", index=False, engine='openpyxl')
-            st.success("💾 데이터가 student_data.xlsx로 저장되었습니다!")
+            # 파일 저장 (이미 같은 내용으로 저장되어 있으면 다시 쓰지 않음)
+            saved_name = os.path.basename(STUDENT_DATA_PATH)
+            if save_student_file(uploaded_file.getvalue(), uploaded_file.name, df, STUDENT_DATA_PATH):
+                st.success(f"💾 데이터가 {saved_name}로 저장되었습니다!")
+            else:
+                st.info(f"💾 {saved_name}에 이미 같은 데이터가 저장되어 있습니다.")
             
             # 전역 변수로 설정
             st.session_state['student_df'] = df
@@ -257,26 +295,20 @@ if 'student_df' in st.session_state:
         with col1:
             st.subheader("🎯 학생 선택")
             
-            # 학생 선택
-            if 'name' in student_df.columns:
-                student_names = student_df['name'].tolist()
-            else:
-                student_names = [f"학생 {i+1}" for i in range(len(student_df))]
-            
+            # 학생 선택 (학번/이름 색인은 데이터마다 한 번만 만듦)
+            student_repo = get_repository(student_df)
             selected_student = st.selectbox(
                 "분석할 학생을 선택하세요:",
-                student_names
+                student_repo.ids,
+                format_func=student_repo.label
             )
             
-            if selected_student:
+            if selected_student is not None:
                 # 선택된 학생 데이터
-                if 'name' in student_df.columns:
-                    student_data = student_df[student_df['name'] == selected_student].iloc[0]
-                else:
-                    student_data = student_df.iloc[student_names.index(selected_student)]
+                student_data = student_repo.get(selected_student)
                 
                 # 학생 정보 표시
-                st.write(f"**📚 {selected_student} 학생 정보**")
+                st.write(f"**📚 {student_repo.name(selected_student)} 학생 정보**")
                 
                 # 기본 정보
                 info_cols = ['age', 'grade', 'gender']
@@ -313,120 +345,38 @@ if 'student_df' in st.session_state:
             # 분석 유형 선택
             analysis_type = st.selectbox(
                 "분석 유형을 선택하세요:",
-                ["전체 성적 분석", "학습 스타일 분석", "개선 방안 제시", "맞춤형 학습 계획"]
+                ANALYSIS_TYPES
             )
             
             if st.button("🚀 AI 분석 시작"):
                 try:
                     with st.spinner("AI가 분석 중..."):
-                        # 분석 유형에 따른 프롬프트 생성
-                        if analysis_type == "전체 성적 분석":
-                            prompt = f"""
-다음 학생의 전체적인 성적을 분석해주세요.
-
-**학생 정보:**
-{json.dumps(student_data.to_dict(), ensure_ascii=False, indent=2)}
-
-**분석 요청:**
-1. 전체적인 성적 수준 평가
-2. 강점과 약점 과목 분석
-3. 성적 패턴 및 특징
-
-**응답 형식:**
-{{
-    "overall_assessment": "전체적인 성적 수준 (상/중/하)",
-    "strengths": ["강점 과목들"],
-    "weaknesses": ["약점 과목들"],
-    "patterns": ["성적 패턴 및 특징"],
-    "summary": "전체적인 평가 요약"
-}}
-
-반드시 JSON 형식으로만 응답하세요.
-"""
-                        elif analysis_type == "학습 스타일 분석":
-                            prompt = f"""
-다음 학생의 학습 스타일과 성격을 분석해주세요.
-
-**학생 정보:**
-{json.dumps(student_data.to_dict(), ensure_ascii=False, indent=2)}
-
-**분석 요청:**
-1. 학습 스타일과 성격의 연관성
-2. 현재 학습 방법의 적합성
-3. 학습 효율성 향상 방안
-
-**응답 형식:**
-{{
-    "learning_style_analysis": "학습 스타일 분석 결과",
-    "personality_insights": "성격과 학습의 연관성",
-    "current_methods": "현재 학습 방법 평가",
-    "improvement_suggestions": ["학습 효율성 향상 방안"]
-}}
-
-반드시 JSON 형식으로만 응답하세요.
-"""
-                        elif analysis_type == "개선 방안 제시":
-                            prompt = f"""
-다음 학생의 성적 개선을 위한 구체적인 방안을 제시해주세요.
-
-**학생 정보:**
-{json.dumps(student_data.to_dict(), ensure_ascii=False, indent=2)}
-
-**분석 요청:**
-1. 약점 과목별 구체적 개선 방안
-2. 학습 시간 활용 최적화
-3. 동기부여 및 관리 방안
-
-**응답 형식:**
-{{
-    "subject_improvements": {{"과목명": "개선 방안"}},
-    "time_optimization": "학습 시간 활용 방안",
-    "motivation_strategies": ["동기부여 전략"],
-    "monitoring_plan": "진행 상황 모니터링 방법"
-}}
-
-반드시 JSON 형식으로만 응답하세요.
-"""
-                        else:  # 맞춤형 학습 계획
-                            prompt = f"""
-다음 학생을 위한 맞춤형 학습 계획을 수립해주세요.
-
-**학생 정보:**
-{json.dumps(student_data.to_dict(), ensure_ascii=False, indent=2)}
-
-**분석 요청:**
-1. 개인별 맞춤 학습 전략
-2. 주간/월간 학습 계획
-3. 목표 설정 및 달성 방안
-
-**응답 형식:**
-{{
-    "personalized_strategy": "개인별 맞춤 전략",
-    "weekly_plan": "주간 학습 계획",
-    "monthly_goals": "월간 목표 설정",
-    "achievement_methods": ["목표 달성 방안"]
-}}
-
-반드시 JSON 형식으로만 응답하세요.
-"""
+                        # 분석 유형에 따른 프롬프트 생성 (batch_analysis.py의 학급 전체 분석과 같은 프롬프트)
+                        prompt = build_student_prompt(student_data.to_dict(), analysis_type)
                         
-                        # AI 분석 요청
-                        response = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "당신은 교육 전문가입니다. 학생 데이터를 분석하여 구체적이고 실용적인 조언을 제공하세요. 반드시 JSON 형식으로만 응답하세요."},
+                        # AI 분석 요청 (스트리밍 중에는 받은 필드까지 먼저 표시)
+                        partial_box = st.empty()
+                        result = request_structured(
+                            track(get_openai_client(openai.api_key), "03_education_data_ai", "student_analysis"),
+                            [
+                                {"role": "system", "content": STUDENT_SYSTEM_PROMPT},
                                 {"role": "user", "content": prompt}
                             ],
+                            STUDENT_ANALYSIS_SCHEMAS[analysis_type],
                             temperature=0.3,
-                            max_tokens=800
+                            max_tokens=800,
+                            on_partial=partial_box.json,
                         )
+                        partial_box.empty()
                         
-                        ai_response = response.choices[0].message.content
+                        ai_response = result.raw
                         
-                        # JSON 파싱 시도
-                        try:
-                            parsed_response = json.loads(ai_response)
+                        # 복구/검증된 JSON 표시
+                        if result.data:
+                            parsed_response = result.data
                             st.success("✅ AI 분석이 완료되었습니다!")
+                            if result.notes():
+                                st.caption(result.notes())
                             
                             # 분석 결과 표시
                             st.subheader("📊 AI 분석 결과")
@@ -448,33 +398,118 @@ if 'student_df' in st.session_state:
                                 else:
                                     st.write(f"**{key}:** {value}")
                             
-                        except json.JSONDecodeError:
-                            st.warning("⚠️ AI 응답이 JSON 형식이 아닙니다.")
-                            st.info("AI 응답을 JSON 형식으로 변환해보겠습니다...")
-                            
-                            # AI 응답을 JSON으로 변환 시도
-                            try:
-                                # 간단한 텍스트 정리
-                                cleaned_response = ai_response.strip()
-                                if cleaned_response.startswith('```json'):
-                                    cleaned_response = cleaned_response[7:]
-                                if cleaned_response.endswith('```'):
-                                    cleaned_response = cleaned_response[:-3]
-                                
-                                # 다시 파싱 시도
-                                parsed_response = json.loads(cleaned_response.strip())
-                                st.success("✅ JSON 형식으로 변환되었습니다!")
-                                
-                                st.subheader("📊 AI 분석 결과")
-                                st.json(parsed_response)
-                                
-                            except:
-                                st.error("JSON 변환에 실패했습니다.")
-                                st.subheader("📝 원본 AI 응답")
-                                st.code(ai_response, language="text")
+                        else:
+                            st.error("AI 응답을 JSON으로 변환하지 못했습니다.")
+                            st.subheader("📝 원본 AI 응답")
+                            st.code(ai_response, language="text")
                                 
                 except Exception as e:
                     st.error(f"AI 분석 중 오류가 발생했습니다: {e}")
+        
+        # 학급 전체 분석: 학생별 요청을 동시에 보내고 끝난 학생부터 표에 표시
+        st.markdown("---")
+        st.subheader("👥 학급 전체 AI 분석")
+        st.markdown(f"위에서 선택한 **{analysis_type}** 유형으로 {len(student_df)}명 전체를 한 번에 분석합니다.")
+        
+        batch_col1, batch_col2 = st.columns([1, 1])
+        with batch_col1:
+            max_workers = st.slider("동시 요청 수", min_value=1, max_value=10, value=5)
+        with batch_col2:
+            max_retries = st.slider("실패 시 재시도 횟수", min_value=0, max_value=5, value=3)
+        
+        run_batch = st.button("🚀 학급 전체 분석 시작")
+        if run_batch and not openai.api_key:
+            st.error("⚠️ OpenAI API 키가 설정되지 않았습니다.")
+        elif run_batch:
+            # 학생 목록은 분석을 시작할 때만 만듦 (화면을 조작할 때마다 만들지 않도록)
+            students = student_df.to_dict(orient="records")
+            client = track(get_openai_client(openai.api_key), "03_education_data_ai", "class_batch")
+            results = []
+            progress = st.progress(0.0, text="분석 준비 중...")
+            table = st.empty()
+            
+            for result in iter_class_analysis(client, students, analysis_type,
+                                              max_workers=max_workers, max_retries=max_retries):
+                results.append(result)
+                progress.progress(len(results) / len(students),
+                                  text=f"{len(results)}/{len(students)}명 완료 ({result['name']})")
+                table.dataframe(build_report(results), use_container_width=True)
+            
+            failed = [r["name"] for r in results if r["status"] != "ok"]
+            if failed:
+                st.warning(f"⚠️ {len(failed)}명 분석 실패: {', '.join(failed)}")
+            else:
+                st.success(f"✅ {len(results)}명 분석이 완료되었습니다!")
+            
+            # 보고서 파일 저장
+            save_class_report(results, analysis_type)
+        
+        # 대량 처리: OpenAI Batch API (결과는 최대 24시간 뒤, 비용 절반)
+        with st.expander("📦 대량 처리 (Batch API)"):
+            st.markdown("학생 수가 많으면 요청을 JSONL 파일 하나로 만들어 Batch API로 한꺼번에 처리할 수 있습니다.")
+            # 학생별 프롬프트 직렬화는 버튼을 눌렀을 때만 (펼치지 않아도 이 블록은 매번 실행됨)
+            if st.button("📝 배치 요청 파일 만들기"):
+                st.session_state['batch_jsonl'] = {
+                    "frame": student_df,  # 같은 데이터인지 확인용 (로더가 같은 내용이면 같은 DataFrame을 돌려줌)
+                    "analysis_type": analysis_type,
+                    "count": len(student_df),
+                    "jsonl": build_batch_requests(student_df.to_dict(orient="records"), analysis_type),
+                }
+            batch_request = st.session_state.get('batch_jsonl')
+            if batch_request and (batch_request["frame"] is not student_df
+                                  or batch_request["analysis_type"] != analysis_type):
+                st.info("학생 데이터나 분석 유형이 바뀌었습니다. 배치 요청 파일을 다시 만들어 주세요.")
+                batch_request = None
+            if batch_request:
+                st.caption(f"{batch_request['count']}명 · {batch_request['analysis_type']}")
+                st.download_button("📥 배치 요청 파일 (JSONL)", batch_request["jsonl"],
+                                   file_name="class_analysis_batch.jsonl", mime="application/jsonl")
+            if batch_request and st.button("☁️ 배치 작업 제출"):
+                try:
+                    batch = submit_batch(get_openai_client(openai.api_key), batch_request["jsonl"])
+                    st.session_state['batch_job'] = {"id": batch.id, "analysis_type": analysis_type}
+                    st.success(f"✅ 배치 작업이 제출되었습니다. (ID: {batch.id}, 상태: {batch.status})")
+                except Exception as e:
+                    st.error(f"배치 작업 제출 중 오류가 발생했습니다: {e}")
+            
+            # 배치 결과 불러오기: 작업 ID로 내려받거나 결과 JSONL 파일을 올리면 같은 보고서로 정리
+            st.markdown("**📥 배치 결과 불러오기**")
+            batch_job = st.session_state.get('batch_job', {})
+            batch_id = st.text_input("배치 작업 ID", value=batch_job.get("id", ""))
+            output_file = st.file_uploader("또는 결과 파일 (JSONL)", type=["jsonl"])
+            if st.button("📊 배치 결과로 보고서 만들기"):
+                # 제출한 작업이면 제출할 때의 분석 유형으로 검증
+                batch_type = batch_job.get("analysis_type", analysis_type) if batch_id == batch_job.get("id") else analysis_type
+                try:
+                    output_jsonl = None
+                    if output_file is not None:
+                        output_jsonl = output_file.getvalue().decode("utf-8")
+                    elif batch_id:
+                        batch, output_jsonl = fetch_batch_output(get_openai_client(openai.api_key), batch_id)
+                        if output_jsonl is None:
+                            st.info(f"⏳ 아직 결과가 없습니다. (상태: {batch.status})")
+                    else:
+                        st.warning("배치 작업 ID를 입력하거나 결과 파일을 올려 주세요.")
+                    if output_jsonl is not None:
+                        results = parse_batch_output(output_jsonl, student_df.to_dict(orient="records"), batch_type)
+                        st.dataframe(build_report(results), use_container_width=True)
+                        failed = [r["name"] for r in results if r["status"] != "ok"]
+                        if failed:
+                            st.warning(f"⚠️ {len(failed)}명 분석 실패: {', '.join(failed)}")
+                        save_class_report(results, batch_type)
+                except Exception as e:
+                    st.error(f"배치 결과를 불러오는 중 오류가 발생했습니다: {e}")
+        
+        if 'class_report' in st.session_state:
+            report = st.session_state['class_report']
+            dl_col1, dl_col2 = st.columns([1, 1])
+            with dl_col1:
+                st.download_button("📥 엑셀 보고서", report["excel"],
+                                   file_name=f"학급분석_{report['timestamp']}.xlsx")
+            with dl_col2:
+                st.download_button("📥 JSON 보고서", report["json"],
+                                   file_name=f"학급분석_{report['timestamp']}.json",
+                                   mime="application/json")
     
     # 탭 4: AI 교육 전략
     with tab4:
@@ -610,23 +645,29 @@ if 'student_df' in st.session_state:
 반드시 JSON 형식으로만 응답하세요.
 """
                         
-                        # AI 분석 요청
-                        response = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
+                        # AI 분석 요청 (스트리밍 중에는 받은 필드까지 먼저 표시)
+                        partial_box = st.empty()
+                        result = request_structured(
+                            track(get_openai_client(openai.api_key), "03_education_data_ai", "class_strategy"),
+                            [
                                 {"role": "system", "content": "당신은 교육 전문가입니다. 학급 전체를 분석하여 체계적이고 실용적인 교육 전략을 제시하세요. 반드시 JSON 형식으로만 응답하세요."},
                                 {"role": "user", "content": prompt}
                             ],
+                            CLASS_ANALYSIS_SCHEMAS[class_analysis_type],
                             temperature=0.3,
-                            max_tokens=1000
+                            max_tokens=1000,
+                            on_partial=partial_box.json,
                         )
+                        partial_box.empty()
                         
-                        ai_response = response.choices[0].message.content
+                        ai_response = result.raw
                         
-                        # JSON 파싱 시도
-                        try:
-                            parsed_response = json.loads(ai_response)
+                        # 복구/검증된 JSON 표시
+                        if result.data:
+                            parsed_response = result.data
                             st.success("✅ 학급 분석이 완료되었습니다!")
+                            if result.notes():
+                                st.caption(result.notes())
                             
                             # 분석 결과 표시
                             st.subheader("📊 학급 분석 결과")
@@ -648,30 +689,10 @@ if 'student_df' in st.session_state:
                                 else:
                                     st.write(f"**{key}:** {value}")
                             
-                        except json.JSONDecodeError:
-                            st.warning("⚠️ AI 응답이 JSON 형식이 아닙니다.")
-                            st.info("AI 응답을 JSON 형식으로 변환해보겠습니다...")
-                            
-                            # AI 응답을 JSON으로 변환 시도
-                            try:
-                                # 간단한 텍스트 정리
-                                cleaned_response = ai_response.strip()
-                                if cleaned_response.startswith('```json'):
-                                    cleaned_response = cleaned_response[7:]
-                                if cleaned_response.endswith('```'):
-                                    cleaned_response = cleaned_response[:-3]
-                                
-                                # 다시 파싱 시도
-                                parsed_response = json.loads(cleaned_response.strip())
-                                st.success("✅ JSON 형식으로 변환되었습니다!")
-                                
-                                st.subheader("📊 학급 분석 결과")
-                                st.json(parsed_response)
-                                
-                            except:
-                                st.error("JSON 변환에 실패했습니다.")
-                                st.subheader("📝 원본 AI 응답")
-                                st.code(ai_response, language="text")
+                        else:
+                            st.error("AI 응답을 JSON으로 변환하지 못했습니다.")
+                            st.subheader("📝 원본 AI 응답")
+                            st.code(ai_response, language="text")
                                 
                 except Exception as e:
                     st.error(f"학급 분석 중 오류가 발생했습니다: {e}")
@@ -5,9 +5,16 @@ import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import numpy as np
+import io
 from dotenv import load_dotenv
 import os
 
+from student_data_loader import load_student_file
+from student_repository import get_repository
+from university_matcher import (
+    UniversityMatcher, SUBJECT_COLUMNS, SUBJECT_NAMES, GRADE_LABELS, GRADE_DESCRIPTIONS,
+)
+
 # 환경 변수 로드
 load_dotenv()
 # 페이지 설정
@@ -40,8 +47,9 @@ with st.sidebar:
 @st.cache_data
 def load_data():
     try:
-        # 엑셀 파일 읽기
-        df = pd.read_excel('./code/student_data.xlsx', engine='openpyxl')
+        # 엑셀 파일 읽기 (내용 해시로 캐시된 표가 있으면 바로 사용)
+        df, load_stats = load_student_file()
+        print(f"⏱️ 로드 시간 {load_stats['seconds'] * 1000:.0f}ms ({load_stats['source']})")
         print(f"✅ 엑셀 파일 로드 성공: {len(df)}명의 학생 데이터")
         return df
     except FileNotFoundError:
@@ -143,21 +151,29 @@ university_standards = {
 # 데이터 로드
 df = load_data()
 
+# 전체 학생 × 전체 대학교 달성도를 한 번에 계산 (데이터가 바뀔 때만 다시 계산)
+@st.cache_resource
+def build_matcher(df, standards):
+    return UniversityMatcher(standards).fit(df)
+
+matcher = build_matcher(df, university_standards)
+student_repo = get_repository(df)
+
 # 메인 콘텐츠
 col1, col2 = st.columns([1, 1])
 
 with col1:
     st.header("👨‍🎓 학생 선택")
     
-    # 학생 선택
+    # 학생 선택 (학번 → 표시 이름은 미리 만들어 둔 색인에서 바로 조회)
     selected_student = st.selectbox(
         "분석할 학생을 선택하세요:",
-        df['student_id'].tolist(),
-        format_func=lambda x: f"{df[df['student_id']==x]['name'].iloc[0]} ({x})"
+        student_repo.ids,
+        format_func=student_repo.label
     )
     
     if selected_student:
-        student_data = df[df['student_id'] == selected_student].iloc[0]
+        student_data = student_repo.get(selected_student)
         
         st.subheader(f"📊 {student_data['name']} 학생 정보")
         st.markdown(f"**학번**: {student_data['student_id']}")
@@ -199,7 +215,7 @@ if selected_student and selected_university:
     st.markdown("---")
     st.header("📈 과목별 성적 비교 (방사형 차트)")
     
-    student_data = df[df['student_id'] == selected_student].iloc[0]
+    student_data = student_repo.get(selected_student)
     univ_data = university_standards[selected_university]
     
     # 과목명과 점수 데이터
@@ -263,19 +279,14 @@ if selected_student and selected_university:
     with col3:
         st.subheader("📊 과목별 달성도")
         
-        # 과목별 달성도 계산
-        math_ratio = (student_data['math_score'] / univ_data['math_score']) * 100
-        korean_ratio = (student_data['korean_score'] / univ_data['korean_score']) * 100
-        english_ratio = (student_data['english_score'] / univ_data['english_score']) * 100
-        science_ratio = (student_data['science_score'] / univ_data['science_score']) * 100
-        social_ratio = (student_data['social_score'] / univ_data['social_score']) * 100
+        # 과목별 달성도 (미리 계산한 학생 × 대학교 × 과목 행렬에서 꺼내기)
+        student_pos = matcher.position(selected_student)
+        univ_pos = matcher.universities.index(selected_university)
+        ratios = matcher.achievement[student_pos, univ_pos].tolist()
         
         # 달성도 표시
-        st.metric("수학", f"{math_ratio:.1f}%", f"{student_data['math_score']}/{univ_data['math_score']}")
-        st.metric("국어", f"{korean_ratio:.1f}%", f"{student_data['korean_score']}/{univ_data['korean_score']}")
-        st.metric("영어", f"{english_ratio:.1f}%", f"{student_data['english_score']}/{univ_data['english_score']}")
-        st.metric("과학", f"{science_ratio:.1f}%", f"{student_data['science_score']}/{univ_data['science_score']}")
-        st.metric("사회", f"{social_ratio:.1f}%", f"{student_data['social_score']}/{univ_data['social_score']}")
+        for subject, col, ratio in zip(SUBJECT_NAMES, SUBJECT_COLUMNS, ratios):
+            st.metric(subject, f"{ratio:.1f}%", f"{student_data[col]}/{univ_data[col]}")
     
     with col4:
         st.subheader("🎯 종합 평가")
@@ -283,26 +294,14 @@ if selected_student and selected_university:
         # 총점 비교
         student_total = sum(student_scores)
         univ_total = univ_data['total_score']
-        total_ratio = (student_total / univ_total) * 100
+        total_ratio = matcher.total_ratio[student_pos, univ_pos]
         
         st.metric("총점 달성도", f"{total_ratio:.1f}%", f"{student_total}/{univ_total}")
         
         # 합격 가능성 등급
-        if total_ratio >= 95:
-            grade = "🟢 매우 높음"
-            description = "합격 가능성이 매우 높습니다. 안정권으로 분류됩니다."
-        elif total_ratio >= 85:
-            grade = "🟡 높음"
-            description = "합격 가능성이 높습니다. 노력하면 충분히 합격할 수 있습니다."
-        elif total_ratio >= 75:
-            grade = "🟠 보통"
-            description = "합격 가능성이 보통입니다. 추가 학습이 필요합니다."
-        elif total_ratio >= 65:
-            grade = "🔴 낮음"
-            description = "합격 가능성이 낮습니다. 대폭적인 성적 향상이 필요합니다."
-        else:
-            grade = "⚫ 매우 낮음"
-            description = "합격 가능성이 매우 낮습니다. 다른 대학교를 고려해보세요."
+        grade_no = matcher.grades[student_pos, univ_pos]
+        grade = GRADE_LABELS[grade_no]
+        description = GRADE_DESCRIPTIONS[grade_no]
         
         st.markdown(f"**합격 가능성**: {grade}")
         st.markdown(f"**평가**: {description}")
@@ -311,7 +310,6 @@ if selected_student and selected_university:
         st.subheader("💡 개선 방향")
         
         # 가장 부족한 과목 찾기
-        ratios = [math_ratio, korean_ratio, english_ratio, science_ratio, social_ratio]
         min_subject_idx = ratios.index(min(ratios))
         min_subject = subjects[min_subject_idx]
         min_ratio = min(ratios)
@@ -323,6 +321,36 @@ if selected_student and selected_university:
         if total_ratio < 85:
             st.info("📚 전반적인 성적 향상이 필요합니다. 기초부터 차근차근 학습하세요.")
 
+    # 선택한 학생의 대학교별 합격 가능성 순위
+    st.markdown("---")
+    st.header("🏆 추천 대학교")
+    reachable_only = st.checkbox("지원 가능한 대학교만 보기 (보통 이상)", value=True)
+    st.dataframe(matcher.ranked(selected_student, reachable_only=reachable_only),
+                 use_container_width=True, hide_index=True)
+
+# 학년 전체 추천표 (같은 행렬로 전체 학생을 한 번에 정리)
+st.markdown("---")
+st.header("📋 전체 학생 추천표")
+top_n = st.slider("학생별 추천 대학 수", min_value=1, max_value=5, value=3)
+best_matches = matcher.best_matches(top_n=top_n)
+st.dataframe(best_matches, use_container_width=True, hide_index=True)
+
+export_col1, export_col2 = st.columns([1, 1])
+with export_col1:
+    st.download_button(
+        "📥 추천표 CSV",
+        best_matches.to_csv(index=False).encode("utf-8-sig"),
+        file_name="대학추천_전체학생.csv",
+        mime="text/csv",
+    )
+with export_col2:
+    if st.button("📦 전체 결과 엑셀 만들기"):
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            best_matches.to_excel(writer, sheet_name="추천표", index=False)
+            matcher.export_frame().to_excel(writer, sheet_name="학생x대학교", index=False)
+        st.download_button("📥 전체 결과 엑셀", buffer.getvalue(), file_name="대학추천_전체결과.xlsx")
+
 # 실습 과제
 st.markdown("---")
 st.header("💡 실습 과제")
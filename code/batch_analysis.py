@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+학급 전체 학생 AI 분석
+학생 한 명씩 버튼을 눌러 기다리는 대신
+- 학생별 프롬프트를 동시에(개수 제한) 보내고
+- 끝난 학생부터 결과를 돌려주며 (표에 바로 반영)
+- JSON이 깨졌거나 분석 유형별 스키마에 맞지 않는 응답은 다시 요청하고 (429/연결 오류 재시도는 rate_limiter 스케줄러가 담당)
+- 모든 결과를 엑셀/JSON 보고서 하나로 저장합니다.
+
+학생 수가 많으면 OpenAI Batch API용 JSONL 요청 파일을 만들어
+한꺼번에 저렴하게 처리하고, 결과 파일을 같은 보고서로 불러올 수도 있습니다.
+
+사용 예:
+    for result in iter_class_analysis(client, students, "전체 성적 분석"):
+        print(result["name"], result["status"])
+"""
+
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from structured_output import STUDENT_ANALYSIS_SCHEMAS, parse_json, validate
+
+MODEL = "gpt-4o-mini"
+MAX_WORKERS = 5       # 동시에 보내는 요청 수
+MAX_RETRIES = 3       # JSON 파싱/검증 실패 시 최대 재시도 횟수
+
+SYSTEM_PROMPT = "당신은 교육 전문가입니다. 학생 데이터를 분석하여 구체적이고 실용적인 조언을 제공하세요. 반드시 JSON 형식으로만 응답하세요."
+
+# 분석 유형별 프롬프트 ({student_json}에 학생 정보가 들어감)
+STUDENT_PROMPTS = {
+    "전체 성적 분석": """
+다음 학생의 전체적인 성적을 분석해주세요.
+
+**학생 정보:**
+{student_json}
+
+**분석 요청:**
+1. 전체적인 성적 수준 평가
+2. 강점과 약점 과목 분석
+3. 성적 패턴 및 특징
+
+**응답 형식:**
+{{
+    "overall_assessment": "전체적인 성적 수준 (상/중/하)",
+    "strengths": ["강점 과목들"],
+    "weaknesses": ["약점 과목들"],
+    "patterns": ["성적 패턴 및 특징"],
+    "summary": "전체적인 평가 요약"
+}}
+
+반드시 JSON 형식으로만 응답하세요.
+""",
+    "학습 스타일 분석": """
+다음 학생의 학습 스타일과 성격을 분석해주세요.
+
+**학생 정보:**
+{student_json}
+
+**분석 요청:**
+1. 학습 스타일과 성격의 연관성
+2. 현재 학습 방법의 적합성
+3. 학습 효율성 향상 방안
+
+**응답 형식:**
+{{
+    "learning_style_analysis": "학습 스타일 분석 결과",
+    "personality_insights": "성격과 학습의 연관성",
+    "current_methods": "현재 학습 방법 평가",
+    "improvement_suggestions": ["학습 효율성 향상 방안"]
+}}
+
+반드시 JSON 형식으로만 응답하세요.
+""",
+    "개선 방안 제시": """
+다음 학생의 성적 개선을 위한 구체적인 방안을 제시해주세요.
+
+**학생 정보:**
+{student_json}
+
+**분석 요청:**
+1. 약점 과목별 구체적 개선 방안
+2. 학습 시간 활용 최적화
+3. 동기부여 및 관리 방안
+
+**응답 형식:**
+{{
+    "subject_improvements": {{"과목명": "개선 방안"}},
+    "time_optimization": "학습 시간 활용 방안",
+    "motivation_strategies": ["동기부여 전략"],
+    "monitoring_plan": "진행 상황 모니터링 방법"
+}}
+
+반드시 JSON 형식으로만 응답하세요.
+""",
+    "맞춤형 학습 계획": """
+다음 학생을 위한 맞춤형 학습 계획을 수립해주세요.
+
+**학생 정보:**
+{student_json}
+
+**분석 요청:**
+1. 개인별 맞춤 학습 전략
+2. 주간/월간 학습 계획
+3. 목표 설정 및 달성 방안
+
+**응답 형식:**
+{{
+    "personalized_strategy": "개인별 맞춤 전략",
+    "weekly_plan": "주간 학습 계획",
+    "monthly_goals": "월간 목표 설정",
+    "achievement_methods": ["목표 달성 방안"]
+}}
+
+반드시 JSON 형식으로만 응답하세요.
+""",
+}
+ANALYSIS_TYPES = list(STUDENT_PROMPTS)
+
+
+def build_student_prompt(student: dict, analysis_type: str) -> str:
+    """학생 정보(dict)로 분석 유형별 프롬프트 생성"""
+    student_json = json.dumps(student, ensure_ascii=False, indent=2, default=str)
+    return STUDENT_PROMPTS[analysis_type].format(student_json=student_json)
+
+
+def build_messages(student: dict, analysis_type: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_student_prompt(student, analysis_type)},
+    ]
+
+
+def parse_json_response(text: str, analysis_type: str = None) -> dict:
+    """AI 응답을 JSON으로 파싱하고 분석 유형별 스키마로 검증 (코드 블록, 끝 쉼표, 잘린 괄호는 로컬에서 복구)"""
+    parsed = parse_json(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("응답이 JSON 형식이 아닙니다.")
+    schema = STUDENT_ANALYSIS_SCHEMAS.get(analysis_type)
+    if schema is None:
+        return parsed
+    validated, invalid_fields = validate(parsed, schema)
+    if validated is None:
+        raise ValueError(f"빠졌거나 형식이 잘못된 필드: {', '.join(invalid_fields)}")
+    return validated
+
+
+class StudentAnalysisError(ValueError):
+    """여러 번 요청해도 올바른 JSON 분석 결과를 받지 못한 경우"""
+
+    def __init__(self, message: str, attempts: int):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+def student_label(student: dict, index: int) -> str:
+    """표와 보고서에 쓸 학생 이름"""
+    return str(student.get("name") or student.get("student_id") or f"학생 {index + 1}")
+
+
+def analyze_student(client, student: dict, analysis_type: str, model: str = MODEL,
+                    max_retries: int = MAX_RETRIES, max_tokens: int = 800) -> tuple:
+    """학생 한 명 분석. (파싱된 결과, 원본 응답, 시도 횟수) 반환
+
+    여기서는 JSON 파싱/스키마 검증 실패만 다시 요청합니다. API 오류(429, 연결 오류 등)는 그대로 올리고,
+    그 재시도는 track()으로 감싼 클라이언트의 스케줄러(rate_limiter)가 맡습니다.
+    """
+    messages = build_messages(student, analysis_type)
+    for attempt in range(1, max_retries + 2):
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+        )
+        raw = response.choices[0].message.content
+        try:
+            return parse_json_response(raw, analysis_type), raw, attempt
+        except ValueError as e:
+            if attempt > max_retries:
+                raise StudentAnalysisError(f"{e} ({attempt}번 시도)", attempt) from e
+
+
+def iter_class_analysis(client, students: list, analysis_type: str, model: str = MODEL,
+                        max_workers: int = MAX_WORKERS, max_retries: int = MAX_RETRIES):
+    """학생 목록을 동시에 분석하고, 끝난 순서대로 결과 dict를 하나씩 반환"""
+
+    def run(index):
+        started = time.perf_counter()
+        result = {"index": index, "name": student_label(students[index], index)}
+        try:
+            parsed, raw, attempts = analyze_student(client, students[index], analysis_type, model, max_retries)
+            result.update(status="ok", attempts=attempts, result=parsed, raw=raw, error=None)
+        except Exception as e:
+            result.update(status="error", attempts=getattr(e, "attempts", 1), result=None, raw=None, error=str(e))
+        result["latency"] = round(time.perf_counter() - started, 2)
+        return result
+
+    # with 문을 쓰면 화면이 중간에 멈출 때(제너레이터 종료) 남은 학생 요청이 모두 끝날 때까지 기다리므로
+    # 직접 종료하면서 아직 시작하지 않은 요청은 취소
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(run, index) for index in range(len(students))]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _cell(value):
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return "\n".join(f"{key}: {item}" for key, item in value.items())
+    return value
+
+
+def build_report(results: list) -> pd.DataFrame:
+    """분석 결과를 학생 순서대로 한 행씩 정리한 표"""
+    rows = []
+    for result in sorted(results, key=lambda r: r["index"]):
+        row = {
+            "학생": result["name"],
+            "상태": "✅ 완료" if result["status"] == "ok" else "❌ 실패",
+            "시도 횟수": result["attempts"],
+            "소요 시간(초)": result["latency"],
+        }
+        if result["result"]:
+            row.update({key: _cell(value) for key, value in result["result"].items()})
+        if result["error"]:
+            row["오류"] = result["error"]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def report_to_excel(results: list) -> bytes:
+    """보고서를 엑셀 파일 내용(bytes)으로 변환"""
+    buffer = io.BytesIO()
+    build_report(results).to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+
+def report_to_json(results: list, analysis_type: str) -> str:
+    """보고서를 JSON 문자열로 변환"""
+    return json.dumps({
+        "analysis_type": analysis_type,
+        "students": [
+            {key: result[key] for key in ("name", "status", "attempts", "latency", "result", "error")}
+            for result in sorted(results, key=lambda r: r["index"])
+        ],
+    }, ensure_ascii=False, indent=2)
+
+
+def build_batch_requests(students: list, analysis_type: str, model: str = MODEL,
+                         max_tokens: int = 800) -> str:
+    """OpenAI Batch API용 JSONL 요청 파일 내용 (학생 한 명 = 한 줄)"""
+    lines = []
+    for index, student in enumerate(students):
+        lines.append(json.dumps({
+            "custom_id": f"student-{index}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": build_messages(student, analysis_type),
+                "temperature": 0.3,
+                "max_tokens": max_tokens,
+                "response_format": {"type": "json_object"},
+            },
+        }, ensure_ascii=False, default=str))
+    return "\n".join(lines) + "\n"
+
+
+def submit_batch(client, jsonl: str):
+    """JSONL 요청 파일을 올리고 배치 작업 생성 (24시간 안에 처리)"""
+    batch_file = client.files.create(file=("class_analysis.jsonl", jsonl.encode("utf-8")), purpose="batch")
+    return client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+
+
+def fetch_batch_output(client, batch_id: str) -> tuple:
+    """배치 작업 상태 확인. (배치 객체, 결과 JSONL 또는 아직 끝나지 않았으면 None) 반환"""
+    batch = client.batches.retrieve(batch_id)
+    if batch.status != "completed" or not batch.output_file_id:
+        return batch, None
+    return batch, client.files.content(batch.output_file_id).text
+
+
+def parse_batch_output(output_jsonl: str, students: list, analysis_type: str = None) -> list:
+    """배치 결과 JSONL을 iter_class_analysis와 같은 형식의 결과 목록으로 변환"""
+    results = []
+    for line in output_jsonl.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        index = int(item["custom_id"].split("-")[-1])
+        result = {"index": index, "name": student_label(students[index], index),
+                  "attempts": 1, "latency": None, "raw": None, "result": None, "error": None}
+        try:
+            result["raw"] = item["response"]["body"]["choices"][0]["message"]["content"]
+            result.update(status="ok", result=parse_json_response(result["raw"], analysis_type))
+        except Exception as e:
+            result.update(status="error", error=str(item.get("error") or e))
+        results.append(result)
+    return results
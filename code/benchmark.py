@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+성능 측정 (벤치마크)
+실제 OpenAI API와 Yahoo Finance 없이 가짜 서버(mock_openai_server.py)와 가짜 yfinance로
+채팅 페이지, 도구 호출 루프, 데이터 페이지(03, 04)를 처음부터 끝까지 실행해 보고
+p50/p95 지연 시간, 처리량, 최대 메모리, 다시 실행(rerun) 비용을 측정합니다.
+저장해 둔 기준(baseline) JSON과 비교해 느려진 항목이 있으면 종료 코드 1로 끝납니다.
+--baseline으로 기준 파일을 직접 지정했는데 그 파일이 없으면 측정하지 않고 종료 코드 2로 끝납니다. (CI용)
+
+사용 예:
+    python code/benchmark.py                          # 측정 후 기준과 비교
+    python code/benchmark.py --update-baseline        # 현재 결과를 새 기준으로 저장
+    python code/benchmark.py --baseline ci_baseline.json   # 기준 파일이 꼭 있어야 하는 비교 (CI)
+    python code/benchmark.py --only data --students 10,1000,100000
+    python code/benchmark.py --only chat,tools --repeat 10 --latency 0.1 --tps 200
+"""
+
+import argparse
+import ast
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STUDY_DIR = os.path.join(BASE_DIR, "study_practice")
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+DEFAULT_REPEAT = 5
+TOLERANCE = 0.25       # 기준보다 25% 넘게 나빠지면 회귀로 봄
+COMPARED_METRICS = ["p50_ms", "p95_ms", "peak_mb"]
+APP_TIMEOUT = 600      # AppTest 한 번 실행 제한 시간(초), 10만 명 데이터 기준
+
+# 가짜 LLM이 도구를 호출하게 만드는 시나리오 (주식 상담 페이지용)
+STOCK_SCRIPT = [
+    {"match": "주가", "tool_calls": [
+        {"name": "get_yf_stock_info", "arguments": {"ticker": "AAPL"}},
+        {"name": "get_yf_stock_history", "arguments": {"ticker": "AAPL", "period": "1mo"}},
+        {"name": "get_yf_stock_recommendations", "arguments": {"ticker": "AAPL"}},
+    ]},
+]
+
+
+# ---------------------------------------------------------------- 준비
+def prepare_environment(work_dir: str):
+    """캐시와 데이터 파일을 임시 폴더로 돌림 (저장소 안의 캐시는 건드리지 않음)
+
+    모듈들이 import할 때 환경 변수를 읽으므로 앱 모듈을 import하기 전에 호출해야 합니다.
+    """
+    os.environ["STUDENT_DATA_PATH"] = os.path.join(work_dir, "students.csv")
+    os.environ["RESPONSE_CACHE_DIR"] = os.path.join(work_dir, "response_cache")
+    os.environ["YF_CACHE_DIR"] = os.path.join(work_dir, "yf_cache")
+    os.environ["LLM_TELEMETRY_DIR"] = os.path.join(work_dir, "telemetry")
+    for path in (BASE_DIR, STUDY_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    import student_data_loader
+    student_data_loader.CACHE_DIR = os.path.join(work_dir, "student_data")
+
+
+def make_students(n: int, seed: int = 0) -> pd.DataFrame:
+    """student_data.xlsx와 같은 열을 가진 가상 학생 데이터"""
+    rng = np.random.default_rng(seed)
+    surnames = np.array(list("김이박최정강조윤장임한오서신권황안송류홍"))
+    given = np.array(["민수", "지은", "준호", "수진", "현우", "소영", "도현", "미래", "태호", "하은"])
+    scores = np.clip(rng.normal(75, 12, size=(n, 5)), 0, 100).round().astype(int)
+    return pd.DataFrame({
+        "student_id": [f"S{i + 1:06d}" for i in range(n)],
+        "name": np.char.add(rng.choice(surnames, n), rng.choice(given, n)),
+        "gender": rng.choice(["남", "여"], n),
+        "age": rng.integers(14, 17, n),
+        "grade": rng.choice(["중1", "중2", "중3"], n),
+        "math_score": scores[:, 0],
+        "korean_score": scores[:, 1],
+        "english_score": scores[:, 2],
+        "science_score": scores[:, 3],
+        "social_score": scores[:, 4],
+        "attendance_rate": rng.integers(80, 101, n),
+        "homework_rate": rng.integers(50, 101, n),
+        "study_time": rng.uniform(0.5, 6, n).round(1),
+        "favorite_subject": rng.choice(["수학", "국어", "영어", "과학", "사회"], n),
+        "learning_style": rng.choice(["시각적", "청각적", "실험적", "독서형"], n),
+        "personality": rng.choice(["내향적", "외향적", "활발한", "차분한"], n),
+    })
+
+
+class FakeTicker:
+    """yfinance.Ticker 대신 쓰는 가짜 종목 (네트워크 없이 일정한 데이터 반환)"""
+
+    delay = 0.0  # 조회마다 기다리는 시간(초), Yahoo 서버 응답 시간 흉내
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self._seed = sum(map(ord, ticker))
+
+    @property
+    def info(self) -> dict:
+        time.sleep(self.delay)
+        return {"symbol": self.ticker, "shortName": f"{self.ticker} Inc.", "currency": "USD",
+                "currentPrice": 100 + self._seed % 50, "marketCap": 10 ** 12, "trailingPE": 25.0,
+                "sector": "Technology", "longBusinessSummary": "가짜 종목 설명 " * 20}
+
+    def history(self, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+        time.sleep(self.delay)
+        days = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "5y": 1260}.get(period, 21)
+        rng = np.random.default_rng(self._seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        index = pd.bdate_range(end=pd.Timestamp("2025-01-31"), periods=days, name="Date")
+        return pd.DataFrame({"Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98,
+                             "Close": close, "Volume": rng.integers(10 ** 6, 10 ** 7, days)}, index=index)
+
+    @property
+    def recommendations(self) -> pd.DataFrame:
+        time.sleep(self.delay)
+        return pd.DataFrame({"period": ["0m", "-1m", "-2m"], "strongBuy": [10, 9, 8], "buy": [20, 21, 19],
+                             "hold": [5, 6, 7], "sell": [1, 1, 2], "strongSell": [0, 0, 1]})
+
+
+def _fake_download(tickers, period: str = "1mo", interval: str = "1d", **kwargs) -> pd.DataFrame:
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    return pd.concat({ticker: FakeTicker(ticker).history(period, interval) for ticker in tickers}, axis=1)
+
+
+@contextmanager
+def fake_yfinance(delay: float = 0.0):
+    """yfinance.Ticker / yfinance.download를 가짜로 바꿔 두는 동안만 사용"""
+    import yfinance
+
+    original = yfinance.Ticker, yfinance.download
+    FakeTicker.delay = delay
+    yfinance.Ticker, yfinance.download = FakeTicker, _fake_download
+    try:
+        yield
+    finally:
+        yfinance.Ticker, yfinance.download = original
+
+
+def clear_app_caches():
+    """페이지를 처음 여는 상황으로 되돌림 (Streamlit 캐시, 학생 데이터 캐시)"""
+    import streamlit as st
+    import student_data_loader
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    student_data_loader._frames.clear()
+    shutil.rmtree(student_data_loader.CACHE_DIR, ignore_errors=True)
+
+
+def load_page_function(path: str, name: str, namespace: dict = None):
+    """Streamlit 페이지 스크립트에서 함수 정의 하나만 꺼냄 (페이지 전체를 실행하지 않음)"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    node = next(n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name == name)
+    namespace = dict(namespace or {})
+    exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+    return namespace[name]
+
+
+# ---------------------------------------------------------------- 측정 도구
+def run_timed(fn, repeat: int) -> list:
+    """fn을 repeat번 실행한 각 시간(초)"""
+    times = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def traced_peak(fn) -> float:
+    """fn 한 번 실행하는 동안의 최대 메모리 사용량(MB, tracemalloc 기준)"""
+    tracemalloc.start()
+    try:
+        fn(0)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(name: str, times: list, units: float = 1, unit: str = "회", peak_mb: float = None) -> dict:
+    """지연 시간 목록 → p50/p95/처리량 요약"""
+    ms = np.array(times) * 1000
+    return OrderedDict([
+        ("name", name),
+        ("runs", len(times)),
+        ("p50_ms", round(float(np.percentile(ms, 50)), 2)),
+        ("p95_ms", round(float(np.percentile(ms, 95)), 2)),
+        ("mean_ms", round(float(ms.mean()), 2)),
+        ("throughput", round(units * len(times) / max(sum(times), 1e-9), 2)),
+        ("unit", f"{unit}/초"),
+        ("peak_mb", round(peak_mb, 2) if peak_mb is not None else None),
+    ])
+
+
+def app_test(path: str, timeout: float = APP_TIMEOUT):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(path, default_timeout=timeout)
+
+
+def check_app(at, name: str):
+    if at.exception:
+        raise RuntimeError(f"{name} 실행 중 오류: {at.exception[0].value}")
+
+
+# ---------------------------------------------------------------- 벤치마크
+def bench_tool_obj(args) -> list:
+    """스트리밍 tool_calls 조각 → 도구 호출 목록 변환 (tool_list_to_tool_obj)"""
+    from openai.types.chat.chat_completion_chunk import ChoiceDeltaToolCall, ChoiceDeltaToolCallFunction
+
+    tool_list_to_tool_obj = load_page_function(
+        os.path.join(STUDY_DIR, "04_stock_info_streamlit.py"), "tool_list_to_tool_obj",
+        {"defaultdict": defaultdict},
+    )
+    # 도구 8개, 각 arguments를 40조각으로 나눠 받은 상황
+    chunks = []
+    for index in range(8):
+        arguments = json.dumps({"ticker": f"T{index:03d}", "period": "1y", "memo": "x" * 200})
+        pieces = [arguments[i:i + max(1, len(arguments) // 40)] for i in range(0, len(arguments), max(1, len(arguments) // 40))]
+        chunks.append(ChoiceDeltaToolCall(index=index, id=f"call_{index}", type="function",
+                                          function=ChoiceDeltaToolCallFunction(name="get_yf_stock_info", arguments="")))
+        chunks.extend(ChoiceDeltaToolCall(index=index, function=ChoiceDeltaToolCallFunction(arguments=piece))
+                      for piece in pieces)
+
+    def run(_):
+        for _ in range(100):
+            tool_list_to_tool_obj(chunks)
+
+    times = run_timed(run, args.repeat)
+    return [summarize("tool_list_to_tool_obj (x100)", times, units=100 * len(chunks), unit="조각",
+                      peak_mb=traced_peak(run))]
+
+
+def bench_tool_loop(args) -> list:
+    """주식 상담 페이지: 질문 → 도구 3개 호출 → 최종 답변 (가짜 LLM + 가짜 yfinance)"""
+    from mock_openai_server import MockConfig, start_server, use_mock_server
+
+    server = start_server(MockConfig(latency=args.latency, tokens_per_sec=args.tps, seed=args.seed,
+                                     script=STOCK_SCRIPT))
+    use_mock_server(server)
+    path = os.path.join(STUDY_DIR, "04_stock_info_streamlit.py")
+    try:
+        with fake_yfinance(args.yf_delay):
+            # 도구 결과 캐시를 비워 두고 매 턴 새 대화로 측정
+            def turn(i):
+                import yf_cache
+                yf_cache.yf_cache.clear()
+                at = app_test(path).run()
+                at.chat_input[0].set_value(f"애플 주가 알려줘 ({i})").run()
+                check_app(at, "04_stock_info_streamlit")
+                return at
+
+            turn(0)  # 모듈 import 등 준비
+            times = run_timed(turn, args.repeat)
+            peak = traced_peak(turn)
+
+            at = turn(0)
+            rerun_times = run_timed(lambda _: at.run(), args.repeat)
+    finally:
+        server.shutdown()
+    return [
+        summarize("stock tool loop (turn)", times, peak_mb=peak),
+        summarize("stock tool loop (rerun)", rerun_times),
+    ]
+
+
+def bench_chat(args) -> list:
+    """streamlit_app.py 채팅: stream_ai_response 한 턴과 다시 실행 비용"""
+    from mock_openai_server import MockConfig, start_server, use_mock_server
+
+    server = start_server(MockConfig(latency=args.latency, tokens_per_sec=args.tps, seed=args.seed))
+    use_mock_server(server)
+    path = os.path.join(BASE_DIR, "streamlit_app.py")
+    try:
+        at = app_test(path).run()
+        check_app(at, "streamlit_app")
+        # 질문을 매번 다르게 해서 응답 캐시에 걸리지 않게 함
+        counter = iter(range(10 ** 9))
+
+        def turn(_):
+            at.chat_input[0].set_value(f"제주도 현장학습 계획 {next(counter)}").run()
+            check_app(at, "streamlit_app")
+
+        turn(0)
+        times = run_timed(turn, args.repeat)
+        peak = traced_peak(turn)
+        rerun_times = run_timed(lambda _: at.run(), args.repeat)
+    finally:
+        server.shutdown()
+    return [
+        summarize("streamlit_app chat (turn)", times, peak_mb=peak),
+        summarize("streamlit_app chat (rerun)", rerun_times),
+    ]
+
+
+def bench_data_page(args, filename: str, label: str) -> list:
+    """데이터 페이지: 학생 수별 첫 실행 / 다시 실행 / 학생 선택 비용"""
+    path = os.path.join(BASE_DIR, filename)
+    results = []
+    for n in args.students:
+        make_students(n, args.seed).to_csv(os.environ["STUDENT_DATA_PATH"], index=False)
+        app_test(path).run()  # 모듈 import 등 준비
+
+        def cold(_):
+            clear_app_caches()
+            at = app_test(path).run()
+            check_app(at, filename)
+            return at
+
+        times = run_timed(cold, max(1, args.repeat // 2))
+        peak = traced_peak(cold)
+
+        at = cold(0)
+        rerun_times = run_timed(lambda _: at.run(), args.repeat)
+
+        def select(i):
+            next(s for s in at.selectbox if "학생" in s.label).select_index((i + 1) % n).run()
+            check_app(at, filename)
+
+        select_times = run_timed(select, args.repeat)
+
+        results += [
+            summarize(f"{label} n={n} (first run)", times, units=n, unit="명", peak_mb=peak),
+            summarize(f"{label} n={n} (rerun)", rerun_times, units=n, unit="명"),
+            summarize(f"{label} n={n} (select student)", select_times),
+        ]
+    return results
+
+
+BENCHMARKS = OrderedDict([
+    ("tools", bench_tool_obj),
+    ("tool_loop", bench_tool_loop),
+    ("chat", bench_chat),
+    ("data", lambda args: bench_data_page(args, "03_education_data_ai.py", "03_education")
+     + bench_data_page(args, "04_university_recomm.py", "04_university")),
+])
+
+
+# ---------------------------------------------------------------- 기준 비교
+def environment_info(args) -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "students": args.students,
+        "repeat": args.repeat,
+        "latency": args.latency,
+        "tps": args.tps,
+        "yf_delay": args.yf_delay,
+    }
+
+
+def compare_with_baseline(results: list, baseline: dict, tolerance: float) -> list:
+    """기준보다 tolerance 넘게 나빠진 (항목, 지표, 기준값, 현재값, 변화율) 목록"""
+    base_rows = {row["name"]: row for row in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        base = base_rows.get(row["name"])
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            before, now = base.get(metric), row.get(metric)
+            if before is None or now is None or before <= 0:
+                continue
+            change = now / before - 1
+            row[f"{metric}_change"] = round(change, 3)
+            if change > tolerance:
+                regressions.append((row["name"], metric, before, now, change))
+    return regressions
+
+
+def print_results(results: list):
+    table = pd.DataFrame(results).set_index("name")
+    columns = [c for c in ["runs", "p50_ms", "p95_ms", "throughput", "unit", "peak_mb", "p95_ms_change"] if c in table]
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(table[columns].to_string(na_rep="-"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="채팅/도구/데이터 페이지 성능 측정")
+    parser.add_argument("--only", help=f"실행할 벤치마크 (쉼표로 구분): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--students", default=",".join(map(str, DEFAULT_SIZES)), help="학생 수 목록 (예: 10,1000)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="항목별 반복 횟수")
+    parser.add_argument("--latency", type=float, default=0.05, help="가짜 LLM 첫 응답 지연(초)")
+    parser.add_argument("--tps", type=float, default=400, help="가짜 LLM 초당 토큰 수")
+    parser.add_argument("--yf-delay", type=float, default=0.05, help="가짜 yfinance 조회 지연(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help=f"기준 결과 JSON 경로 (직접 지정하면 파일이 꼭 있어야 함, 기본: {DEFAULT_BASELINE})")
+    parser.add_argument("--update-baseline", action="store_true", help="이번 결과를 기준으로 저장")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="허용 악화 비율 (0.25 = 25%%)")
+    parser.add_argument("--output", help="이번 결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+    args.students = [int(n) for n in args.students.split(",") if n.strip()]
+    # 기준 파일을 직접 지정했는데 없으면 비교 없이 통과하지 않도록 바로 실패
+    baseline_required = args.baseline is not None
+    args.baseline = args.baseline or DEFAULT_BASELINE
+    if baseline_required and not args.update_baseline and not os.path.exists(args.baseline):
+        parser.error(f"기준 결과 파일이 없습니다: {args.baseline} (--update-baseline으로 먼저 저장하세요)")
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"알 수 없는 벤치마크: {', '.join(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="jeju_llm_bench_")
+    prepare_environment(work_dir)
+    results = []
+    try:
+        for name in selected:
+            print(f"⏱️ {name} 측정 중...")
+            started = time.perf_counter()
+            # 페이지들이 print로 남기는 로그는 숨김
+            with redirect_stdout(io.StringIO()):
+                results += BENCHMARKS[name](args)
+            print(f"   {time.perf_counter() - started:.1f}초")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"created": datetime.now().isoformat(timespec="seconds"),
+              "environment": environment_info(args), "results": results}
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment", {}).get("platform") != report["environment"]["platform"]:
+            print("⚠️ 기준 결과와 실행 환경이 다릅니다. 비교 결과는 참고만 하세요.")
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+
+    print()
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 기준 결과 저장: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nℹ️ 기준 결과가 없습니다. --update-baseline으로 먼저 저장하세요.")
+        return 0
+    if regressions:
+        print(f"\n❌ 기준보다 {args.tolerance:.0%} 넘게 나빠진 항목 {len(regressions)}개")
+        for name, metric, before, now, change in regressions:
+            print(f"   - {name} {metric}: {before} → {now} ({change:+.0%})")
+        return 1
+    print("\n✅ 기준 대비 성능 저하 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+토큰 예산 기반 대화 메모리
+대화가 길어질수록 매번 보내는 메시지가 늘어나 느려지고 비싸집니다.
+최근 대화는 그대로 두고, 오래된 대화는 요약 한 개로 합쳐서
+항상 정해진 토큰 예산 안에서 메시지를 보내도록 합니다.
+
+여러 대화(예: 캐릭터별 대화)를 따로 기억해야 하면 MemoryStore로 키마다 나눠 보관합니다.
+
+사용 예:
+    memory = ConversationMemory(max_tokens=3000, summarize=make_llm_summarizer(client))
+    messages = memory.build(st.session_state.messages, system_prompt=system_prompt)
+
+    store = MemoryStore(lambda: ConversationMemory(max_tokens=1500), max_entries=5)
+    conversation = store.get(selected_tale)
+    conversation.add("user", prompt)
+    messages = conversation.build(system_prompt=system_prompt)
+"""
+
+import time
+from collections import OrderedDict
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None  # tiktoken이 없으면 대략적인 추정치 사용
+
+TOOL_ROLES = ("tool", "function")
+MESSAGE_OVERHEAD = 4  # 메시지마다 붙는 role 등 부가 토큰
+
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수 계산"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    # 추정: 영문/숫자는 약 4글자에 1토큰, 한글 등은 약 1글자에 1토큰
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def abbreviate(text: str, max_chars: int) -> str:
+    """긴 텍스트를 앞부분만 남기고 줄임"""
+    if text is None or len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"\n...(이하 {len(text) - max_chars}자 생략)"
+
+
+def simple_summarize(previous_summary: str, messages: list, max_lines: int = 12) -> str:
+    """API 호출 없이 메시지 첫 줄만 모아 만드는 요약 (최근 max_lines줄 유지)"""
+    lines = previous_summary.split("\n") if previous_summary else []
+    for msg in messages:
+        if msg["role"] in TOOL_ROLES:
+            continue
+        first_line = (msg.get("content") or "").strip().split("\n")[0]
+        lines.append(f"- {msg['role']}: {abbreviate(first_line, 60)}")
+    return "\n".join(lines[-max_lines:])
+
+
+def make_llm_summarizer(client, model: str = "gpt-4o-mini", max_tokens: int = 400):
+    """OpenAI로 누적 요약을 만드는 함수를 반환"""
+    def summarize(previous_summary: str, messages: list) -> str:
+        conversation = "\n".join(
+            f"{msg['role']}: {abbreviate(msg.get('content') or '', 1000)}" for msg in messages
+        )
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                temperature=0,
+                max_tokens=max_tokens,
+                messages=[
+                    {"role": "system", "content": "너는 대화 요약 봇이다. 기존 요약과 새 대화를 합쳐 "
+                                                  "이후 대화에 필요한 사실, 결정, 사용자 정보만 한국어로 간결하게 정리하라."},
+                    {"role": "user", "content": f"[기존 요약]\n{previous_summary or '(없음)'}\n\n[새 대화]\n{conversation}"},
+                ],
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"⚠️ 대화 요약 실패, 간단 요약 사용: {e}")
+            return simple_summarize(previous_summary, messages)
+    return summarize
+
+
+class ConversationMemory:
+    """최근 메시지 + 누적 요약으로 토큰 예산을 지키는 대화 메모리
+
+    - max_tokens: 한 번에 보낼 대화 기록의 최대 토큰 수 (시스템 프롬프트 포함)
+    - keep_recent: 예산을 넘더라도 요약하지 않고 남길 최근 메시지 수
+    - max_tool_chars: 지난 턴의 도구 실행 결과를 줄여서 보낼 길이
+    """
+
+    def __init__(self, max_tokens: int = 3000, keep_recent: int = 6,
+                 max_tool_chars: int = 500, summarize=None):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.max_tool_chars = max_tool_chars
+        self.summarize = summarize or simple_summarize
+
+        self.summary = ""
+        self.summarized_count = 0  # 요약에 반영된 원본 메시지 수
+        self.last_tokens = 0       # 마지막으로 만든 메시지의 토큰 수
+
+    def reset(self):
+        self.summary = ""
+        self.summarized_count = 0
+        self.last_tokens = 0
+
+    def build(self, history: list, system_prompt: str = None, extra: str = None) -> list:
+        """API에 보낼 메시지 목록 생성
+
+        history 맨 앞의 system 메시지, system_prompt와 그 뒤의 추가 지시(extra)는
+        항상 그대로 유지되고 토큰 예산에도 포함됩니다.
+        """
+        pinned = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        if extra:
+            pinned.append({"role": "system", "content": extra})
+        start = 0
+        while start < len(history) and history[start]["role"] == "system":
+            pinned.append(history[start])
+            start += 1
+
+        # 대화 기록이 초기화되었으면 요약도 초기화
+        if self.summarized_count > len(history) - start:
+            self.reset()
+
+        last_user = max((i for i, m in enumerate(history) if m["role"] == "user"), default=-1)
+        recent = [self._shrink_tool_payload(history[i], stale=i < last_user)
+                  for i in range(start + self.summarized_count, len(history))]
+
+        budget = self.max_tokens - sum(message_tokens(m) for m in pinned)
+        total = sum(message_tokens(m) for m in recent) + count_tokens(self.summary)
+
+        # 예산을 넘으면 오래된 메시지부터 요약으로 이동
+        fold = 0
+        while total > budget and len(recent) - fold > self.keep_recent:
+            total -= message_tokens(recent[fold])
+            fold += 1
+        # 도구 결과가 자신을 호출한 메시지와 떨어지지 않도록 함께 요약
+        while fold < len(recent) and fold and recent[fold]["role"] in TOOL_ROLES:
+            fold += 1
+
+        if fold:
+            self.summary = self.summarize(self.summary, recent[:fold])
+            self.summarized_count += fold
+            recent = recent[fold:]
+
+        messages = list(pinned)
+        if self.summary:
+            messages.append({"role": "system", "content": f"[지금까지의 대화 요약]\n{self.summary}"})
+        messages.extend(recent)
+
+        self.last_tokens = sum(message_tokens(m) for m in messages)
+        return messages
+
+    def _shrink_tool_payload(self, msg, stale):
+        """마지막 사용자 질문 이전의 도구 결과는 줄여서 보냄"""
+        if stale and msg["role"] in TOOL_ROLES:
+            return {**msg, "content": abbreviate(msg.get("content"), self.max_tool_chars)}
+        return msg
+
+
+class Conversation:
+    """키 하나의 대화 기록과 메모리 (MemoryStore가 만들고 관리)"""
+
+    def __init__(self, memory: ConversationMemory, max_history: int):
+        self.messages = []
+        self.memory = memory
+        self.max_history = max_history
+        self.last_used = time.monotonic()
+
+    def add(self, role: str, content: str):
+        """메시지 추가 (보관 개수를 넘으면 이미 요약에 반영된 오래된 메시지부터 삭제)"""
+        self.messages.append({"role": role, "content": content})
+        drop = min(len(self.messages) - self.max_history, self.memory.summarized_count)
+        if drop > 0:
+            del self.messages[:drop]
+            self.memory.summarized_count -= drop
+
+    def build(self, system_prompt: str = None, extra: str = None) -> list:
+        """API에 보낼 메시지 (시스템 프롬프트 + 추가 지시 + 요약 + 최근 대화, 토큰 예산 안에서)"""
+        return self.memory.build(self.messages, system_prompt=system_prompt, extra=extra)
+
+    def reset(self):
+        self.messages = []
+        self.memory.reset()
+
+
+class MemoryStore:
+    """키(캐릭터, 상담 주제 등)별로 대화를 따로 기억하는 보관소
+
+    - make_memory: 새 대화에 쓸 ConversationMemory를 만드는 함수
+    - max_entries: 보관할 대화 수 (넘으면 가장 오래 안 쓴 대화부터 삭제)
+    - idle_seconds: 이 시간 동안 쓰지 않은 대화는 삭제
+    - max_history: 대화마다 보관할 메시지 수 (화면 표시용 기록도 무한히 늘지 않게)
+    """
+
+    def __init__(self, make_memory, max_entries: int = 5, idle_seconds: float = 1800,
+                 max_history: int = 100):
+        self.make_memory = make_memory
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.max_history = max_history
+        self._conversations = OrderedDict()  # 키 -> Conversation (앞쪽일수록 오래 안 씀)
+
+    def get(self, key) -> Conversation:
+        """키의 대화 (없으면 새로 만들고, 오래 안 쓴 대화는 정리)"""
+        self.evict_idle()
+        conversation = self._conversations.get(key)
+        if conversation is None:
+            conversation = Conversation(self.make_memory(), self.max_history)
+            self._conversations[key] = conversation
+            while len(self._conversations) > self.max_entries:
+                self._conversations.popitem(last=False)
+        else:
+            self._conversations.move_to_end(key)
+        conversation.last_used = time.monotonic()
+        return conversation
+
+    def peek(self, key):
+        """키의 대화가 있으면 반환 (사용 시각은 갱신하지 않음)"""
+        return self._conversations.get(key)
+
+    def reset(self, key):
+        """키의 대화 기록과 요약 삭제"""
+        self._conversations.pop(key, None)
+
+    def evict_idle(self, now: float = None) -> int:
+        """idle_seconds 넘게 안 쓴 대화 삭제. 삭제한 개수 반환"""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, conversation in self._conversations.items()
+                if now - conversation.last_used > self.idle_seconds]
+        for key in idle:
+            del self._conversations[key]
+        return len(idle)
+
+    def __contains__(self, key):
+        return key in self._conversations
+
+    def __len__(self):
+        return len(self._conversations)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 호출 기록 (텔레메트리)
+페이지마다 chat.completions.create를 직접 부르면 얼마나 걸렸는지, 토큰을 얼마나 썼는지 알 수 없습니다.
+클라이언트를 track()으로 감싸 두면 호출마다
+- 첫 토큰까지 걸린 시간(TTFT, 스트리밍일 때)과 전체 지연 시간
+- prompt/completion/cached 토큰 수와 모델별 예상 비용 (등록된 시스템 프롬프트면 프롬프트별 캐시 비율도 집계)
+- 실패 여부와 오류 종류
+를 페이지/프롬프트 유형 이름과 함께 JSONL 파일에 남깁니다. (파일이 커지면 자동으로 교체)
+모아 둔 기록은 telemetry_dashboard.py 페이지에서 볼 수 있습니다.
+호출은 rate_limiter.scheduler를 거쳐 분당 요청/토큰 한도에 맞춰 보내지고, 대기 시간과 재시도 횟수도 같이 남깁니다.
+
+기록 위치는 LLM_TELEMETRY_DIR 환경 변수로 바꿀 수 있고, LLM_TELEMETRY=0이면 기록하지 않습니다.
+
+사용 예:
+    client = track(get_openai_client(api_key), page="streamlit_app", prompt_type="chat")
+    response = client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+    summarizer = make_llm_summarizer(client.with_prompt_type("summary"))
+    waiting_client = client.with_on_wait(show_queue_position(st.empty()))  # 대기 순서 표시
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from prompt_registry import registry as prompt_registry
+from rate_limiter import current_session_id, estimate_request_tokens, scheduler as default_scheduler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TELEMETRY_DIR = os.getenv("LLM_TELEMETRY_DIR", os.path.join(BASE_DIR, ".cache", "telemetry"))
+ENABLED = os.getenv("LLM_TELEMETRY", "1") != "0"
+MAX_FILE_BYTES = 5 * 1024 * 1024  # 파일 하나 최대 5MB
+BACKUP_COUNT = 3                   # llm_calls.jsonl.1 ~ .3 까지 보관
+
+# 모델별 100만 토큰당 가격 (USD: 입력, 캐시된 입력, 출력). 가격이 바뀌면 여기만 수정
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+}
+
+
+def model_price(model: str):
+    """모델 이름(날짜 붙은 이름 포함)에 맞는 가격. 모르는 모델이면 None"""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if (model or "").startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+    """예상 비용(USD). 가격을 모르는 모델이면 None"""
+    price = model_price(model)
+    if price is None or prompt_tokens is None:
+        return None
+    input_price, cached_price, output_price = price
+    cached_tokens = cached_tokens or 0
+    cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + (completion_tokens or 0) * output_price) / 1_000_000
+    return round(cost, 8)
+
+
+class JsonlSink:
+    """호출 기록을 JSONL 파일에 한 줄씩 추가 (크기가 넘으면 .1, .2 ... 로 밀어냄)"""
+
+    def __init__(self, directory: str = TELEMETRY_DIR, filename: str = "llm_calls.jsonl",
+                 max_bytes: int = MAX_FILE_BYTES, backup_count: int = BACKUP_COUNT):
+        self.path = os.path.join(directory, filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                # 기록 실패가 AI 응답을 막으면 안 되므로 경고만 출력
+                print(f"⚠️ LLM 호출 기록 저장 실패: {e}")
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def files(self) -> list:
+        """오래된 파일부터 기록 파일 목록"""
+        candidates = [f"{self.path}.{i}" for i in range(self.backup_count, 0, -1)] + [self.path]
+        return [path for path in candidates if os.path.exists(path)]
+
+
+sink = JsonlSink()
+
+
+def _usage_fields(usage) -> dict:
+    if usage is None:
+        return {"prompt_tokens": None, "completion_tokens": None, "cached_tokens": None, "total_tokens": None}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+class _Call:
+    """호출 한 번의 측정값 (끝날 때 record()로 한 번만 저장)"""
+
+    def __init__(self, tracker, kwargs: dict):
+        self.tracker = tracker
+        self.model = kwargs.get("model")
+        self.stream = bool(kwargs.get("stream"))
+        self.prompt = prompt_registry.identify(kwargs.get("messages"))  # 등록된 시스템 프롬프트 (없으면 None)
+        self.started = time.perf_counter()
+        self.ttft = None
+        self.schedule = {}      # 스케줄러가 채움: queue_wait_s, retries
+        self.reserved = 0       # 스케줄러에 예약한 토큰 수
+        self._recorded = False
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def record(self, status: str, usage=None, model: str = None, error: Exception = None):
+        if self._recorded:
+            return
+        self._recorded = True
+        model = model or self.model
+        fields = _usage_fields(usage)
+        if self.reserved and fields["total_tokens"] is not None:
+            self.tracker.scheduler.settle(self.reserved, fields["total_tokens"])
+        prompt_registry.observe(self.prompt, fields["prompt_tokens"], fields["cached_tokens"])
+        queue_wait = self.schedule.get("queue_wait_s")
+        self.tracker.emit({
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "page": self.tracker.page,
+            "prompt_type": self.tracker.prompt_type,
+            "prompt_key": self.prompt.key if self.prompt else None,
+            "model": model,
+            "stream": self.stream,
+            "status": status,
+            "error": type(error).__name__ if error else None,
+            "latency_s": round(time.perf_counter() - self.started, 4),
+            "ttft_s": round(self.ttft, 4) if self.ttft is not None else None,
+            "queue_wait_s": round(queue_wait, 4) if queue_wait is not None else None,
+            "retries": self.schedule.get("retries"),
+            **fields,
+            "cost_usd": estimate_cost(model, fields["prompt_tokens"], fields["completion_tokens"],
+                                      fields["cached_tokens"]),
+        })
+
+
+class TrackedStream:
+    """스트리밍 응답을 그대로 넘겨주면서 첫 토큰 시간과 마지막 usage를 기록
+
+    usage만 담긴 마지막 조각(choices가 빈 조각)은 기록만 하고 넘기지 않으므로
+    chunk.choices[0]를 바로 쓰는 기존 코드도 그대로 동작합니다.
+    """
+
+    def __init__(self, stream, call: _Call):
+        self._stream = stream
+        self._call = call
+        self.usage = None  # 스트림이 끝나면 마지막 조각의 usage
+
+    def __iter__(self):
+        usage, model, status = None, None, "cancelled"
+        try:
+            for chunk in self._stream:
+                model = getattr(chunk, "model", None) or model
+                if getattr(chunk, "usage", None) is not None:
+                    usage = self.usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta is not None and (delta.content or delta.tool_calls):
+                    self._call.first_token()
+                yield chunk
+            status = "ok"
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            self._call.record("error", usage, model, e)
+            raise
+        finally:
+            self._call.record(status, usage, model)
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close:
+            close()
+        self._call.record("cancelled")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _Completions:
+    def __init__(self, tracker):
+        self._tracker = tracker
+
+    def create(self, **kwargs):
+        return self._tracker.create(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._tracker.client.chat.completions, name)
+
+
+class _Chat:
+    def __init__(self, tracker):
+        self.completions = _Completions(tracker)
+
+
+class TrackedClient:
+    """OpenAI 클라이언트(또는 openai 모듈)를 감싸 chat.completions.create 호출을 기록
+
+    chat.completions.create 외의 속성(files, batches, embeddings 등)은 원래 클라이언트로 넘깁니다.
+    세션 id는 감쌀 때의 Streamlit 세션으로 정해지므로, 작업 스레드에서 부른 호출도 같은 세션 차례로 줄을 섭니다.
+    """
+
+    def __init__(self, client, page: str, prompt_type: str = None, sink: JsonlSink = sink,
+                 scheduler=default_scheduler, session_id: str = None, on_wait=None):
+        self.client = client
+        self.page = page
+        self.prompt_type = prompt_type
+        self.sink = sink
+        self.scheduler = scheduler
+        self.session_id = session_id or current_session_id()
+        self.on_wait = on_wait
+        # 재시도는 스케줄러가 하므로 SDK 자체 재시도는 끔 (openai 모듈에는 with_options가 없음)
+        with_options = getattr(client, "with_options", None)
+        self._sender = with_options(max_retries=0) if with_options and scheduler is not None else client
+        self.chat = _Chat(self)
+
+    def _copy(self, **changes) -> "TrackedClient":
+        options = dict(page=self.page, prompt_type=self.prompt_type, sink=self.sink,
+                       scheduler=self.scheduler, session_id=self.session_id, on_wait=self.on_wait)
+        options.update(changes)
+        return TrackedClient(self.client, **options)
+
+    def with_prompt_type(self, prompt_type: str) -> "TrackedClient":
+        """같은 클라이언트, 다른 프롬프트 유형 이름"""
+        return self._copy(prompt_type=prompt_type)
+
+    def with_on_wait(self, on_wait) -> "TrackedClient":
+        """대기열에서 기다릴 때 on_wait(대기 순서, 예상 대기 초)를 부르는 클라이언트"""
+        return self._copy(on_wait=on_wait)
+
+    def create(self, **kwargs):
+        call = _Call(self, kwargs)
+        if call.stream:
+            # 스트리밍도 토큰 수를 받도록 마지막 usage 조각 요청
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        try:
+            if self.scheduler is None:
+                response = self._sender.chat.completions.create(**kwargs)
+            else:
+                call.reserved = estimate_request_tokens(kwargs)
+                response = self.scheduler.submit(lambda: self._sender.chat.completions.create(**kwargs),
+                                                 session_id=self.session_id,
+                                                 tokens=call.reserved, on_wait=self.on_wait,
+                                                 info=call.schedule)
+        except Exception as e:
+            call.record("error", error=e)
+            raise
+        if call.stream:
+            return TrackedStream(response, call)
+        call.record("ok", getattr(response, "usage", None), getattr(response, "model", None))
+        return response
+
+    def emit(self, record: dict):
+        if ENABLED and self.sink is not None:
+            self.sink.write(record)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def track(client, page: str, prompt_type: str = None) -> TrackedClient:
+    """클라이언트를 기록용으로 감쌈 (이미 감싼 클라이언트면 이름만 바꿈)"""
+    if isinstance(client, TrackedClient):
+        return client._copy(page=page, prompt_type=prompt_type)
+    return TrackedClient(client, page, prompt_type)
+
+
+# ---------------------------------------------------------------- 기록 읽기/요약
+def load_records(telemetry_sink: JsonlSink = sink) -> pd.DataFrame:
+    """보관 중인 모든 기록 파일을 표로 읽음 (깨진 줄은 건너뜀)"""
+    records = []
+    for path in telemetry_sink.files():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    df = pd.DataFrame(records)
+    if not df.empty:
+        df["ts"] = pd.to_datetime(df["ts"])
+    return df
+
+
+def summarize(df: pd.DataFrame, by=("page", "prompt_type")) -> pd.DataFrame:
+    """그룹별 호출 수, 오류율, 지연 시간/TTFT 백분위, 토큰과 비용 합계"""
+    if df.empty:
+        return pd.DataFrame()
+    df = df.assign(prompt_type=df["prompt_type"].fillna("-"), failed=df["status"].eq("error"))
+    # 값이 모두 비어 있는 열(비스트리밍만 있을 때의 ttft_s 등)도 숫자로 계산되도록 변환
+    for column in ("latency_s", "ttft_s", "queue_wait_s", "retries", "prompt_tokens", "cached_tokens"):
+        df[column] = pd.to_numeric(df[column], errors="coerce") if column in df else float("nan")
+    grouped = df.groupby(list(by))
+    table = pd.DataFrame({
+        "calls": grouped.size(),
+        "error_rate": grouped["failed"].mean(),
+        "latency_p50": grouped["latency_s"].quantile(0.5),
+        "latency_p95": grouped["latency_s"].quantile(0.95),
+        "ttft_p50": grouped["ttft_s"].quantile(0.5),
+        "ttft_p95": grouped["ttft_s"].quantile(0.95),
+        "queue_wait_p95": grouped["queue_wait_s"].quantile(0.95),
+        "retries": grouped["retries"].sum(),
+        "prompt_tokens": grouped["prompt_tokens"].sum(),
+        "completion_tokens": grouped["completion_tokens"].sum(),
+        "cached_ratio": grouped["cached_tokens"].sum() / grouped["prompt_tokens"].sum().replace(0, float("nan")),
+        "cost_usd": grouped["cost_usd"].sum(),
+    })
+    return table.reset_index().sort_values("calls", ascending=False)
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+가짜 OpenAI 서버 (오프라인 테스트/부하 테스트용)
+실제 API 없이도 Streamlit 페이지와 도구 호출 루프를 돌려볼 수 있도록
+/v1/chat/completions 프로토콜(일반 응답, SSE 스트리밍, tool_calls 델타)을 흉내 냅니다.
+- 지연 시간, 초당 토큰 수, 오류 비율을 설정할 수 있고
+- 시나리오 파일로 "이 질문에는 이 도구를 호출"처럼 응답을 정해 둘 수 있으며
+- seed가 같으면 항상 같은 응답/오류 순서가 나옵니다. (표준 라이브러리만 사용)
+- 앞부분 메시지가 이전 요청과 같고 cache_min_tokens 이상이면 실제 API처럼
+  usage.prompt_tokens_details.cached_tokens를 채워 프롬프트 캐시를 흉내 냅니다.
+
+앱을 이 서버로 돌리려면 OPENAI_BASE_URL 환경 변수만 바꾸면 됩니다.
+
+사용 예:
+    python code/mock_openai_server.py --port 8765 --latency 0.2 --tps 80 --error-rate 0.05 --script scenario.json
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-mock streamlit run code/streamlit_app.py
+
+    # 코드에서 (벤치마크 등)
+    server = start_server(MockConfig(latency=0.1, tokens_per_sec=200))
+    use_mock_server(server)
+
+시나리오 파일 (JSON 목록, 위에서부터 처음 맞는 규칙 사용):
+    [
+        {"match": "주가", "tool_calls": [{"name": "get_yf_stock_info", "arguments": {"ticker": "AAPL"}}]},
+        {"match": "JSON", "content": {"result": "ok"}},
+        {"match": "", "content": "기본 응답입니다."}
+    ]
+    match는 마지막 사용자 메시지에 들어 있는 문자열입니다.
+    tool_calls 규칙은 도구 결과를 받은 뒤에는 건너뛰므로 도구 호출 루프가 끝납니다.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+MOCK_API_KEY = "sk-mock"
+TOOL_RESULT_ROLES = ("tool", "function")
+
+DEFAULT_REPLIES = [
+    "네, 질문하신 내용을 정리해 드리겠습니다. 먼저 핵심을 말씀드리면 차근차근 단계별로 접근하는 것이 좋습니다.",
+    "좋은 질문입니다. 제주도의 자연환경을 활용하면 학생들이 더 흥미를 느낄 수 있습니다. 구체적인 예시를 들어 보겠습니다.",
+    "요청하신 내용을 바탕으로 계획을 세워 보았습니다. 준비, 진행, 정리의 세 단계로 나누어 설명하겠습니다.",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 대략 추정 (한글 포함 약 3글자당 1토큰)"""
+    return max(1, len(text or "") // 3) if text else 0
+
+
+def split_tokens(text: str) -> list:
+    """스트리밍용으로 응답을 토큰 크기 조각으로 나눔 (3글자씩)"""
+    return [text[i:i + 3] for i in range(0, len(text), 3)] or [""]
+
+
+class MockConfig:
+    """가짜 서버 동작 설정"""
+
+    def __init__(self, latency: float = 0.0, tokens_per_sec: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, seed: int = 0, script: list = None, model: str = "gpt-4o-mini",
+                 cache_min_tokens: int = 1024):
+        self.latency = latency                # 첫 응답까지 기다리는 시간(초)
+        self.tokens_per_sec = tokens_per_sec  # 0이면 생성 속도 제한 없음
+        self.error_rate = error_rate          # 요청 중 오류로 응답할 비율 (0~1)
+        self.error_status = error_status      # 오류 상태 코드 (429면 Retry-After 헤더 포함)
+        self.seed = seed
+        self.script = script or []
+        self.model = model
+        self.cache_min_tokens = cache_min_tokens  # 이보다 짧은 앞부분은 캐시하지 않음
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "MockConfig":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(script=json.load(f), **kwargs)
+
+
+class MockStats:
+    """요청 수, 오류 수, 생성 토큰 수 집계 (GET /stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.tool_call_responses = 0
+        self.completion_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "errors": self.errors,
+                "tool_call_responses": self.tool_call_responses,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+def _text(content) -> str:
+    """메시지 content(문자열 또는 파트 목록)를 문자열로"""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _last_user_message(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return _text(message.get("content"))
+    return ""
+
+
+def _has_tool_result(messages: list) -> bool:
+    """마지막 사용자 메시지 뒤에 도구 실행 결과가 있는지"""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return False
+        if message.get("role") in TOOL_RESULT_ROLES:
+            return True
+    return False
+
+
+def plan_reply(request: dict, config: MockConfig) -> dict:
+    """요청에 대한 응답 결정: {"content": str} 또는 {"tool_calls": [...]}
+
+    같은 요청에는 항상 같은 응답을 돌려줍니다.
+    """
+    messages = request.get("messages", [])
+    query = _last_user_message(messages)
+    after_tool = _has_tool_result(messages)
+
+    for rule in config.script:
+        if rule.get("match", "") not in query:
+            continue
+        if "tool_calls" in rule:
+            if after_tool or not request.get("tools"):
+                continue
+            return {"tool_calls": [
+                {
+                    "id": f"call_{hashlib.md5(f'{query}:{i}'.encode('utf-8')).hexdigest()[:12]}",
+                    "type": "function",
+                    "function": {
+                        "name": call["name"],
+                        "arguments": call["arguments"] if isinstance(call.get("arguments"), str)
+                        else json.dumps(call.get("arguments", {}), ensure_ascii=False),
+                    },
+                }
+                for i, call in enumerate(rule["tool_calls"])
+            ]}
+        content = rule.get("content", "")
+        return {"content": content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)}
+
+    digest = int(hashlib.md5(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest(), 16)
+    if (request.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+        return {"content": json.dumps({"result": DEFAULT_REPLIES[digest % len(DEFAULT_REPLIES)]}, ensure_ascii=False)}
+    reply = DEFAULT_REPLIES[digest % len(DEFAULT_REPLIES)]
+    if after_tool:
+        reply = "도구 실행 결과를 바탕으로 답변드립니다. " + reply
+    return {"content": reply}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenAI/1.0"
+
+    # ------------------------------------------------------------ 라우팅
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [
+                {"id": self.server.config.model, "object": "model", "created": 0, "owned_by": "mock"}
+            ]})
+        elif path.endswith("/stats"):
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_error(404, f"Unknown path: {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Invalid JSON body", "invalid_request_error")
+            return
+        if not self.path.split("?", 1)[0].rstrip("/").endswith("/chat/completions"):
+            self._send_error(404, f"Unknown path: {self.path}", "invalid_request_error")
+            return
+        self._chat_completions(request)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ------------------------------------------------------------ 응답
+    def _chat_completions(self, request: dict):
+        config, stats = self.server.config, self.server.stats
+        stats.add(requests=1)
+        if config.latency:
+            time.sleep(config.latency)
+        if self.server.should_fail():
+            stats.add(errors=1)
+            self._send_error(config.error_status, "Mock server injected error",
+                             "rate_limit_error" if config.error_status == 429 else "server_error")
+            return
+
+        reply = plan_reply(request, config)
+        model = request.get("model") or config.model
+        prompt_tokens = sum(estimate_tokens(_text(m.get("content"))) for m in request.get("messages", []))
+        if "tool_calls" in reply:
+            stats.add(tool_call_responses=1)
+            completion_tokens = sum(estimate_tokens(call["function"]["arguments"]) for call in reply["tool_calls"])
+        else:
+            completion_tokens = estimate_tokens(reply["content"])
+        stats.add(completion_tokens=completion_tokens)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_tokens_details": {"cached_tokens": self.server.cached_tokens(request.get("messages", []))}}
+
+        if request.get("stream"):
+            stats.add(streamed=1)
+            include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+            self._stream(reply, model, usage if include_usage else None)
+            return
+
+        # 일반 응답은 전체 토큰 생성 시간만큼 기다린 뒤 한 번에 보냄
+        if config.tokens_per_sec:
+            time.sleep(completion_tokens / config.tokens_per_sec)
+        message = {"role": "assistant", "content": reply.get("content")}
+        if "tool_calls" in reply:
+            message["tool_calls"] = reply["tool_calls"]
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if "tool_calls" in reply else "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, reply: dict, model: str, usage: dict = None):
+        """SSE로 조각을 보냄 (tool_calls는 이름 → arguments 조각 순서의 델타)"""
+        config = self.server.config
+        delay = 1 / config.tokens_per_sec if config.tokens_per_sec else 0
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta=None, finish_reason=None, usage_block=None):
+            chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [] if usage_block else [{"index": 0, "delta": delta or {}, "finish_reason": finish_reason}]}
+            if usage_block:
+                chunk["usage"] = usage_block
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            send({"role": "assistant", "content": ""})
+            if "tool_calls" in reply:
+                for index, call in enumerate(reply["tool_calls"]):
+                    send({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                          "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                    for piece in split_tokens(call["function"]["arguments"]):
+                        time.sleep(delay)
+                        send({"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+                send(finish_reason="tool_calls")
+            else:
+                for piece in split_tokens(reply["content"]):
+                    time.sleep(delay)
+                    send({"content": piece})
+                send(finish_reason="stop")
+            if usage:
+                send(usage_block=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 중간에 닫은 경우 (취소 버튼 등)
+            pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, error_type: str):
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self._send_json(status, {"error": {"message": message, "type": error_type, "param": None, "code": None}},
+                        headers)
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """설정과 통계를 가진 HTTP 서버 (요청마다 스레드 하나)"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig = None, verbose: bool = False):
+        super().__init__(address, MockHandler)
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self.verbose = verbose
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._prefixes = set()  # 이전 요청들의 메시지 앞부분 해시
+        self._prefix_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 연결을 먼저 끊는 것(스트림 취소 등)은 정상 동작이므로 조용히 넘어감
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def cached_tokens(self, messages: list) -> int:
+        """이전 요청과 같은 가장 긴 메시지 앞부분의 토큰 수 (128토큰 단위로 내림, 실제 API와 같은 방식)"""
+        digest = hashlib.sha256()
+        tokens, cached, seen = 0, 0, []
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            tokens += estimate_tokens(_text(message.get("content")))
+            key = digest.hexdigest()
+            seen.append(key)
+            with self._prefix_lock:
+                if key in self._prefixes and tokens >= self.config.cache_min_tokens:
+                    cached = tokens
+        with self._prefix_lock:
+            if len(self._prefixes) > 100_000:
+                self._prefixes.clear()
+            self._prefixes.update(seen)
+        return cached // 128 * 128
+
+    def should_fail(self) -> bool:
+        """오류 주입 여부 (seed가 같으면 같은 순서로 실패)"""
+        if not self.config.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.config.error_rate
+
+
+def start_server(config: MockConfig = None, host: str = "127.0.0.1", port: int = 0,
+                 verbose: bool = False) -> MockOpenAIServer:
+    """백그라운드 스레드에서 서버 시작 (port=0이면 빈 포트 자동 선택). 끝낼 때 server.shutdown()"""
+    server = MockOpenAIServer((host, port), config, verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def use_mock_server(server: MockOpenAIServer):
+    """이 프로세스의 OpenAI 클라이언트가 가짜 서버를 쓰도록 환경 변수 설정"""
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = MOCK_API_KEY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 OpenAI 서버 (오프라인 테스트용)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="첫 응답까지 지연(초)")
+    parser.add_argument("--tps", type=float, default=0.0, help="초당 생성 토큰 수 (0이면 제한 없음)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류 응답 비율 (0~1)")
+    parser.add_argument("--error-status", type=int, default=500, help="오류 상태 코드 (예: 429, 500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="프롬프트 캐시를 흉내 낼 최소 앞부분 토큰 수")
+    parser.add_argument("--script", help="시나리오 JSON 파일 경로")
+    parser.add_argument("--verbose", action="store_true", help="요청 로그 출력")
+    args = parser.parse_args()
+
+    options = dict(latency=args.latency, tokens_per_sec=args.tps, error_rate=args.error_rate,
+                   error_status=args.error_status, seed=args.seed, cache_min_tokens=args.cache_min_tokens)
+    config = MockConfig.from_file(args.script, **options) if args.script else MockConfig(**options)
+    server = MockOpenAIServer((args.host, args.port), config, args.verbose)
+
+    print(f"🤖 가짜 OpenAI 서버 실행 중: {server.base_url}")
+    print(f"   OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY={MOCK_API_KEY} 로 앱을 실행하세요.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 서버를 종료합니다.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+공용 OpenAI 클라이언트
+페이지마다, 질문마다 OpenAI()를 새로 만들면 매번 TLS 연결부터 다시 맺습니다.
+프로세스 전체에서 클라이언트 하나(= httpx 연결 풀 하나)를 같이 쓰도록 합니다.
+
+연결 풀 설정은 환경 변수로 바꿀 수 있습니다.
+- OPENAI_POOL_MAX_CONNECTIONS (기본 50)
+- OPENAI_POOL_MAX_KEEPALIVE   (기본 20)
+- OPENAI_KEEPALIVE_EXPIRY     (기본 60초)
+- OPENAI_CONNECT_TIMEOUT      (기본 5초)
+- OPENAI_READ_TIMEOUT         (기본 60초)
+
+OPENAI_BASE_URL을 지정하면 그 주소로 요청합니다.
+(예: 오프라인 테스트용 가짜 서버 mock_openai_server.py)
+"""
+
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+POOL_MAX_CONNECTIONS = int(os.getenv("OPENAI_POOL_MAX_CONNECTIONS", "50"))
+POOL_MAX_KEEPALIVE = int(os.getenv("OPENAI_POOL_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "60"))
+
+
+class ConnectionStats:
+    """요청 수와 새로 연 연결 수를 세어 연결 재사용률을 계산"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        # httpcore trace 확장: 새 TCP 연결을 맺을 때만 connect_tcp 이벤트가 발생
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_requests": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+            }
+
+
+connection_stats = ConnectionStats()
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _build_http_client() -> httpx.Client:
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        event_hooks={"request": [connection_stats.on_request]},
+    )
+
+
+def get_openai_client(api_key: str = None) -> OpenAI:
+    """API 키(와 서버 주소)별로 하나씩만 만들어 재사용하는 OpenAI 클라이언트"""
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    with _lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=_build_http_client())
+            _clients[(api_key, base_url)] = client
+        return client
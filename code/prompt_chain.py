@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+프롬프트 체인 실행기
+단계와 의존 관계를 선언하면 (DAG)
+- 서로 의존하지 않는 단계는 동시에 실행하고
+- 각 단계의 응답을 JSON으로 파싱해 다음 단계 프롬프트에 넘기며
+- 입력(프롬프트) 해시로 결과를 캐시해서 다시 실행할 때는 바뀐 단계만 호출하고
+- 단계별 실행 시간을 기록합니다.
+
+사용 예:
+    chain = PromptChain([
+        ChainStep("analyze", "{task} 1단계를 수행하세요."),
+        ChainStep("plan", "이전 결과:\\n{previous}\\n2단계를 수행하세요.", depends_on=["analyze"]),
+    ], client)
+    results = chain.run({"task": "학생 성적 분석"}, on_step=lambda r: print(r["name"], r["seconds"]))
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from structured_output import parse_json
+
+MODEL = "gpt-4o-mini"
+MAX_WORKERS = 4
+MAX_CACHE_ENTRIES = 256
+DEFAULT_SYSTEM = "당신은 교육 전문가입니다. 단계별로 체계적으로 작업을 수행하세요. 반드시 JSON 형식으로만 응답하세요."
+
+
+class ChainStep:
+    """체인의 한 단계
+
+    prompt: str.format 템플릿 또는 (context, previous) -> str 함수
+            템플릿에서는 context의 키와 {previous}(의존 단계 결과 JSON)를 쓸 수 있습니다.
+    """
+
+    def __init__(self, name: str, prompt, depends_on=(), title: str = None,
+                 system: str = DEFAULT_SYSTEM, temperature: float = 0.3, max_tokens: int = 500):
+        self.name = name
+        self.prompt = prompt
+        self.depends_on = list(depends_on)
+        self.title = title or name
+        self.system = system
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def render(self, context: dict, previous: dict) -> str:
+        if callable(self.prompt):
+            return self.prompt(context, previous)
+        previous_json = json.dumps(previous, ensure_ascii=False, indent=2) if previous else ""
+        return self.prompt.format(**context, previous=previous_json)
+
+
+class StepCache:
+    """입력 해시 -> 파싱된 결과 (LRU, 세션끼리 공유)"""
+
+    def __init__(self, max_entries: int = MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+step_cache = StepCache()
+
+
+class PromptChain:
+    """의존 관계(DAG)에 따라 단계를 동시에 실행하는 프롬프트 체인"""
+
+    def __init__(self, steps: list, client, model: str = MODEL,
+                 max_workers: int = MAX_WORKERS, cache: StepCache = step_cache):
+        self.steps = OrderedDict((step.name, step) for step in steps)
+        self.client = client
+        self.model = model
+        self.max_workers = max_workers
+        self.cache = cache
+        self._validate()
+
+    def _validate(self):
+        """모르는 단계 참조와 순환 의존 확인"""
+        for step in self.steps.values():
+            unknown = [dep for dep in step.depends_on if dep not in self.steps]
+            if unknown:
+                raise ValueError(f"'{step.name}' 단계가 알 수 없는 단계에 의존합니다: {', '.join(unknown)}")
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"단계 의존 관계에 순환이 있습니다: {name}")
+            visiting.add(name)
+            for dep in self.steps[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def levels(self) -> list:
+        """동시에 실행할 수 있는 단계 묶음 (화면 표시용)"""
+        depth = {}
+
+        def level(name):
+            if name not in depth:
+                depth[name] = max((level(dep) + 1 for dep in self.steps[name].depends_on), default=0)
+            return depth[name]
+
+        for name in self.steps:
+            level(name)
+        grouped = {}
+        for name, value in depth.items():
+            grouped.setdefault(value, []).append(name)
+        return [grouped[value] for value in sorted(grouped)]
+
+    def run(self, context: dict = None, on_start=None, on_step=None) -> dict:
+        """체인 실행. {단계 이름: 결과 dict} 반환
+
+        on_start(단계 이름), on_step(결과 dict) 콜백은 호출한 스레드에서 실행되므로
+        Streamlit 화면을 바로 갱신해도 됩니다.
+        결과 dict: name, title, status(ok/invalid/error/skipped), output, raw, seconds, cached, error
+        """
+        context = context or {}
+        results = {}
+        pending = dict(self.steps)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # 의존 단계가 모두 끝난 단계를 시작 (실패한 의존 단계가 있으면 건너뜀)
+                for name, step in list(pending.items()):
+                    if not all(dep in results for dep in step.depends_on):
+                        continue
+                    del pending[name]
+                    failed = [dep for dep in step.depends_on if results[dep]["status"] in ("error", "skipped")]
+                    if failed:
+                        result = self._result(step, "skipped", error=f"이전 단계 실패: {', '.join(failed)}")
+                        results[name] = result
+                        if on_step:
+                            on_step(result)
+                        continue
+                    previous = {
+                        dep: results[dep]["output"] if results[dep]["output"] is not None else results[dep]["raw"]
+                        for dep in step.depends_on
+                    }
+                    if on_start:
+                        on_start(name)
+                    running[executor.submit(self._run_step, step, context, previous)] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if on_step:
+                        on_step(results[name])
+
+        return OrderedDict((name, results[name]) for name in self.steps)
+
+    def _run_step(self, step: ChainStep, context: dict, previous: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            prompt = step.render(context, previous)
+            key = hashlib.sha256(json.dumps(
+                [self.model, step.system, prompt, step.temperature, step.max_tokens], ensure_ascii=False
+            ).encode("utf-8")).hexdigest()
+
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                return self._result(step, "ok", output=cached["output"], raw=cached["raw"],
+                                    seconds=time.perf_counter() - started, cached=True)
+
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": step.system},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=step.temperature,
+                max_tokens=step.max_tokens,
+                response_format={"type": "json_object"},
+            )
+            raw = response.choices[0].message.content
+            output = parse_json(raw)
+            if output is None:
+                return self._result(step, "invalid", raw=raw, seconds=time.perf_counter() - started,
+                                    error="응답이 JSON 형식이 아닙니다.")
+            if self.cache is not None:
+                self.cache.set(key, {"output": output, "raw": raw})
+            return self._result(step, "ok", output=output, raw=raw, seconds=time.perf_counter() - started)
+        except Exception as e:
+            return self._result(step, "error", seconds=time.perf_counter() - started, error=str(e))
+
+    @staticmethod
+    def _result(step, status, output=None, raw=None, seconds=0.0, cached=False, error=None) -> dict:
+        return {
+            "name": step.name,
+            "title": step.title,
+            "status": status,
+            "output": output,
+            "raw": raw,
+            "seconds": round(seconds, 3),
+            "cached": cached,
+            "error": error,
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+시스템 프롬프트 등록소 (프롬프트 캐시용)
+OpenAI는 요청 앞부분(1024토큰 이상)이 이전 요청과 글자 하나까지 같으면 자동으로 캐시해
+그 부분의 입력 비용과 지연 시간을 줄여 줍니다. (usage.prompt_tokens_details.cached_tokens)
+챗봇은 매 턴 같은 시스템 프롬프트를 보내므로
+- 고정 프롬프트는 한 번만 정리(들여쓰기 제거)하고 해시와 토큰 수를 계산해 두고
+- 메시지는 항상 [고정 프롬프트] → [바뀌는 지시/요약] → [대화] 순서로 배치하며
+- 호출 결과의 cached_tokens를 모아 프롬프트별 캐시 비율을 보여줍니다.
+
+같은 이름으로 다른 내용을 등록하면(예: 실습 중 프롬프트 수정) 새 버전으로 따로 집계합니다.
+
+사용 예:
+    SYSTEM_PROMPT = registry.register("jeju_teacher_assistant", system_prompt_text)
+    messages = SYSTEM_PROMPT.messages(history, extra="추가 지시사항 ...")
+    response = client.chat.completions.create(model=model, messages=messages, **SYSTEM_PROMPT.cache_options)
+    print(registry.stats())
+"""
+
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+from conversation_memory import count_tokens
+
+MIN_CACHEABLE_TOKENS = 1024  # 이보다 짧은 앞부분은 OpenAI 자동 캐시 대상이 아님
+MAX_TEMPLATES = 256          # 보관할 프롬프트 버전 수 (오래 안 쓴 것부터 삭제)
+
+
+def normalize(text: str) -> str:
+    """코드 들여쓰기 때문에 생긴 공백과 앞뒤 빈 줄 제거 (토큰 절약 + 같은 내용이면 같은 글자)"""
+    return inspect.cleandoc(text)
+
+
+class PromptTemplate:
+    """미리 정리하고 해시해 둔 고정 시스템 프롬프트"""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = normalize(text)
+        self.hash = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:12]
+        self.key = f"{name}@{self.hash}"
+        self.tokens = count_tokens(self.text)
+        self.message = {"role": "system", "content": self.text}
+        # 같은 앞부분을 가진 요청이 같은 캐시 서버로 가도록 알려주는 값 (SDK 버전과 상관없이 extra_body로 전달)
+        self.cache_options = {"extra_body": {"prompt_cache_key": self.key}}
+
+    @property
+    def cacheable(self) -> bool:
+        return self.tokens >= MIN_CACHEABLE_TOKENS
+
+    def messages(self, history=(), extra: str = None) -> list:
+        """고정 프롬프트를 맨 앞에 두고, 바뀌는 지시(extra)와 대화 기록은 그 뒤에 배치"""
+        messages = [self.message]
+        if extra:
+            messages.append({"role": "system", "content": extra})
+        messages.extend(history)
+        return messages
+
+    def __repr__(self):
+        return f"PromptTemplate({self.key}, {self.tokens} tokens)"
+
+
+class PromptRegistry:
+    """이름/내용으로 프롬프트를 한 번만 만들고, 호출별 캐시 토큰을 집계"""
+
+    def __init__(self, max_templates: int = MAX_TEMPLATES):
+        self.max_templates = max_templates
+        self._by_text = OrderedDict()  # 원문 또는 정리된 글 -> PromptTemplate
+        self._latest = {}              # 이름 -> 마지막으로 등록된 PromptTemplate
+        self._usage = {}               # key -> {"calls", "prompt_tokens", "cached_tokens"}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, text: str) -> PromptTemplate:
+        """프롬프트 등록 (이미 같은 내용이 있으면 만들어 둔 것을 그대로 반환)"""
+        with self._lock:
+            template = self._by_text.get(text)
+            if template is None or template.name != name:
+                template = PromptTemplate(name, text)
+                self._by_text[text] = template
+                self._by_text[template.text] = template
+                while len(self._by_text) > self.max_templates:
+                    self._by_text.popitem(last=False)
+            else:
+                self._by_text.move_to_end(text)
+                self._by_text.move_to_end(template.text)
+            self._latest[name] = template
+            return template
+
+    def get(self, name: str):
+        """이름으로 마지막에 등록된 프롬프트 찾기"""
+        return self._latest.get(name)
+
+    def identify(self, messages) -> PromptTemplate:
+        """메시지 목록의 첫 시스템 메시지가 등록된 프롬프트면 그 프롬프트 (아니면 None)"""
+        if not messages or not isinstance(messages[0], dict) or messages[0].get("role") != "system":
+            return None
+        content = messages[0].get("content")
+        if not isinstance(content, str):
+            return None
+        return self._by_text.get(content)
+
+    def observe(self, template: PromptTemplate, prompt_tokens: int, cached_tokens: int):
+        """호출 한 번의 입력/캐시 토큰 수 기록"""
+        if template is None or prompt_tokens is None:
+            return
+        with self._lock:
+            usage = self._usage.setdefault(template.key, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["cached_tokens"] += cached_tokens or 0
+
+    def cache_ratio(self, name: str) -> float:
+        """이름이 같은 모든 버전을 합친 입력 토큰 중 캐시된 비율 (기록이 없으면 None)"""
+        rows = [row for row in self.stats() if row["name"] == name and row["prompt_tokens"]]
+        prompt_tokens = sum(row["prompt_tokens"] for row in rows)
+        if not prompt_tokens:
+            return None
+        return sum(row["cached_tokens"] for row in rows) / prompt_tokens
+
+    def stats(self) -> list:
+        """프롬프트 버전별 토큰 수, 캐시 가능 여부, 호출 수와 캐시 비율"""
+        with self._lock:
+            templates = {template.key: template for template in self._by_text.values()}
+            usage = {key: dict(value) for key, value in self._usage.items()}
+        rows = []
+        for key, template in templates.items():
+            counts = usage.get(key, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            rows.append({
+                "name": template.name,
+                "hash": template.hash,
+                "tokens": template.tokens,
+                "cacheable": template.cacheable,
+                **counts,
+                "cached_ratio": counts["cached_tokens"] / counts["prompt_tokens"] if counts["prompt_tokens"] else None,
+            })
+        return rows
+
+
+# 프로세스 전체(모든 페이지, 모든 세션)가 같이 쓰는 등록소
+registry = PromptRegistry()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+요청 스케줄러 (속도 제한 + 재시도)
+수업 시간에 학생 30명이 같은 API 키로 동시에 질문하면 분당 요청/토큰 한도를 넘어
+429 오류가 그대로 "❌ AI 응답 생성 실패"로 보입니다.
+- 분당 요청 수(RPM)와 분당 토큰 수(TPM)를 토큰 버킷으로 미리 맞추고
+- 한도를 넘는 요청은 세션(학생)별로 번갈아 가며 공평하게 줄을 세우고
+- 429/5xx 오류는 지수 백오프(+무작위 지연)로 다시 시도하며, 그동안 다른 요청도 잠시 멈춥니다.
+대기 중에는 on_wait(대기 순서, 예상 대기 초) 콜백으로 화면에 순서를 보여줄 수 있습니다.
+
+한도는 OPENAI_RPM, OPENAI_TPM 환경 변수로 바꿀 수 있습니다. (API 키 등급에 맞게 설정)
+
+사용 예:
+    response = scheduler.submit(
+        lambda: client.chat.completions.create(**kwargs),
+        session_id=session_id, tokens=estimate_request_tokens(kwargs),
+        on_wait=show_queue_position(st.empty()),
+    )
+"""
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import openai
+
+from conversation_memory import message_tokens
+
+RPM = int(os.getenv("OPENAI_RPM", "500"))        # 분당 요청 수 한도
+TPM = int(os.getenv("OPENAI_TPM", "200000"))     # 분당 토큰 수 한도
+BURST_SECONDS = 10       # 한 번에 몰아서 쓸 수 있는 양 (몇 초 분량의 한도인지)
+MAX_RETRIES = 4          # 429/5xx 재시도 횟수
+BACKOFF_BASE = 1.0       # 첫 재시도 대기(초), 이후 2배씩
+BACKOFF_MAX = 30.0       # 재시도 대기 최대(초)
+MAX_QUEUE_WAIT = 120.0   # 줄에서 이보다 오래 기다리면 포기(초)
+DEFAULT_MAX_TOKENS = 512  # max_tokens를 지정하지 않은 요청의 응답 토큰 추정치
+POLL_INTERVAL = 0.5      # 대기 순서를 다시 확인하는 간격(초)
+
+
+class QueueTimeout(Exception):
+    """요청이 너무 오래 대기열에서 기다린 경우"""
+
+
+def estimate_request_tokens(kwargs: dict) -> int:
+    """요청 한 번이 TPM 한도에서 차지할 토큰 수 (입력 메시지 + 최대 응답 토큰)"""
+    prompt_tokens = sum(message_tokens(message) for message in kwargs.get("messages", []))
+    max_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or DEFAULT_MAX_TOKENS
+    return prompt_tokens + max_tokens
+
+
+def is_retryable(error: Exception) -> bool:
+    """다시 시도하면 성공할 수 있는 오류인지 (한도 초과, 서버 오류, 연결 오류)"""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False  # 결제 한도 초과는 기다려도 풀리지 않음
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception):
+    """서버가 알려준 재시도 대기 시간(초). 없으면 None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def current_session_id() -> str:
+    """지금 실행 중인 Streamlit 세션 id (Streamlit 밖이면 스레드 이름)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is not None:
+            return ctx.session_id
+    except Exception:
+        pass
+    return threading.current_thread().name
+
+
+def show_queue_position(placeholder):
+    """Streamlit 빈 자리(st.empty())에 대기 순서를 표시하는 on_wait 콜백"""
+    def on_wait(position: int, wait_seconds: float):
+        if position > 1:
+            placeholder.info(f"⏳ 요청이 많아 대기 중입니다... {position}번째 (약 {wait_seconds:.0f}초)")
+        else:
+            placeholder.info(f"⏳ 곧 요청을 보냅니다... (약 {wait_seconds:.0f}초)")
+    return on_wait
+
+
+class TokenBucket:
+    """초당 rate만큼 차오르고 capacity까지 쌓이는 버킷"""
+
+    def __init__(self, per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount만큼 꺼내려면 더 기다려야 하는 시간(초)"""
+        self._refill(now)
+        # 버킷보다 큰 요청은 가득 찼을 때 보내고 빚(음수)으로 처리
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Ticket:
+    __slots__ = ("session_id", "tokens")
+
+    def __init__(self, session_id: str, tokens: int):
+        self.session_id = session_id
+        self.tokens = tokens
+
+
+class RequestScheduler:
+    """RPM/TPM 토큰 버킷 + 세션별 공평한 대기열 + 재시도"""
+
+    def __init__(self, rpm: int = RPM, tpm: int = TPM, burst_seconds: float = BURST_SECONDS,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE,
+                 backoff_max: float = BACKOFF_MAX, max_queue_wait: float = MAX_QUEUE_WAIT):
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self._queues = OrderedDict()  # 세션 id -> 대기 중인 요청 (앞에 있는 세션부터 차례)
+        self._paused_until = 0.0      # 429를 받으면 모든 요청을 잠시 멈춤
+        self._cond = threading.Condition()
+        self.stats = {"granted": 0, "waited": 0, "retries": 0, "rate_limited": 0}
+
+    # ------------------------------------------------------------ 대기열
+    def _head(self):
+        """다음에 보낼 요청 (세션을 돌아가며 하나씩)"""
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _position(self, ticket: _Ticket) -> int:
+        """세션을 번갈아 보낼 때 이 요청이 몇 번째로 나가는지 (1부터)"""
+        order = list(self._queues)
+        rounds = self._queues[ticket.session_id].index(ticket)
+        mine = order.index(ticket.session_id)
+        ahead = 0
+        for i, session_id in enumerate(order):
+            length = len(self._queues[session_id])
+            ahead += min(length, rounds) + (1 if i < mine and length > rounds else 0)
+        return ahead + 1
+
+    def _grant(self, ticket: _Ticket):
+        """맨 앞 요청을 보냄. 그 세션에 남은 요청이 있으면 세션을 맨 뒤로 (다른 세션에게 차례를 넘김)"""
+        queue = self._queues[ticket.session_id]
+        queue.popleft()
+        if queue:
+            self._queues.move_to_end(ticket.session_id)
+        else:
+            del self._queues[ticket.session_id]
+        self._cond.notify_all()
+
+    def _cancel(self, ticket: _Ticket):
+        """보내지 않은 요청을 대기열에서 뺌 (취소/시간 초과). 세션의 차례는 그대로 둠"""
+        queue = self._queues.get(ticket.session_id)
+        if queue is None or ticket not in queue:
+            return
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[ticket.session_id]
+        self._cond.notify_all()
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        return max(self._paused_until - now,
+                   self.requests.wait_time(1, now),
+                   self.tokens.wait_time(tokens, now))
+
+    def acquire(self, session_id: str = "default", tokens: int = 1, on_wait=None) -> float:
+        """차례가 오고 한도가 남을 때까지 기다린 뒤 한도를 차감. 기다린 시간(초) 반환"""
+        ticket = _Ticket(session_id, tokens)
+        started = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+
+        last_position = None
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now)
+                    if self._head() is ticket and wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self._grant(ticket)
+                        waited = now - started
+                        self.stats["granted"] += 1
+                        self.stats["waited"] += waited > 0.01
+                        return waited
+                    position = self._position(ticket)
+
+                if now - started > self.max_queue_wait:
+                    raise QueueTimeout(f"요청이 많아 {self.max_queue_wait:.0f}초 넘게 기다렸습니다. 잠시 후 다시 시도하세요.")
+                if on_wait and position != last_position:
+                    last_position = position
+                    # 앞 요청마다 요청 버킷 한 칸씩 필요하다고 보고 예상 대기 시간 계산
+                    on_wait(position, max(wait, (position - 1) / self.requests.rate))
+
+                with self._cond:
+                    self._cond.wait(timeout=min(max(wait, 0.01), POLL_INTERVAL) if self._head() is ticket
+                                    else POLL_INTERVAL)
+        except BaseException:
+            with self._cond:
+                self._cancel(ticket)
+            raise
+
+    def settle(self, reserved: int, actual: int):
+        """실제로 쓴 토큰이 예약보다 적으면 차이를 돌려줌"""
+        if actual is None or actual >= reserved:
+            return
+        with self._cond:
+            self.tokens.give_back(reserved - actual)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """서버가 한도 초과(429)를 알리면 모든 세션의 요청을 잠시 멈춤"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.stats["rate_limited"] += 1
+
+    # ------------------------------------------------------------ 실행
+    def backoff(self, attempt: int, error: Exception = None) -> float:
+        """attempt번째 재시도 전 대기 시간 (서버가 알려준 시간이 있으면 우선)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        hinted = retry_after(error) if error is not None else None
+        if hinted is not None:
+            delay = max(delay, hinted)
+        return delay * (0.5 + random.random())
+
+    def submit(self, fn, session_id: str = None, tokens: int = 1, on_wait=None, info: dict = None):
+        """한도에 맞춰 fn()을 실행하고, 재시도할 수 있는 오류면 백오프 후 다시 실행
+
+        info dict를 넘기면 queue_wait_s(대기열에서 기다린 시간)와 retries(재시도 횟수)를 채웁니다.
+        """
+        session_id = session_id or current_session_id()
+        info = info if info is not None else {}
+        info.update(queue_wait_s=0.0, retries=0)
+        for attempt in range(self.max_retries + 1):
+            info["queue_wait_s"] += self.acquire(session_id, tokens, on_wait)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt + 1, e)
+                if isinstance(e, openai.RateLimitError):
+                    self.pause(delay)
+                info["retries"] += 1
+                with self._cond:
+                    self.stats["retries"] += 1
+                if on_wait:
+                    on_wait(1, delay)
+                time.sleep(delay)
+
+    def snapshot(self) -> dict:
+        """화면 표시용 현재 상태"""
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "sessions": len(self._queues),
+                "requests_available": int(self.requests.tokens),
+                "tokens_available": int(self.tokens.tokens),
+                "paused_seconds": max(0.0, self._paused_until - now),
+                **self.stats,
+            }
+
+
+# 프로세스 전체(모든 페이지, 모든 세션)가 같이 쓰는 스케줄러
+scheduler = RequestScheduler()
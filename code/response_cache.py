@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 응답 캐시
+여러 선생님이 같은 '빠른 질문' 버튼을 누르면 매번 같은 요청이 OpenAI로 갑니다.
+모델, 시스템 프롬프트, temperature, max_tokens, 정리된 대화 기록이 같으면
+저장해 둔 응답을 바로 돌려줍니다.
+
+- 정확히 같은 요청: 해시 키로 바로 찾음
+- 표현만 조금 다른 질문: 앞선 대화가 같을 때 마지막 질문의 글자 3-gram 유사도로 찾음 (선택)
+- 메모리 LRU + SQLite 디스크 저장, 항목별 만료 시간, 히트율 통계
+
+캐시 위치는 RESPONSE_CACHE_DIR 환경 변수로 바꿀 수 있습니다.
+
+사용 예:
+    cached = response_cache.get(model, messages, temperature, max_tokens)
+    if cached is None:
+        response = client.chat.completions.create(...)
+        response_cache.set(model, messages, temperature, max_tokens, answer, usage_tokens)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+CACHE_DIR = os.getenv(
+    "RESPONSE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+DEFAULT_DB_PATH = os.path.join(CACHE_DIR, "response_cache.sqlite")
+
+DEFAULT_TTL = 24 * 60 * 60     # 응답 유지 시간: 하루
+SIMILARITY_THRESHOLD = 0.9     # 이 값 이상이면 같은 질문으로 취급 (None이면 정확히 같은 질문만)
+MAX_SIMILAR_CANDIDATES = 256   # 유사도 비교 대상 최대 개수
+
+_SPACES = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s.!?~。？！]+$")
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화, 소문자, 공백 정리, 끝 문장부호 제거"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _SPACES.sub(" ", text).strip()
+    return _TRAILING.sub("", text)
+
+
+def _hash(value) -> str:
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _split_messages(messages: list):
+    """시스템 프롬프트 / 이전 대화 / 마지막 사용자 질문으로 분리 (모두 정리된 형태)"""
+    system = [normalize_text(m.get("content", "")) for m in messages if m.get("role") == "system"]
+    history = [
+        (m.get("role"), normalize_text(m.get("content") or ""))
+        for m in messages if m.get("role") != "system"
+    ]
+    last_query = ""
+    if history and history[-1][0] == "user":
+        last_query = history[-1][1]
+        history = history[:-1]
+    return system, history, last_query
+
+
+def make_keys(model: str, messages: list, temperature: float, max_tokens: int):
+    """(정확 일치 키, 문맥 키, 마지막 질문) 반환
+
+    문맥 키는 마지막 질문만 뺀 나머지 조건이 같은지 확인하는 데 씁니다.
+    """
+    system, history, last_query = _split_messages(messages)
+    context_key = _hash({
+        "model": model,
+        "system": _hash(system),
+        "temperature": round(float(temperature), 3),
+        "max_tokens": int(max_tokens),
+        "history": history,
+    })
+    exact_key = _hash({"context": context_key, "query": last_query})
+    return exact_key, context_key, last_query
+
+
+def ngram_vector(text: str, n: int = 3) -> Counter:
+    """공백을 뺀 글자 n-gram 빈도 벡터"""
+    text = text.replace(" ", "")
+    if len(text) < n:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """메모리 LRU + SQLite 디스크 응답 캐시"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_memory_entries: int = 256,
+                 max_disk_entries: int = 5000, ttl: float = DEFAULT_TTL,
+                 similarity_threshold: float = SIMILARITY_THRESHOLD):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        # exact_key -> (context_key, query, expires_at, response, tokens)
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " context_key TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " response TEXT NOT NULL,"
+                " tokens INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_context ON responses (context_key)")
+            self._conn.commit()
+        except Exception as e:
+            # 디스크를 쓸 수 없는 환경이면 메모리 캐시만 사용
+            print(f"⚠️ 디스크 응답 캐시를 사용할 수 없습니다: {e}")
+            self._conn = None
+
+    def get(self, model: str, messages: list, temperature: float, max_tokens: int):
+        """저장된 응답을 찾음. 없으면 None"""
+        exact_key, context_key, query = make_keys(model, messages, temperature, max_tokens)
+        now = time.time()
+        with self._lock:
+            entry = self._lookup_exact(exact_key, now)
+            if entry is None and self.similarity_threshold and query:
+                entry = self._lookup_similar(context_key, query, now)
+                if entry is not None:
+                    self.similar_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_tokens += entry[4]
+            return entry[3]
+
+    def set(self, model: str, messages: list, temperature: float, max_tokens: int,
+            response: str, tokens: int = 0, ttl: float = None):
+        """응답 저장 (tokens: 이 응답에 쓴 토큰 수, 절약량 통계용)"""
+        if not response:
+            return
+        exact_key, context_key, query = make_keys(model, messages, temperature, max_tokens)
+        now = time.time()
+        expires_at = now + (ttl or self.ttl)
+        with self._lock:
+            self._remember(exact_key, (context_key, query, expires_at, response, int(tokens or 0)))
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, context_key, query, expires_at, last_access, response, tokens)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (exact_key, context_key, query, expires_at, now, response, int(tokens or 0)),
+            )
+            self._evict_disk(now)
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """히트/미스 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_tokens": self.saved_tokens,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def _lookup_exact(self, key, now):
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[2] > now:
+                self._memory.move_to_end(key)
+                return entry
+            del self._memory[key]
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT context_key, query, expires_at, response, tokens FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                if row[2] > now:
+                    self._touch(key, now)
+                    self._remember(key, tuple(row))
+                    return tuple(row)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+        return None
+
+    def _lookup_similar(self, context_key, query, now):
+        """앞선 대화가 같은 항목 중 마지막 질문이 가장 비슷한 것"""
+        if self._conn is not None:
+            rows = self._conn.execute(
+                "SELECT key, context_key, query, expires_at, response, tokens FROM responses"
+                " WHERE context_key = ? AND expires_at > ? ORDER BY last_access DESC LIMIT ?",
+                (context_key, now, MAX_SIMILAR_CANDIDATES),
+            ).fetchall()
+            candidates = [(row[0], tuple(row[1:])) for row in rows]
+        else:
+            candidates = [
+                (key, entry) for key, entry in reversed(self._memory.items())
+                if entry[0] == context_key and entry[2] > now
+            ][:MAX_SIMILAR_CANDIDATES]
+
+        query_vector = ngram_vector(query)
+        best_key, best_entry, best_score = None, None, 0.0
+        for key, entry in candidates:
+            score = cosine_similarity(query_vector, ngram_vector(entry[1]))
+            if score > best_score:
+                best_key, best_entry, best_score = key, entry, score
+        if best_entry is None or best_score < self.similarity_threshold:
+            return None
+        if self._conn is not None:
+            self._touch(best_key, now)
+        self._remember(best_key, best_entry)
+        return best_entry
+
+    def _touch(self, key, now):
+        self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+
+# 모든 세션이 함께 쓰는 캐시 (프로세스당 하나)
+response_cache = ResponseCache()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스트리밍 응답 렌더러
+청크가 올 때마다 전체 문자열을 다시 그리면 답변이 길수록 브라우저가 느려집니다.
+청크를 리스트에 모아 두었다가 일정 시간/글자 수/문장 끝마다 한 번씩만 화면을 갱신합니다.
+
+사용 예:
+    renderer = StreamRenderer(st.chat_message("assistant").empty())
+    for chunk in response:
+        renderer.write(chunk.choices[0].delta.content)
+    content = renderer.finish()
+"""
+
+import time
+
+SENTENCE_ENDINGS = (".", "!", "?", "\n", "。", "다.", "요.")
+
+
+class StreamRenderer:
+    """청크를 모아서 정해진 간격으로만 화면에 그리는 렌더러"""
+
+    def __init__(self, placeholder=None, flush_interval: float = 0.05,
+                 flush_chars: int = 200, cursor: str = "▌"):
+        self.placeholder = placeholder      # st.empty() 등 .markdown()이 있는 객체
+        self.flush_interval = flush_interval  # 최소 갱신 간격 (초)
+        self.flush_chars = flush_chars      # 이만큼 쌓이면 간격과 상관없이 갱신
+        self.cursor = cursor
+
+        self._parts = []        # 지금까지 받은 청크
+        self._pending_chars = 0  # 마지막 갱신 이후 쌓인 글자 수
+        self._last_flush = 0.0
+
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunk_count = 0
+        self.flush_count = 0
+
+    def write(self, chunk: str):
+        """청크 하나를 추가하고, 필요하면 화면을 갱신"""
+        if not chunk:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+
+        self._parts.append(chunk)
+        self._pending_chars += len(chunk)
+        self.chunk_count += 1
+
+        if (self._pending_chars >= self.flush_chars
+                or (now - self._last_flush >= self.flush_interval
+                    and chunk.rstrip(" ").endswith(SENTENCE_ENDINGS))
+                or now - self._last_flush >= self.flush_interval * 4):
+            self._flush(now, final=False)
+
+    def finish(self) -> str:
+        """남은 청크를 그리고 전체 텍스트를 반환"""
+        self.finished_at = time.perf_counter()
+        if self._parts:
+            self._flush(self.finished_at, final=True)
+        return self.text
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def ttft(self):
+        """첫 토큰까지 걸린 시간 (초)"""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """초당 토큰 수 (스트림 청크 1개 ≈ 토큰 1개)"""
+        if self.first_token_at is None:
+            return 0.0
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.first_token_at
+        return self.chunk_count / elapsed if elapsed > 0 else float(self.chunk_count)
+
+    def stats(self) -> dict:
+        return {
+            "ttft": self.ttft,
+            "tokens_per_sec": self.tokens_per_sec,
+            "chunks": self.chunk_count,
+            "flushes": self.flush_count,
+            "chars": sum(len(part) for part in self._parts),
+        }
+
+    def _flush(self, now, final):
+        if len(self._parts) > 1:
+            # 다음 join이 짧아지도록 지금까지의 청크를 하나로 합쳐 둠
+            self._parts = ["".join(self._parts)]
+        self._pending_chars = 0
+        self._last_flush = now
+        self.flush_count += 1
+        if self.placeholder is not None:
+            self.placeholder.markdown(self._parts[0] if final else self._parts[0] + self.cursor)
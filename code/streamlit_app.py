@@ -13,7 +13,13 @@ from typing import List, Dict, Any
 
 # OpenAI API 호환성 문제 해결
 try:
-    from openai import OpenAI
+    from openai_client import get_openai_client, connection_stats
+    from conversation_memory import ConversationMemory, make_llm_summarizer
+    from response_cache import response_cache
+    from llm_telemetry import track
+    from rate_limiter import QueueTimeout, scheduler, show_queue_position
+    from stream_renderer import StreamRenderer
+    from prompt_registry import registry as prompt_registry
     OPENAI_NEW_API = True
 except ImportError:
     st.error("❌ openai 패키지가 설치되지 않았습니다.")
@@ -44,22 +50,16 @@ def load_api_key() -> bool:
         if not api_key or api_key == "your_api_key_here":
             return False
         
-        # OpenAI 클라이언트 초기화
-        st.session_state.client = OpenAI(api_key=api_key)
+        # 공용 OpenAI 클라이언트 (모든 세션이 연결 풀을 같이 사용, 호출마다 지연 시간/토큰 기록)
+        st.session_state.client = track(get_openai_client(api_key), "streamlit_app", "chat")
         return True
         
     except Exception as e:
         st.error(f"❌ API 키 로드 실패: {e}")
         return False
 
-def get_ai_response(message: str, model: str = "gpt-3.5-turbo", max_tokens: int = 1000) -> str:
-    """AI 응답 생성"""
-    if not st.session_state.client:
-        return "❌ OpenAI 클라이언트가 초기화되지 않았습니다."
-    
-    try:
-        # 시스템 프롬프트
-        system_prompt = """당신은 제주도 고등학교 교사들을 위한 AI 어시스턴트입니다.
+# 고정 시스템 프롬프트 (한 번만 정리/해시, 매 턴 같은 앞부분이라 프롬프트 캐시 대상)
+SYSTEM_PROMPT = prompt_registry.register("jeju_teacher_assistant", """당신은 제주도 고등학교 교사들을 위한 AI 어시스턴트입니다.
 
 주요 역할:
 - 수업 계획 및 자료 제작 지원
@@ -75,32 +75,99 @@ def get_ai_response(message: str, model: str = "gpt-3.5-turbo", max_tokens: int
 - 역사 이해: 제주도의 역사와 특성
 
 항상 친근하고 도움이 되는 톤으로 응답하며, 
-구체적이고 실용적인 조언을 제공하세요."""
+구체적이고 실용적인 조언을 제공하세요.""")
 
-        # 메시지 준비
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # 대화 기록 추가 (최근 10개)
-        for msg in st.session_state.messages[-10:]:
-            messages.append({"role": msg["role"], "content": msg["content"]})
+CANCELLED_NOTE = "⏹️ *(응답이 중단되었습니다)*"
+
+def prepare_messages(message: str) -> list:
+    """API에 보낼 메시지 준비 (시스템 프롬프트 + 대화 메모리)"""
+    # 대화 메모리 (토큰 예산 안에서 최근 대화 + 이전 대화 요약)
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory(
+            max_tokens=3000,
+            summarize=make_llm_summarizer(st.session_state.client.with_prompt_type("summary")),
+        )
+    
+    # 사용자 메시지가 아직 대화 기록에 없으면 추가
+    history = st.session_state.messages
+    if not history or history[-1] != {"role": "user", "content": message}:
+        history = history + [{"role": "user", "content": message}]
+    
+    # 고정 프롬프트 → 이전 대화 요약 → 최근 대화 순서 (앞부분이 매번 같아야 캐시됨)
+    return st.session_state.memory.build(history, system_prompt=SYSTEM_PROMPT.text)
+
+def stream_ai_response(message: str, model: str = "gpt-3.5-turbo", max_tokens: int = 1000) -> str:
+    """AI 응답을 현재 말풍선에 스트리밍으로 그리고, 대화 기록에 추가한 뒤 반환
+    
+    중단 버튼을 누르면 Streamlit이 스크립트를 다시 실행하면서 반복문이 끊기고,
+    finally에서 HTTP 스트림을 닫으므로 더 이상 토큰이 생성되지 않습니다.
+    그때까지 받은 부분은 중단 표시와 함께 대화 기록에 남깁니다.
+    """
+    if not st.session_state.client:
+        answer = "❌ OpenAI 클라이언트가 초기화되지 않았습니다."
+        st.markdown(answer)
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        return answer
+    
+    stop_box = st.empty()
+    queue_box = st.empty()
+    renderer = StreamRenderer(st.empty())
+    answer, stream = None, None
+    try:
+        messages = prepare_messages(message)
         
-        # 사용자 메시지 추가
-        messages.append({"role": "user", "content": message})
+        # 같은 조건의 질문에 대한 응답이 캐시에 있으면 바로 표시
+        temperature = 0.7
+        cached = response_cache.get(model, messages, temperature, max_tokens)
+        if cached is not None:
+            renderer.write(cached)
+            answer = renderer.finish()
+            return answer
         
-        # OpenAI API 호출
-        response = st.session_state.client.chat.completions.create(
+        # OpenAI API 스트리밍 호출 (요청이 몰리면 차례를 기다리며 대기 순서 표시)
+        stop_box.button("⏹️ 응답 중단", key="stop_stream")
+        renderer.placeholder.markdown(renderer.cursor)
+        client = st.session_state.client.with_on_wait(show_queue_position(queue_box))
+        stream = client.chat.completions.create(
             model=model,
             messages=messages,
             max_tokens=max_tokens,
-            temperature=0.7
+            temperature=temperature,
+            stream=True,
+            **SYSTEM_PROMPT.cache_options
         )
+        queue_box.empty()
+        for chunk in stream:
+            renderer.write(chunk.choices[0].delta.content)
+        answer = renderer.finish()
+        stop_box.empty()
         
-        return response.choices[0].message.content
+        response_cache.set(model, messages, temperature, max_tokens, answer,
+                           tokens=getattr(stream.usage, "total_tokens", 0) or 0)
+        return answer
         
+    except QueueTimeout as e:
+        answer = f"⏳ {e}"
     except Exception as e:
-        return f"❌ AI 응답 생성 실패: {e}"
+        if getattr(e, "status_code", None) == 429:
+            answer = "⏳ 지금 사용자가 많아 AI가 응답하지 못했습니다. 잠시 후 다시 질문해주세요."
+        else:
+            answer = f"❌ AI 응답 생성 실패: {e}"
+        if renderer.text:
+            answer = renderer.text + "\n\n" + answer
+    finally:
+        if stream is not None:
+            stream.close()  # 중단/오류 시 연결을 끊어 남은 토큰 생성을 멈춤 (다 받았으면 아무 일 없음)
+        if answer is None:
+            # 중단 버튼 등으로 스크립트가 멈춘 경우 (여기서는 화면 요소를 다시 그리지 않음)
+            answer = (renderer.text + "\n\n" if renderer.text else "") + CANCELLED_NOTE
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+    
+    # 오류 메시지 표시 (except에서 answer를 정한 경우만 여기까지 옴)
+    queue_box.empty()
+    stop_box.empty()
+    renderer.placeholder.markdown(answer)
+    return answer
 
 def main():
     """메인 함수"""
@@ -118,6 +185,22 @@ def main():
             st.stop()
         else:
             st.success("✅ OpenAI API 연결됨")
+            pool_stats = connection_stats.snapshot()
+            if pool_stats["requests"]:
+                st.caption(f"🔌 연결 재사용률 {pool_stats['reuse_rate'] * 100:.0f}% "
+                           f"(요청 {pool_stats['requests']}회 / 새 연결 {pool_stats['new_connections']}회)")
+            cache_stats = response_cache.stats()
+            if cache_stats["hits"] + cache_stats["misses"]:
+                st.caption(f"💾 응답 캐시 적중률 {cache_stats['hit_rate'] * 100:.0f}% "
+                           f"(적중 {cache_stats['hits']}회 / 절약 토큰 {cache_stats['saved_tokens']:,})")
+            prompt_cache_ratio = prompt_registry.cache_ratio(SYSTEM_PROMPT.name)
+            if prompt_cache_ratio is not None:
+                st.caption(f"🧊 프롬프트 캐시 {prompt_cache_ratio * 100:.0f}% "
+                           f"(입력 토큰 중 캐시된 비율, 시스템 프롬프트 {SYSTEM_PROMPT.tokens}토큰)")
+            queue_stats = scheduler.snapshot()
+            if queue_stats["queued"] or queue_stats["retries"]:
+                st.caption(f"🚦 대기 중인 요청 {queue_stats['queued']}건 "
+                           f"(세션 {queue_stats['sessions']}개 / 재시도 {queue_stats['retries']}회)")
         
         # 모델 선택
         model = st.selectbox(
@@ -167,16 +250,11 @@ def main():
             "학부모 상담 가이드를 만들어주세요"
         ]
         
+        # 누른 질문은 아래 채팅 영역에서 직접 입력한 질문과 같은 방식(스트리밍)으로 답변
+        quick_question = None
         for question in quick_questions:
             if st.button(question, key=f"quick_{question[:10]}"):
-                # 사용자 메시지 추가
-                st.session_state.messages.append({"role": "user", "content": question})
-                
-                # AI 응답 생성
-                ai_response = get_ai_response(question, model, max_tokens)
-                st.session_state.messages.append({"role": "assistant", "content": ai_response})
-                
-                st.rerun()
+                quick_question = question
     
     # 메인 채팅 영역
     st.subheader("💬 AI 어시스턴트와 대화하기")
@@ -186,8 +264,8 @@ def main():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
-    # 사용자 입력
-    if prompt := st.chat_input("메시지를 입력하세요..."):
+    # 사용자 입력 (또는 빠른 질문)
+    if prompt := st.chat_input("메시지를 입력하세요...") or quick_question:
         # 사용자 메시지 추가
         st.session_state.messages.append({"role": "user", "content": prompt})
         
@@ -195,14 +273,9 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # AI 응답 생성
+        # AI 응답을 받는 대로 표시 (대화 기록에도 추가됨)
         with st.chat_message("assistant"):
-            with st.spinner("🤖 AI가 응답을 생성하고 있습니다..."):
-                response = get_ai_response(prompt, model, max_tokens)
-                st.markdown(response)
-        
-        # AI 응답을 대화 기록에 추가
-        st.session_state.messages.append({"role": "assistant", "content": response})
+            stream_ai_response(prompt, model, max_tokens)
     
     # 대화 통계
     if st.session_state.messages:
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+구조화된(JSON) 응답 처리
+json.loads가 한 번 실패하면 모델 호출 한 번이 그대로 버려집니다.
+- JSON 모드(response_format)로 요청하고
+- 스트리밍 중에도 지금까지 받은 JSON을 부분적으로 파싱해 바로 보여주고
+- 코드 블록, 끝 쉼표, 잘린 괄호 같은 흔한 오류는 로컬에서 고치고
+- 분석 유형별 pydantic 스키마로 검증한 뒤
+- 잘못되었거나 빠진 필드만 다시 요청합니다.
+
+사용 예:
+    result = request_structured(client, messages, StudentJSONAnalysis,
+                                on_partial=lambda data: placeholder.json(data))
+    if result.ok:
+        st.json(result.data)
+"""
+
+import json
+import re
+from typing import Annotated, Dict, List
+
+from pydantic import BaseModel, BeforeValidator, ValidationError
+
+MODEL = "gpt-4o-mini"
+MAX_REASKS = 1  # 잘못된 필드를 다시 요청하는 최대 횟수
+
+_LINE_COMMENT = re.compile(r"^\s*//.*$", re.MULTILINE)
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+# ---------------------------------------------------------------- 로컬 복구
+def _extract_object(text: str) -> str:
+    """코드 블록/앞뒤 설명을 떼고 첫 '{'부터 마지막 '}'까지 남김"""
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    if text.rstrip().endswith("```"):
+        text = text.rstrip()[:-3]
+    start = text.find("{")
+    if start == -1:
+        return text.strip()
+    end = text.rfind("}")
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def close_json(text: str) -> str:
+    """잘린 JSON의 열린 문자열/괄호를 닫아 줌 (스트리밍 중인 응답, max_tokens로 잘린 응답)"""
+    stack = []  # [닫는 괄호, 객체에서 다음에 키가 올 차례인지]
+    in_string = False
+    escaped = False
+    key_start = None  # 마지막으로 시작한 키의 위치
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            if stack and stack[-1][0] == "}" and stack[-1][1]:
+                key_start = i
+        elif char == "{":
+            stack.append(["}", True])
+        elif char == "[":
+            stack.append(["]", False])
+        elif char in "}]":
+            if stack:
+                stack.pop()
+        elif char == ":" and stack and stack[-1][0] == "}":
+            stack[-1][1] = False
+        elif char == "," and stack and stack[-1][0] == "}":
+            stack[-1][1] = True
+
+    closed = text
+    expecting_key = bool(stack) and stack[-1][0] == "}" and stack[-1][1]
+    if expecting_key and key_start is not None and (in_string or text.rstrip().endswith('"')):
+        # 값 없이 키만 온 경우 그 키를 버림
+        closed = text[:key_start]
+    elif in_string:
+        closed += ("\\" if escaped else "") + '"'
+    closed = closed.rstrip()
+    if closed.endswith(":"):
+        closed = re.sub(r'"(?:[^"\\]|\\.)*"\s*:$', "", closed).rstrip()
+    closed = re.sub(r",\s*$", "", closed)
+    return closed + "".join(closer for closer, _ in reversed(stack))
+
+
+def _fix_tokens(text: str) -> str:
+    """문자열 밖에서만 파이썬 값(True/False/None)을 JSON 값으로 바꾸고 끝 쉼표를 지움 (답변 글은 그대로)"""
+    out = []
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                i += 1
+                continue
+        elif char.isalpha() or char == "_":
+            end = i
+            while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[i:end]
+            out.append(_PY_LITERALS.get(word, word))
+            i = end
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _straighten_quotes(text: str) -> str:
+    """따옴표 대신 쓴 “ ”만 "로 바꿈 (" "로 감싼 답변 글 안의 “ ”는 그대로)"""
+    out = []
+    closer = None  # 열린 문자열을 닫는 따옴표들
+    escaped = False
+    for char in text:
+        if closer is None:
+            if char in '"“”':
+                closer = '"' if char == '"' else '"“”'
+                char = '"'
+        elif escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in closer:
+            closer = None
+            char = '"'
+        out.append(char)
+    return "".join(out)
+
+
+def repair_json(text: str) -> str:
+    """흔한 JSON 오류를 로컬에서 수정한 문자열"""
+    fixed = _extract_object(text)
+    fixed = _straighten_quotes(fixed)
+    fixed = _LINE_COMMENT.sub("", fixed)
+    return _fix_tokens(close_json(fixed))
+
+
+def parse_json(text: str):
+    """JSON 파싱. 실패하면 로컬 복구 후 다시 시도하고, 그래도 안 되면 None"""
+    try:
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError:
+        return None
+
+
+class IncrementalJSONParser:
+    """스트리밍으로 받은 조각을 이어 붙이며 지금까지의 JSON을 부분 파싱"""
+
+    def __init__(self):
+        self._parts = []
+        self.partial = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str):
+        """조각 추가. 새로 파싱된 내용이 있으면 부분 객체, 없으면 None 반환"""
+        if not chunk:
+            return None
+        self._parts.append(chunk)
+        # 값이 끝날 수 있는 문자가 올 때만 다시 파싱
+        if not any(char in chunk for char in ',}]"'):
+            return None
+        text = self.text
+        start = text.find("{")
+        if start == -1:
+            return None
+        try:
+            partial = json.loads(close_json(text[start:]))
+        except json.JSONDecodeError:
+            return None
+        if partial != self.partial:
+            self.partial = partial
+            return partial
+        return None
+
+
+# ---------------------------------------------------------------- 스키마
+def _as_list(value):
+    """문자열 하나로 온 목록은 한 항목짜리 목록으로"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items()]
+    if not isinstance(value, (list, tuple)):
+        return value  # 숫자 등은 그대로 두어 검증 오류로 처리
+    return [item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) for item in value]
+
+
+def _as_text(value):
+    """목록/객체로 온 설명은 줄글로"""
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return "\n".join(f"{key}: {item}" for key, item in value.items())
+    return value if value is None else str(value)
+
+
+def _as_text_dict(value):
+    if isinstance(value, dict):
+        return {str(key): _as_text(item) for key, item in value.items()}
+    return value
+
+
+TextList = Annotated[List[str], BeforeValidator(_as_list)]
+Text = Annotated[str, BeforeValidator(_as_text)]
+TextDict = Annotated[Dict[str, str], BeforeValidator(_as_text_dict)]
+
+
+# 02강 JSON 응답 탭
+class StudentAnalysisDetail(BaseModel):
+    overall_performance: Text
+    strengths: TextList
+    weaknesses: TextList
+    recommendations: TextList
+    personality_insights: Text
+
+
+class StudyPlan(BaseModel):
+    priority_subjects: TextList
+    weekly_hours: Text
+    learning_methods: TextList
+
+
+class StudentJSONAnalysis(BaseModel):
+    analysis: StudentAnalysisDetail
+    study_plan: StudyPlan
+
+
+# 02강 조건부 역할 탭
+class ConditionalRole(BaseModel):
+    role: Text
+    mood: Text
+    message: Text
+    action_plan: TextList
+    encouragement: Text
+
+
+# 03강 AI 개인 분석 (batch_analysis.STUDENT_PROMPTS와 같은 필드)
+class OverallAnalysis(BaseModel):
+    overall_assessment: Text
+    strengths: TextList
+    weaknesses: TextList
+    patterns: TextList
+    summary: Text
+
+
+class LearningStyleAnalysis(BaseModel):
+    learning_style_analysis: Text
+    personality_insights: Text
+    current_methods: Text
+    improvement_suggestions: TextList
+
+
+class ImprovementPlan(BaseModel):
+    subject_improvements: TextDict
+    time_optimization: Text
+    motivation_strategies: TextList
+    monitoring_plan: Text
+
+
+class PersonalizedPlan(BaseModel):
+    personalized_strategy: Text
+    weekly_plan: Text
+    monthly_goals: Text
+    achievement_methods: TextList
+
+
+# 03강 AI 교육 전략 (학급 전체)
+class ClassScoreDistribution(BaseModel):
+    subject_analysis: TextDict
+    performance_gaps: Text
+    class_strengths: TextList
+    class_weaknesses: TextList
+    educational_insights: TextList
+
+
+class ClassLearningStyles(BaseModel):
+    learning_style_distribution: Text
+    personality_correlations: Text
+    diverse_teaching_methods: TextList
+    individual_attention: Text
+
+
+class ClassPriorities(BaseModel):
+    subject_priorities: TextList
+    student_group_strategies: Text
+    short_term_goals: TextList
+    long_term_goals: TextList
+    implementation_plan: Text
+
+
+class ClassStrategy(BaseModel):
+    overall_education_direction: Text
+    subject_teaching_improvements: Text
+    student_engagement_strategies: TextList
+    motivation_enhancement: Text
+    monitoring_and_evaluation: Text
+
+
+STUDENT_ANALYSIS_SCHEMAS = {
+    "전체 성적 분석": OverallAnalysis,
+    "학습 스타일 분석": LearningStyleAnalysis,
+    "개선 방안 제시": ImprovementPlan,
+    "맞춤형 학습 계획": PersonalizedPlan,
+}
+CLASS_ANALYSIS_SCHEMAS = {
+    "성적 분포 분석": ClassScoreDistribution,
+    "학습 스타일 분포": ClassLearningStyles,
+    "개선 우선순위": ClassPriorities,
+    "교육 전략 수립": ClassStrategy,
+}
+
+
+# ---------------------------------------------------------------- 검증 / 요청
+def _error_path(schema, loc) -> str:
+    """검증 오류 위치를 스키마 필드 경로로 (예: "analysis.strengths", 목록 항목 번호는 버림)"""
+    path = []
+    model = schema
+    for part in loc:
+        if model is None or part not in model.model_fields:
+            break
+        path.append(part)
+        annotation = model.model_fields[part].annotation
+        model = annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+    return ".".join(path)
+
+
+def validate(data, schema):
+    """스키마 검증. (검증된 dict 또는 None, 잘못된 필드 경로 목록) 반환"""
+    if not isinstance(data, dict):
+        return None, list(schema.model_fields)
+    try:
+        return schema.model_validate(data).model_dump(), []
+    except ValidationError as e:
+        fields = []
+        for error in e.errors():
+            field = _error_path(schema, error["loc"])
+            if field and field not in fields:
+                fields.append(field)
+        # 상위 객체 전체가 잘못되었으면 그 안의 필드는 따로 묻지 않음
+        fields = [field for field in fields
+                  if not any(field.startswith(other + ".") for other in fields)]
+        return None, fields or list(schema.model_fields)
+
+
+class StructuredResult:
+    """구조화된 응답 결과"""
+
+    def __init__(self, data, raw: str, repaired: bool, reasks: int, invalid_fields: list):
+        self.data = data                      # 검증된 dict (실패하면 복구한 만큼의 dict 또는 None)
+        self.raw = raw                        # 모델의 첫 응답 원문
+        self.repaired = repaired              # 로컬 복구를 거쳤는지
+        self.reasks = reasks                  # 필드를 다시 요청한 횟수
+        self.invalid_fields = invalid_fields  # 끝내 고치지 못한 필드
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None and not self.invalid_fields
+
+    def notes(self) -> str:
+        """화면에 표시할 처리 내역 (복구/재요청이 없었으면 빈 문자열)"""
+        notes = []
+        if self.repaired:
+            notes.append("🔧 형식 오류를 자동으로 고쳤습니다")
+        if self.reasks:
+            notes.append(f"🔁 잘못된 필드를 {self.reasks}번 다시 요청했습니다")
+        if self.invalid_fields:
+            notes.append(f"⚠️ 확인이 필요한 필드: {', '.join(self.invalid_fields)}")
+        return " · ".join(notes)
+
+
+def _create(client, stream: bool, **kwargs):
+    """JSON 모드로 요청하고, 모델이 지원하지 않으면 일반 모드로 다시 요청"""
+    try:
+        return client.chat.completions.create(response_format={"type": "json_object"}, stream=stream, **kwargs)
+    except Exception as e:
+        if "response_format" not in str(e):
+            raise
+        return client.chat.completions.create(stream=stream, **kwargs)
+
+
+def _complete(client, messages, model, temperature, max_tokens, on_partial=None) -> str:
+    kwargs = dict(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens)
+    if on_partial is None:
+        return _create(client, False, **kwargs).choices[0].message.content or ""
+
+    parser = IncrementalJSONParser()
+    response = _create(client, True, **kwargs)
+    try:
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            partial = parser.feed(chunk.choices[0].delta.content)
+            if partial is not None:
+                on_partial(partial)
+    finally:
+        close = getattr(response, "close", None)
+        if close:
+            close()
+    return parser.text
+
+
+def _inline_refs(node, defs: dict):
+    """JSON 스키마의 $ref를 $defs의 실제 정의로 바꿈 (모델이 참조를 따라갈 수 없으므로)"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs.get(node["$ref"].rsplit("/", 1)[-1], {}), defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items() if key != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+
+def _field_spec(schema, fields: list) -> str:
+    """다시 요청할 필드 경로만 원래 JSON 구조대로 담은 형식 설명"""
+    json_schema = schema.model_json_schema()
+    properties = _inline_refs(json_schema.get("properties", {}), json_schema.get("$defs", {}))
+    spec = {}
+    for field in fields:
+        *parents, name = field.split(".")
+        node, props = spec, properties
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            props = props.get(parent, {}).get("properties", {})
+        node[name] = props.get(name, {})
+    return json.dumps(spec, ensure_ascii=False)
+
+
+def _get_path(data, field: str):
+    for part in field.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def _merge_fields(data: dict, fix: dict, fields: list) -> dict:
+    """다시 받은 필드만 원래 결과의 같은 경로에 넣음 (맞게 온 나머지 필드는 그대로)"""
+    merged = dict(data)
+    for field in fields:
+        value = _get_path(fix, field)
+        if value is None:
+            value = fix.get(field)  # "analysis.strengths"처럼 경로를 키로 답한 경우
+        if value is None:
+            continue
+        *parents, name = field.split(".")
+        node = merged
+        for parent in parents:
+            child = node.get(parent)
+            node[parent] = dict(child) if isinstance(child, dict) else {}
+            node = node[parent]
+        node[name] = value
+    return merged
+
+
+def request_structured(client, messages: list, schema, model: str = MODEL, temperature: float = 0.3,
+                       max_tokens: int = 800, on_partial=None, max_reasks: int = MAX_REASKS) -> StructuredResult:
+    """JSON 응답을 요청해 복구/검증하고, 잘못된 필드만 다시 요청
+
+    on_partial(dict): 스트리밍 중 새 필드가 도착할 때마다 호출 (None이면 스트리밍하지 않음)
+    """
+    raw = _complete(client, messages, model, temperature, max_tokens, on_partial)
+    try:
+        data = json.loads(raw)
+        repaired = False
+    except json.JSONDecodeError:
+        data = parse_json(raw)
+        repaired = data is not None
+    if not isinstance(data, dict):
+        data = {}
+
+    validated, invalid_fields = validate(data, schema)
+    reasks = 0
+    while invalid_fields and reasks < max_reasks:
+        reasks += 1
+        # 이미 맞는 필드는 두고, 잘못되었거나 빠진 필드만 다시 요청
+        reask_messages = messages + [
+            {"role": "assistant", "content": raw},
+            {"role": "user", "content": (
+                f"위 응답에서 다음 필드가 빠졌거나 형식이 잘못되었습니다: {', '.join(invalid_fields)}\n"
+                f"이 필드들만 원래 구조 그대로 담은 JSON 객체로 다시 응답하세요. 필드 형식: {_field_spec(schema, invalid_fields)}"
+            )},
+        ]
+        fix = parse_json(_complete(client, reask_messages, model, temperature, max_tokens))
+        if isinstance(fix, dict):
+            data = _merge_fields(data, fix, invalid_fields)
+        validated, invalid_fields = validate(data, schema)
+
+    return StructuredResult(validated if validated is not None else (data or None),
+                            raw, repaired, reasks, invalid_fields)
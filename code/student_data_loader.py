@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+학생 데이터 로더
+pd.read_excel(openpyxl)은 느려서 Streamlit에서 슬라이더만 움직여도 매번 몇 초씩 걸립니다.
+- 파일 내용의 해시로 읽은 표를 메모리에 캐시하고
+- 처음 한 번만 엑셀을 읽어 Parquet(없으면 pickle) 캐시로 바꿔 두고
+- 업로드한 파일이 이미 저장된 파일과 같으면 다시 쓰지 않습니다.
+
+기본 파일 위치는 STUDENT_DATA_PATH 환경 변수로 바꿀 수 있습니다.
+
+사용 예:
+    df, stats = load_student_file()
+    print(stats)  # {'source': 'disk', 'seconds': 0.004, 'rows': 20, 'hash': '...'}
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet 캐시용, 없으면 pickle 사용)
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pkl"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.getenv("STUDENT_DATA_PATH", os.path.join(BASE_DIR, "student_data.xlsx"))
+CACHE_DIR = os.path.join(BASE_DIR, ".cache", "student_data")
+MAX_MEMORY_FRAMES = 8  # 메모리에 들고 있을 표 개수
+
+_frames = OrderedDict()  # 해시 -> DataFrame
+_file_hashes = {}        # 경로 -> (수정 시각, 크기, 해시)
+_lock = threading.Lock()
+
+
+def content_hash(data: bytes) -> str:
+    """파일 내용의 SHA-256 해시"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """파일 해시 (수정 시각과 크기가 같으면 다시 읽지 않음)"""
+    stat = os.stat(path)
+    cached = _file_hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        digest = content_hash(f.read())
+    _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def _parse(data: bytes, name: str) -> pd.DataFrame:
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(data))
+    return pd.read_excel(io.BytesIO(data), engine="openpyxl" if name.lower().endswith(".xlsx") else None)
+
+
+def _cache_path(digest: str) -> str:
+    return os.path.join(CACHE_DIR, f"{digest}.{CACHE_FORMAT}")
+
+
+def _read_cache(digest: str):
+    path = _cache_path(digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path) if CACHE_FORMAT == "parquet" else pd.read_pickle(path)
+    except Exception:
+        # 깨진 캐시는 지우고 원본에서 다시 읽음
+        os.remove(path)
+        return None
+
+
+def _write_cache(digest: str, df: pd.DataFrame):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(digest) + f".{os.getpid()}.tmp"
+        if CACHE_FORMAT == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, _cache_path(digest))
+    except Exception as e:
+        # 열 타입이 섞여 있어 Parquet로 못 쓰는 경우 등은 메모리 캐시만 사용
+        print(f"⚠️ 학생 데이터 캐시 저장 실패: {e}")
+
+
+def _remember(digest: str, df: pd.DataFrame):
+    _frames[digest] = df
+    _frames.move_to_end(digest)
+    while len(_frames) > MAX_MEMORY_FRAMES:
+        _frames.popitem(last=False)
+
+
+def load_frame(data: bytes, name: str, digest: str = None) -> tuple:
+    """파일 내용(bytes)을 표로 읽음. (DataFrame, 통계) 반환
+
+    통계의 source: memory(메모리 캐시) / disk(Parquet·pickle 캐시) / file(엑셀·CSV 원본)
+    """
+    started = time.perf_counter()
+    digest = digest or content_hash(data)
+    with _lock:
+        df = _frames.get(digest)
+        source = "memory"
+        if df is not None:
+            _frames.move_to_end(digest)
+        else:
+            df = _read_cache(digest)
+            source = "disk"
+            if df is None:
+                df = _parse(data, name)
+                source = "file"
+                _write_cache(digest, df)
+            _remember(digest, df)
+    stats = {
+        "source": source,
+        "seconds": round(time.perf_counter() - started, 4),
+        "rows": len(df),
+        "hash": digest,
+    }
+    # 호출한 쪽에서 값을 바꿔도 캐시는 그대로 유지되도록 복사본을 반환
+    return df.copy(), stats
+
+
+def load_student_file(path: str = DEFAULT_PATH) -> tuple:
+    """저장된 학생 데이터 파일 읽기. 파일이 없으면 FileNotFoundError"""
+    digest = file_hash(path)
+    with _lock:
+        cached = digest in _frames or os.path.exists(_cache_path(digest))
+    if cached:
+        # 캐시가 있으면 원본 파일 내용은 읽을 필요가 없음 (캐시가 깨졌으면 아래에서 원본을 읽음)
+        try:
+            return load_frame(b"", os.path.basename(path), digest)
+        except Exception:
+            pass
+    with open(path, "rb") as f:
+        return load_frame(f.read(), os.path.basename(path), digest)
+
+
+def load_uploaded_file(uploaded_file) -> tuple:
+    """st.file_uploader로 올린 파일 읽기"""
+    return load_frame(uploaded_file.getvalue(), uploaded_file.name)
+
+
+def save_student_file(data: bytes, name: str, df: pd.DataFrame = None, path: str = DEFAULT_PATH) -> bool:
+    """업로드한 파일을 기본 위치에 저장. 이미 같은 내용이면 쓰지 않고 False 반환
+
+    .xlsx는 올린 내용을 그대로 쓰고, 다른 형식은 표(df)를 엑셀로 변환해 저장합니다.
+    """
+    digest = content_hash(data)
+    if name.lower().endswith(".xlsx"):
+        if os.path.exists(path) and file_hash(path) == digest:
+            return False
+        with open(path, "wb") as f:
+            f.write(data)
+        return True
+
+    # 변환해서 저장한 경우 원본 해시를 따로 기록해 두고 비교
+    marker = os.path.join(CACHE_DIR, content_hash(os.path.abspath(path).encode("utf-8"))[:16] + ".source")
+    if os.path.exists(path) and os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if f.read().strip() == f"{digest}:{file_hash(path)}":
+                return False
+    if df is None:
+        df, _ = load_frame(data, name, digest)
+    df.to_excel(path, index=False, engine="openpyxl")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(marker, "w", encoding="utf-8") as f:
+        f.write(f"{digest}:{file_hash(path)}")
+    return True
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+학생 조회 저장소
+df[df['student_id'] == x]처럼 찾을 때마다 전체 표를 훑으면
+학생이 수천 명일 때 selectbox의 format_func만으로도 화면이 멈춥니다.
+데이터를 불러올 때 한 번만 학번/이름 색인과 표시용 이름을 만들어 두고
+학생 한 명은 바로(O(1)) 꺼내 씁니다.
+
+사용 예:
+    repo = get_repository(df)
+    st.selectbox("학생", repo.ids, format_func=repo.label)
+    student_data = repo.get(selected_id)
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+MAX_REPOSITORIES = 8  # 데이터별로 만들어 둘 저장소 개수
+
+_repositories = OrderedDict()  # 데이터 지문 -> StudentRepository
+_lock = threading.Lock()
+
+
+class StudentRepository:
+    """학번 → 행 번호, 이름 → 학번 목록, 학번 → 표시 이름 색인"""
+
+    def __init__(self, df: pd.DataFrame, id_column: str = "student_id", name_column: str = "name"):
+        self.df = df.reset_index(drop=True)
+        has_ids = id_column in self.df
+        has_names = name_column in self.df
+
+        # 학번 열이 없으면 행 번호를 학번으로 사용
+        self.ids = self.df[id_column].tolist() if has_ids else list(range(len(self.df)))
+        names = self.df[name_column].astype(str).tolist() if has_names else [f"학생 {i + 1}" for i in range(len(self.df))]
+
+        self._positions = {student_id: pos for pos, student_id in enumerate(self.ids)}
+        self._names = dict(zip(self.ids, names))
+        self._labels = {
+            student_id: f"{name} ({student_id})" if has_ids else name
+            for student_id, name in zip(self.ids, names)
+        }
+        self._by_name = {}
+        for student_id, name in zip(self.ids, names):
+            self._by_name.setdefault(name, []).append(student_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, student_id):
+        return student_id in self._positions
+
+    def position(self, student_id) -> int:
+        """학번 → 행 번호"""
+        return self._positions[student_id]
+
+    def get(self, student_id) -> pd.Series:
+        """학번으로 학생 한 명의 행 조회"""
+        return self.df.iloc[self._positions[student_id]]
+
+    def record(self, student_id) -> dict:
+        """학번으로 학생 정보를 dict로 조회"""
+        return self.get(student_id).to_dict()
+
+    def name(self, student_id) -> str:
+        return self._names[student_id]
+
+    def label(self, student_id) -> str:
+        """selectbox 등에 표시할 이름 (예: '김민수 (S001)')"""
+        return self._labels[student_id]
+
+    def find_by_name(self, name: str) -> list:
+        """이름으로 학번 목록 조회 (동명이인 포함)"""
+        return list(self._by_name.get(name, []))
+
+
+def _fingerprint(df: pd.DataFrame) -> tuple:
+    """표 내용이 같으면 같은 값 (행마다 해시를 벡터로 계산)"""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (tuple(df.columns), len(df), int(row_hashes.sum()), int((row_hashes * 31).sum()))
+
+
+def get_repository(df: pd.DataFrame, id_column: str = "student_id", name_column: str = "name") -> StudentRepository:
+    """같은 데이터에 대해서는 한 번 만든 저장소를 다시 사용 (페이지/세션 공용)"""
+    key = (_fingerprint(df), id_column, name_column)
+    with _lock:
+        repo = _repositories.get(key)
+        if repo is not None:
+            _repositories.move_to_end(key)
+            return repo
+    repo = StudentRepository(df, id_column, name_column)
+    with _lock:
+        _repositories[key] = repo
+        while len(_repositories) > MAX_REPOSITORIES:
+            _repositories.popitem(last=False)
+    return repo
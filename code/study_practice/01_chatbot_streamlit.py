@@ -1,7 +1,15 @@
 import streamlit as st
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
+import sys
+
+# code/ 폴더의 공용 모듈 사용
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai_client import get_openai_client
+from conversation_memory import ConversationMemory, make_llm_summarizer
+from llm_telemetry import track
+from prompt_registry import registry as prompt_registry
+from rate_limiter import show_queue_position
 
 load_dotenv()
 
@@ -30,7 +38,7 @@ if prompt := st.chat_input():
         st.info("Please add your OpenAI API key to continue.")
         st.stop()
 
-    client = OpenAI(api_key=openai_api_key)
+    client = track(get_openai_client(openai_api_key), "01_chatbot_streamlit", "chat") # 공용 클라이언트 (연결 재사용, 호출 기록)
     st.session_state.messages.append({"role": "user", "content": prompt}) 
     st.chat_message("user").write(prompt) 
     
@@ -61,13 +69,24 @@ if prompt := st.chat_input():
                     - 친근하고 전문적인 톤
                     - 부산인력개발원의 가치와 미션을 반영한 응답"""
 
-    response = client.chat.completions.create(
+    # 시스템 메시지는 처음 한 번만 정리/해시하고, 매 턴 맨 앞에 같은 글자로 보내 프롬프트 캐시를 받음
+    system_prompt = prompt_registry.register("busan_hrd_counselor", system_message)
+
+    # 대화가 길어져도 토큰 예산 안에서만 보내도록 대화 메모리 사용
+    if "memory" not in st.session_state:
+        st.session_state["memory"] = ConversationMemory(
+            max_tokens=3000, summarize=make_llm_summarizer(client.with_prompt_type("summary"))
+        )
+
+    queue_box = st.empty()  # 요청이 몰리면 대기 순서 표시
+    response = client.with_on_wait(show_queue_position(queue_box)).chat.completions.create(
         model="gpt-4o-mini", 
-        messages=[
-            {"role": "system", "content": system_message},
-            *st.session_state.messages
-        ]
+        messages=st.session_state.memory.build(
+            st.session_state.messages, system_prompt=system_prompt.text
+        ),
+        **system_prompt.cache_options
     ) 
+    queue_box.empty()
     msg = response.choices[0].message.content
     st.session_state.messages.append({"role": "assistant", "content": msg}) 
     st.chat_message("assistant").write(msg)
\ No newline at end of file
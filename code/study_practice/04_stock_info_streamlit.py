@@ -1,15 +1,23 @@
-from gpt_functions import get_current_time, tools, get_yf_stock_info, get_yf_stock_history, get_yf_stock_recommendations
-from openai import OpenAI
+from gpt_functions import tools, registry
+from yf_cache import yf_cache
+from tool_executor import execute_tool_calls
 from dotenv import load_dotenv
 import os
-import json
 import streamlit as st
+import sys
 from collections import defaultdict
 
+# code/ 폴더의 공용 모듈 사용
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stream_renderer import StreamRenderer
+from openai_client import get_openai_client
+from conversation_memory import ConversationMemory, make_llm_summarizer
+from llm_telemetry import track
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
-client = OpenAI(api_key=api_key)
+client = track(get_openai_client(api_key), "04_stock_info_streamlit", "tool_loop")  # 호출마다 지연 시간/토큰 기록
 
 def tool_list_to_tool_obj(tool_calls_chunk):
     """tool_calls_chunk를 올바른 형태로 변환하는 함수"""
@@ -59,12 +67,42 @@ def get_ai_response(messages, tools=None, stream=True):
 
 st.title("🔺 주식 투자 상담사") 
 
+# 사이드바: yfinance 캐시 현황
+with st.sidebar:
+    cache_stats = yf_cache.stats()
+    st.subheader("🗄️ 주가 데이터 캐시")
+    st.metric("적중률", f"{cache_stats['hit_rate'] * 100:.0f}%")
+    st.caption(f"히트 {cache_stats['hits']} (디스크 {cache_stats['disk_hits']}) / 미스 {cache_stats['misses']}")
+
+    # 도구별 호출 통계
+    tool_stats = {name: stats for name, stats in registry.stats().items() if stats["calls"]}
+    if tool_stats:
+        st.subheader("🔧 도구 호출 통계")
+        st.dataframe(
+            [
+                {
+                    "도구": name,
+                    "호출": stats["calls"],
+                    "평균(ms)": round(stats["avg_latency"] * 1000),
+                    "오류율": f"{stats['error_rate'] * 100:.0f}%",
+                }
+                for name, stats in tool_stats.items()
+            ],
+            hide_index=True,
+        )
+
 # 초기 메시지 설정
 if "messages" not in st.session_state:
     st.session_state["messages"] = [
         {"role": "system", "content": "너는 사용자를 도와주는 주식 투자 상담사야."}
     ]
 
+# 대화 메모리 (지난 도구 결과는 줄이고, 오래된 대화는 요약)
+if "memory" not in st.session_state:
+    st.session_state["memory"] = ConversationMemory(
+        max_tokens=4000, summarize=make_llm_summarizer(client.with_prompt_type("summary"))
+    )
+
 # 대화 기록 출력
 for msg in st.session_state.messages:
     if msg["role"] in ["assistant", "user"]:
@@ -75,24 +113,23 @@ if user_input := st.chat_input():
     st.chat_message("user").write(user_input)
     
     # AI 응답 받기
-    ai_response = get_ai_response(st.session_state.messages, tools=tools)
+    ai_response = get_ai_response(st.session_state.memory.build(st.session_state.messages), tools=tools)
     
-    content = ''
     tool_calls_chunk = []
     
-    # 스트리밍 응답 처리
-    with st.chat_message("assistant").empty():
-        for chunk in ai_response:
-            # content 처리
-            if chunk.choices[0].delta.content:
-                content_chunk = chunk.choices[0].delta.content
-                print(content_chunk, end="")
-                content += content_chunk
-                st.markdown(content)
-            
-            # tool_calls 처리
-            if chunk.choices[0].delta.tool_calls:
-                tool_calls_chunk.extend(chunk.choices[0].delta.tool_calls)
+    # 스트리밍 응답 처리 (일정 간격으로만 화면 갱신)
+    renderer = StreamRenderer(st.chat_message("assistant").empty())
+    for chunk in ai_response:
+        # content 처리
+        if chunk.choices[0].delta.content:
+            content_chunk = chunk.choices[0].delta.content
+            print(content_chunk, end="")
+            renderer.write(content_chunk)
+        
+        # tool_calls 처리
+        if chunk.choices[0].delta.tool_calls:
+            tool_calls_chunk.extend(chunk.choices[0].delta.tool_calls)
+    content = renderer.finish()
 
     # tool_calls 처리
     if tool_calls_chunk:
@@ -103,50 +140,22 @@ if user_input := st.chat_input():
         for i, tool_call in enumerate(tool_calls):
             print(f"  {i+1}. {tool_call['function']['name']}: {tool_call['function']['arguments']}")
         
-        # 각 도구 실행
-        for tool_call in tool_calls:
-            tool_name = tool_call["function"]["name"]
-            tool_call_id = tool_call["id"]
-            
-            try:
-                arguments = json.loads(tool_call["function"]["arguments"])
-                
-                if tool_name == "get_current_time":
-                    func_result = get_current_time(timezone=arguments['timezone'])
-                elif tool_name == "get_yf_stock_info":
-                    func_result = get_yf_stock_info(ticker=arguments['ticker'])
-                elif tool_name == "get_yf_stock_history":
-                    func_result = get_yf_stock_history(
-                        ticker=arguments['ticker'], 
-                        period=arguments['period']
-                    )
-                elif tool_name == "get_yf_stock_recommendations":
-                    func_result = get_yf_stock_recommendations(
-                        ticker=arguments['ticker']
-                    )
-                else:
-                    func_result = f"알 수 없는 도구: {tool_name}"
-                
-                # 함수 실행 결과를 대화 기록에 추가
-                st.session_state.messages.append({
-                    "role": "function",
-                    "tool_call_id": tool_call_id,
-                    "name": tool_name,
-                    "content": func_result,
-                })
-                
-                print(f"✅ {tool_name} 실행 완료")
-                
-            except Exception as e:
-                print(f"❌ {tool_name} 실행 오류: {e}")
-                func_result = f"도구 실행 중 오류 발생: {e}"
-                
-                st.session_state.messages.append({
-                    "role": "function",
-                    "tool_call_id": tool_call_id,
-                    "name": tool_name,
-                    "content": func_result,
-                })
+        # 도구 동시 실행 (결과는 tool_call 순서 그대로)
+        tool_results = execute_tool_calls(tool_calls, registry.call)
+        
+        for result in tool_results:
+            # 함수 실행 결과를 대화 기록에 추가
+            st.session_state.messages.append({
+                "role": "function",
+                "tool_call_id": result["tool_call_id"],
+                "name": result["name"],
+                "content": result["content"],
+            })
+        
+        with st.expander(f"🔧 도구 실행 {len(tool_results)}개", expanded=False):
+            for result in tool_results:
+                status = "✅" if result["ok"] else "❌"
+                st.caption(f"{status} {result['name']}: {result['latency'] * 1000:.0f}ms")
 
         # 도구 실행 후 AI에게 다시 응답 요청
         st.session_state.messages.append({
@@ -154,16 +163,15 @@ if user_input := st.chat_input():
             "content": "이제 주어진 결과를 바탕으로 답변할 차례다."
         })
         
-        ai_response = get_ai_response(st.session_state.messages, tools=tools)
-        content = ""
+        ai_response = get_ai_response(st.session_state.memory.build(st.session_state.messages), tools=tools)
         
-        with st.chat_message("assistant").empty():
-            for chunk in ai_response:
-                if chunk.choices[0].delta.content:
-                    content_chunk = chunk.choices[0].delta.content
-                    print(content_chunk, end='')
-                    content += content_chunk
-                    st.markdown(content)
+        renderer = StreamRenderer(st.chat_message("assistant").empty())
+        for chunk in ai_response:
+            if chunk.choices[0].delta.content:
+                content_chunk = chunk.choices[0].delta.content
+                print(content_chunk, end='')
+                renderer.write(content_chunk)
+        content = renderer.finish()
 
     # 최종 응답을 대화 기록에 추가
     st.session_state.messages.append({
@@ -171,4 +179,7 @@ if user_input := st.chat_input():
         "content": content
     })
 
-    print(f"\n✅ AI 응답 완료: {len(content)}자")
\ No newline at end of file
+    stream_stats = renderer.stats()
+    if stream_stats["ttft"] is not None:
+        st.caption(f"⏱️ 첫 토큰 {stream_stats['ttft']:.2f}초 · {stream_stats['tokens_per_sec']:.0f} 토큰/초")
+    print(f"\n✅ AI 응답 완료: {len(content)}자 (화면 갱신 {stream_stats['flushes']}회)")
\ No newline at end of file
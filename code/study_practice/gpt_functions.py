@@ -1,7 +1,19 @@
 from datetime import datetime
+from typing import List
 import pytz
 import yfinance as yf
+from tool_registry import ToolRegistry
+from yf_cache import yf_cache, TTL_SECONDS, history_ttl
+from tool_payload import compact_info, compact_history, compact_table, compare_histories
 
+# 도구 레지스트리: 아래 함수들의 시그니처로 도구 스키마를 자동 생성
+registry = ToolRegistry()
+
+@registry.tool(
+    "해당 타임존의 날짜와 시간을 반환합니다.",
+    required=("timezone",),
+    timezone='현재 날짜와 시간을 반환할 타임존을 입력하세요. (예: Asia/Seoul)',
+)
 def get_current_time(timezone: str = 'Asia/Seoul'):
     tz = pytz.timezone(timezone) # 타임존 설정
     now = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
@@ -9,102 +21,121 @@ def get_current_time(timezone: str = 'Asia/Seoul'):
     print(now_timezone)
     return now_timezone
 
+@registry.tool(
+    "해당 종목의 Yahoo Finance 정보를 반환합니다.",
+    ticker='Yahoo Finance 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
+)
 def get_yf_stock_info(ticker: str):
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    print(info)
-    return str(info)
+    ticker = ticker.upper()
+    info = yf_cache.get_or_fetch(
+        f"info:{ticker}",
+        lambda: yf.Ticker(ticker).info,
+        ttl=TTL_SECONDS["info"],
+    )
+    info_json = compact_info(info) # 주요 필드만 골라 JSON으로 압축
+    print(info_json)
+    return info_json
 
+@registry.tool(
+    "해당 종목의 Yahoo Finance 주가 정보를 반환합니다.",
+    ticker='Yahoo Finance 주가 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
+    period='주가 정보를 조회할 기간을 입력하세요. (예: 1d, 5d, 1mo, 1y, 5y)',
+)
 def get_yf_stock_history(ticker: str, period: str):
-    stock = yf.Ticker(ticker)
-    history = stock.history(period=period)
-    history_md = history.to_markdown() # 데이터프레임을 마크다운 형식으로 변환
-    print(history_md)
-    return history_md
+    ticker = ticker.upper()
+    history = yf_cache.get_or_fetch(
+        f"history:{ticker}:{period}",
+        lambda: yf.Ticker(ticker).history(period=period),
+        ttl=history_ttl(),
+    )
+    history_csv = compact_history(history) # 기간 요약 + 구간 OHLC 봉으로 압축
+    print(history_csv)
+    return history_csv
+
+def _history_cache_key(ticker: str, period: str, interval: str = '1d'):
+    if interval == '1d':
+        return f"history:{ticker}:{period}" # get_yf_stock_history와 같은 캐시 공유
+    return f"history:{ticker}:{period}:{interval}"
+
+def _split_download(data, tickers: List[str]):
+    """yf.download 결과를 {티커: DataFrame}으로 나눔
+    열이 한 단계뿐인데 요청한 종목이 여럿이면 어느 종목인지 알 수 없으므로 None 반환
+    """
+    if data is None or data.empty:
+        return {}
+    if data.columns.nlevels > 1:
+        # group_by='ticker'면 첫 단계가 티커 (받지 못한 종목은 열이 없음)
+        available = set(data.columns.get_level_values(0))
+        return {ticker: data[ticker] for ticker in tickers if ticker in available}
+    if len(tickers) == 1:
+        return {tickers[0]: data}
+    return None
+
+@registry.tool(
+    "여러 종목의 Yahoo Finance 주가 정보를 한 번에 조회하고 수익률, 변동성 등을 비교합니다. 두 종목 이상을 비교할 때 사용하세요.",
+    tickers='주가 정보를 조회할 종목 티커 목록을 입력하세요. (예: ["AAPL", "MSFT", "NVDA"])',
+    period='주가 정보를 조회할 기간을 입력하세요. (예: 1d, 5d, 1mo, 1y, 5y)',
+    interval='주가 간격을 입력하세요. 기본값은 1d입니다. (예: 1h, 1d, 1wk)',
+)
+def get_yf_stock_history_batch(tickers: List[str], period: str, interval: str = '1d'):
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers)) # 중복 제거 (순서 유지)
 
+    # 캐시에 있는 종목은 그대로 쓰고, 없는 종목만 한 번에 다운로드
+    histories = {ticker: yf_cache.get(_history_cache_key(ticker, period, interval)) for ticker in tickers}
+    missing = [ticker for ticker, history in histories.items() if history is None]
+    errors = {} # 티커 -> 데이터를 받지 못한 이유
+    if missing:
+        try:
+            data = yf.download(
+                missing, period=period, interval=interval,
+                group_by='ticker', auto_adjust=True, threads=True, progress=False,
+            )
+            downloaded = _split_download(data, missing)
+        except Exception as e:
+            downloaded = {}
+            errors.update({ticker: f"다운로드 실패: {e}" for ticker in missing})
+        if downloaded is None:
+            # 열이 한 단계뿐이라 어느 종목 데이터인지 알 수 없으면 종목별로 다시 조회
+            downloaded = {}
+            for ticker in missing:
+                try:
+                    downloaded[ticker] = yf.Ticker(ticker).history(period=period, interval=interval)
+                except Exception as e:
+                    errors[ticker] = f"다운로드 실패: {e}"
+        ttl = history_ttl()
+        for ticker in missing:
+            history = downloaded.get(ticker)
+            if history is not None:
+                history = history.dropna(how='all')
+            if history is not None and len(history):
+                histories[ticker] = history
+                yf_cache.set(_history_cache_key(ticker, period, interval), history, ttl)
+            else:
+                errors.setdefault(ticker, "데이터가 없습니다. (티커나 기간을 확인하세요)")
+
+    comparison = compare_histories(histories, errors=errors) # 날짜를 맞춘 종가 표 + 수익률/변동성 비교
+    print(comparison)
+    return comparison
+
+@registry.tool(
+    "해당 종목의 Yahoo Finance 추천 정보를 반환합니다.",
+    ticker='Yahoo Finance 추천 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
+)
 def get_yf_stock_recommendations(ticker: str):
-    stock = yf.Ticker(ticker)
-    recommendations = stock.recommendations
-    recommendations_md = recommendations.to_markdown() # 데이터프레임을 마크다운 형식으로 변환
-    print(recommendations_md)
-    return recommendations_md
+    ticker = ticker.upper()
+    recommendations = yf_cache.get_or_fetch(
+        f"recommendations:{ticker}",
+        lambda: yf.Ticker(ticker).recommendations,
+        ttl=TTL_SECONDS["recommendations"],
+    )
+    recommendations_csv = compact_table(recommendations) # 최근 행만 CSV로 압축
+    print(recommendations_csv)
+    return recommendations_csv
 
 
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "get_current_time",
-            "description": "해당 타임존의 날짜와 시간을 반환합니다.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    'timezone': {
-                        'type': 'string',
-                        'description': '현재 날짜와 시간을 반환할 타임존을 입력하세요. (예: Asia/Seoul)',
-                    },
-                },
-                "required": ['timezone'],
-            },        
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_yf_stock_info",
-            "description": "해당 종목의 Yahoo Finance 정보를 반환합니다.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    'ticker': {
-                        'type': 'string',
-                        'description': 'Yahoo Finance 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
-                    },
-                },
-                "required": ['ticker'],
-            },        
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_yf_stock_history",
-            "description": "해당 종목의 Yahoo Finance 주가 정보를 반환합니다.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    'ticker': {
-                        'type': 'string',
-                        'description': 'Yahoo Finance 주가 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
-                    },
-                    'period': {
-                        'type': 'string',
-                        'description': '주가 정보를 조회할 기간을 입력하세요. (예: 1d, 5d, 1mo, 1y, 5y)',
-                    },
-                },
-                "required": ['ticker', 'period'],
-            },        
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_yf_stock_recommendations",
-            "description": "해당 종목의 Yahoo Finance 추천 정보를 반환합니다.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    'ticker': {
-                        'type': 'string',
-                        'description': 'Yahoo Finance 추천 정보를 반환할 종목의 티커를 입력하세요. (예: AAPL)',
-                    },
-                },
-                "required": ['ticker'],
-            },        
-        }
-    },
-]
 
+# OpenAI에 넘길 도구 스키마 목록 (레지스트리가 import 시 한 번 생성)
+tools = registry.schemas
 
 if __name__ == '__main__':
     # get_current_time('America/New_York')
@@ -113,4 +144,7 @@ if __name__ == '__main__':
     get_yf_stock_history('AAPL', '5d')
     print('----')
     get_yf_stock_recommendations('AAPL')
+    print('----')
+    get_yf_stock_history('AAPL', '5d') # 두 번째 호출은 캐시에서 바로 반환
+    print(yf_cache.stats())
   
\ No newline at end of file
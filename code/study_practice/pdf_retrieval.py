@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 질의응답용 검색 인덱스 (BM25 + 선택적 임베딩)
+문서 전체를 프롬프트에 붙여 넣는 대신, 질문과 관련 있는 청크 몇 개만 찾아서 넣습니다.
+
+- data/ 폴더의 .txt 파일을 작은 청크로 나누고
+- 한글은 글자 2-gram, 영문/숫자는 단어 단위로 토큰화해서
+- BM25 역색인을 numpy 배열로 저장합니다. (불러올 때는 메모리 매핑)
+- 새 파일이나 바뀐 파일만 다시 토큰화합니다.
+
+사용 예:
+    index = RetrievalIndex.build_or_update()
+    context = index.build_context("이 연구의 문제 인식은?", k=4)
+    answer = answer_question("이 연구의 문제 인식은?", client, index)
+"""
+
+import glob
+import hashlib
+import json
+import math
+import os
+import pickle
+import re
+from collections import Counter
+
+import numpy as np
+
+from pdf_summarizer import split_into_chunks
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+INDEX_DIR = os.path.join(DATA_DIR, ".cache", "pdf_index")
+
+CHUNK_TOKENS = 300        # 검색용 청크 크기 (토큰)
+BM25_K1 = 1.5
+BM25_B = 0.75
+EMBEDDING_MODEL = "text-embedding-3-small"
+EXCLUDED_FILES = {"GPT_summary.txt"}  # 요약 결과 파일은 검색 대상에서 제외
+
+_WORD = re.compile(r"[0-9A-Za-z]+|[가-힣]+")
+
+
+def tokenize(text: str) -> list:
+    """한글은 글자 2-gram, 영문/숫자는 소문자 단어로 토큰화"""
+    tokens = []
+    for word in _WORD.findall(text.lower()):
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def default_files(data_dir: str = DATA_DIR) -> list:
+    """검색할 .txt 파일 목록
+    같은 문서의 '_with_preprocessing' 버전이 있으면 머리말/꼬리말이 제거된 그 파일만 사용합니다.
+    """
+    files = sorted(glob.glob(os.path.join(data_dir, "*.txt")))
+    names = {os.path.basename(f) for f in files}
+    selected = []
+    for path in files:
+        name = os.path.basename(path)
+        stem = os.path.splitext(name)[0]
+        if name in EXCLUDED_FILES or f"{stem}_with_preprocessing.txt" in names:
+            continue
+        selected.append(path)
+    return selected
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class RetrievalIndex:
+    """디스크에 저장되는 BM25 역색인 (CSR 형태의 numpy 배열)"""
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self.vocab = {}       # 토큰 -> 토큰 번호
+        self.chunks = []      # [{"source", "chunk_no", "text"}]
+        self.term_offsets = np.zeros(1, dtype=np.int64)  # 토큰별 posting 시작 위치
+        self.post_docs = np.zeros(0, dtype=np.int32)     # posting: 청크 번호
+        self.post_tfs = np.zeros(0, dtype=np.float32)    # posting: 토큰 빈도
+        self.doc_lens = np.zeros(0, dtype=np.float32)
+        self.embeddings = None  # (청크 수, 차원) 또는 None
+
+    # ------------------------------------------------------------------ 생성/갱신
+    @classmethod
+    def build_or_update(cls, files: list = None, index_dir: str = INDEX_DIR,
+                        client=None, use_embeddings: bool = False):
+        """바뀐 파일만 다시 토큰화해서 인덱스를 만들고 저장한 뒤 불러옴"""
+        files = files or default_files()
+        os.makedirs(index_dir, exist_ok=True)
+        manifest_path = os.path.join(index_dir, "manifest.json")
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        digests = {path: _file_digest(path) for path in files}
+        sources = [os.path.basename(path) for path in files]
+        # 역색인은 파일별 토큰 캐시(해시) 목록이 같으면 그대로 씀 (이름만 바뀐 경우 등)
+        same_documents = manifest.get("documents") == [digests[path] for path in files]
+        embeddings_ready = not use_embeddings or manifest.get("embeddings")
+        if same_documents and manifest.get("sources") == sources and embeddings_ready:
+            return cls.load(index_dir)
+
+        # 파일별 토큰화 결과는 해시로 캐시 (새 파일/바뀐 파일만 처리)
+        documents = []
+        for path in files:
+            documents.append(cls._load_or_tokenize(path, digests[path], index_dir, client if use_embeddings else None))
+
+        if same_documents:
+            cls._write_chunks(documents, index_dir)
+            if not embeddings_ready:
+                cls._write_embeddings(documents, index_dir)
+            use_embeddings = use_embeddings or manifest.get("embeddings")
+        else:
+            cls._write_index(documents, index_dir, use_embeddings)
+        # 더 이상 쓰지 않는 파일별 캐시 정리
+        current = {f"doc_{digest}.pkl" for digest in digests.values()}
+        for cache_path in glob.glob(os.path.join(index_dir, "doc_*.pkl")):
+            if os.path.basename(cache_path) not in current:
+                os.remove(cache_path)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "sources": sources,
+                "documents": [digests[path] for path in files],
+                "embeddings": bool(use_embeddings),
+            }, f, ensure_ascii=False, indent=2)
+        return cls.load(index_dir)
+
+    @staticmethod
+    def _load_or_tokenize(path, digest, index_dir, client):
+        cache_path = os.path.join(index_dir, f"doc_{digest}.pkl")
+        document = None
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                document = pickle.load(f)
+        changed = document is None
+        if changed:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            chunks = split_into_chunks(text, CHUNK_TOKENS)
+            document = {
+                "chunks": chunks,
+                "term_counts": [Counter(tokenize(chunk)) for chunk in chunks],
+                "embeddings": None,
+            }
+            print(f"🔤 {os.path.basename(path)}: {len(chunks)}개 청크 토큰화")
+        if client is not None and document["embeddings"] is None:
+            document["embeddings"] = embed_texts(client, document["chunks"])
+            changed = True
+        # 캐시에서 그대로 읽은 경우는 다시 쓰지 않음
+        if changed:
+            with open(cache_path, "wb") as f:
+                pickle.dump(document, f)
+        # 파일 이름은 캐시(내용 해시)와 따로 붙임 (같은 내용의 파일 이름이 바뀔 수 있음)
+        return {**document, "source": os.path.basename(path)}
+
+    @staticmethod
+    def _write_index(documents, index_dir, use_embeddings):
+        vocab = {}
+        n_chunks = 0
+        postings = {}  # 토큰 번호 -> [(청크 번호, 빈도)]
+        doc_lens = []
+        for document in documents:
+            for counts in document["term_counts"]:
+                doc_id = n_chunks
+                n_chunks += 1
+                doc_lens.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    term_id = vocab.setdefault(term, len(vocab))
+                    postings.setdefault(term_id, []).append((doc_id, tf))
+
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for term_id in range(len(vocab)):
+            offsets[term_id + 1] = offsets[term_id] + len(postings[term_id])
+        post_docs = np.empty(offsets[-1], dtype=np.int32)
+        post_tfs = np.empty(offsets[-1], dtype=np.float32)
+        for term_id, entries in postings.items():
+            start = offsets[term_id]
+            post_docs[start:start + len(entries)] = [doc_id for doc_id, _ in entries]
+            post_tfs[start:start + len(entries)] = [tf for _, tf in entries]
+
+        np.save(os.path.join(index_dir, "term_offsets.npy"), offsets)
+        np.save(os.path.join(index_dir, "post_docs.npy"), post_docs)
+        np.save(os.path.join(index_dir, "post_tfs.npy"), post_tfs)
+        np.save(os.path.join(index_dir, "doc_lens.npy"), np.asarray(doc_lens, dtype=np.float32))
+        embeddings_path = os.path.join(index_dir, "embeddings.npy")
+        if use_embeddings:
+            RetrievalIndex._write_embeddings(documents, index_dir)
+        elif os.path.exists(embeddings_path):
+            os.remove(embeddings_path)
+        with open(os.path.join(index_dir, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(vocab, f, ensure_ascii=False)
+        RetrievalIndex._write_chunks(documents, index_dir)
+
+    @staticmethod
+    def _write_chunks(documents, index_dir):
+        chunks = [{"source": document["source"], "chunk_no": chunk_no, "text": text}
+                  for document in documents for chunk_no, text in enumerate(document["chunks"])]
+        with open(os.path.join(index_dir, "chunks.json"), "w", encoding="utf-8") as f:
+            json.dump(chunks, f, ensure_ascii=False)
+
+    @staticmethod
+    def _write_embeddings(documents, index_dir):
+        np.save(os.path.join(index_dir, "embeddings.npy"),
+                np.vstack([document["embeddings"] for document in documents]).astype(np.float32))
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR):
+        """저장된 인덱스 불러오기 (큰 배열은 메모리 매핑)"""
+        index = cls(index_dir)
+        with open(os.path.join(index_dir, "vocab.json"), "r", encoding="utf-8") as f:
+            index.vocab = json.load(f)
+        with open(os.path.join(index_dir, "chunks.json"), "r", encoding="utf-8") as f:
+            index.chunks = json.load(f)
+        index.term_offsets = np.load(os.path.join(index_dir, "term_offsets.npy"), mmap_mode="r")
+        index.post_docs = np.load(os.path.join(index_dir, "post_docs.npy"), mmap_mode="r")
+        index.post_tfs = np.load(os.path.join(index_dir, "post_tfs.npy"), mmap_mode="r")
+        index.doc_lens = np.load(os.path.join(index_dir, "doc_lens.npy"), mmap_mode="r")
+        embeddings_path = os.path.join(index_dir, "embeddings.npy")
+        if os.path.exists(embeddings_path):
+            index.embeddings = np.load(embeddings_path, mmap_mode="r")
+        return index
+
+    # ------------------------------------------------------------------ 검색
+    def bm25_scores(self, query: str) -> np.ndarray:
+        n_docs = len(self.chunks)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        if n_docs == 0:
+            return scores
+        avg_len = float(np.mean(self.doc_lens)) or 1.0
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = np.asarray(self.post_docs[start:end])
+            tfs = np.asarray(self.post_tfs[start:end])
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(self.doc_lens)[docs] / avg_len)
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+        return scores
+
+    def search(self, query: str, k: int = 4, client=None, candidates: int = 50) -> list:
+        """질문과 가장 관련 있는 청크 k개
+        임베딩이 저장되어 있고 client가 주어지면 BM25 상위 후보를 임베딩 유사도와 섞어서 다시 정렬합니다.
+        """
+        scores = self.bm25_scores(query)
+        top = np.argsort(-scores)[:candidates if self.embeddings is not None and client else k]
+        top = [int(i) for i in top if scores[i] > 0] or [int(i) for i in top]
+
+        if self.embeddings is not None and client is not None and top:
+            query_vec = embed_texts(client, [query])[0]
+            vectors = np.asarray(self.embeddings[top])
+            cosine = vectors @ query_vec / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vec) + 1e-9)
+            bm25 = scores[top] / (scores[top].max() or 1.0)
+            combined = 0.5 * bm25 + 0.5 * cosine
+            top = [top[i] for i in np.argsort(-combined)]
+
+        return [{**self.chunks[i], "score": float(scores[i])} for i in top[:k]]
+
+    def build_context(self, query: str, k: int = 4, client=None) -> str:
+        """프롬프트에 넣을 검색 결과 문자열"""
+        results = self.search(query, k=k, client=client)
+        return "\n\n".join(
+            f"[{r['source']} #{r['chunk_no'] + 1}]\n{r['text']}" for r in results
+        )
+
+
+def embed_texts(client, texts: list, batch_size: int = 64) -> np.ndarray:
+    """OpenAI 임베딩 (배치로 요청)"""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts[start:start + batch_size])
+        vectors.extend(item.embedding for item in response.data)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def answer_question(question: str, client, index: RetrievalIndex = None, k: int = 4,
+                    model: str = "gpt-4o-mini") -> str:
+    """검색한 청크만 넣어서 질문에 답변"""
+    index = index or RetrievalIndex.build_or_update()
+    context = index.build_context(question, k=k, client=client if index.embeddings is not None else None)
+    response = client.chat.completions.create(
+        model=model,
+        temperature=0.1,
+        messages=[
+            {"role": "system", "content": "너는 문서 내용을 바탕으로 답변하는 봇이다. "
+                                          "아래 검색된 문서 조각만 근거로 답하고, 근거가 없으면 모른다고 답하라. "
+                                          "답변 끝에 참고한 조각의 [파일명 #번호]를 적어라.\n\n"
+                                          f"=============== 검색된 문서 조각 ===============\n\n{context}"},
+            {"role": "user", "content": question},
+        ],
+    )
+    return response.choices[0].message.content
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+긴 문서 요약 (map-reduce)
+100쪽이 넘는 보고서를 프롬프트 하나에 모두 넣으면 컨텍스트 한도를 넘거나 매우 느립니다.
+1) 페이지/문단 경계에서 토큰 단위 청크로 나누고
+2) 청크별 부분 요약을 동시에(개수 제한) 만든 뒤
+3) 부분 요약을 단계적으로 합쳐 최종 요약 형식으로 정리합니다.
+
+사용 예:
+    summary = summarize_document(txt, client)
+"""
+
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# code/ 폴더의 공용 모듈 사용
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from conversation_memory import count_tokens
+
+PAGE_SEPARATOR = "\n------------------------------------\n"  # 전처리 텍스트의 페이지 구분선
+
+CHUNK_TOKENS = 3000   # 청크 하나의 최대 토큰 수
+REDUCE_TOKENS = 6000  # 부분 요약을 한 번에 합칠 때의 최대 토큰 수
+MAX_WORKERS = 4       # 동시에 보내는 요청 수
+
+FINAL_FORMAT = """
+    # 제목
+
+    ## 저자의 문제 인식 및 주장 (15문장 이내)
+
+    ## 저자 소개
+"""
+
+MAP_PROMPT = """너는 긴 글의 일부를 요약하는 봇이다. 아래는 전체 {total}개 부분 중 {index}번째 부분이다.
+이 부분에서 다음 내용을 찾아 한국어 글머리표로 간결하게 정리하라. 없는 항목은 생략하라.
+- 제목, 저자, 소속 등 서지 정보
+- 저자의 문제 인식
+- 저자의 주장과 근거, 주요 결과
+
+=============== 이하 텍스트 ===============
+
+{text}
+"""
+
+COMBINE_PROMPT = """너는 부분 요약을 합치는 봇이다. 아래 부분 요약들을 중복 없이 하나로 합쳐
+서지 정보, 문제 인식, 주장과 근거, 주요 결과를 한국어 글머리표로 정리하라.
+
+=============== 이하 부분 요약 ===============
+
+{text}
+"""
+
+FINAL_PROMPT = """
+    너는 다음 글을 요약하는 봇이다. 아래 글을 읽고, 저자의 문제 인식과 주장을 파악하고, 주요 내용을 요약하라.
+
+    작성해야 하는 포맷은 다음과 같다.
+    {format}
+
+    =============== 이하 텍스트 ===============
+
+    {text}
+"""
+
+
+def split_units(text: str) -> list:
+    """페이지 구분선이 있으면 페이지 단위로, 없으면 빈 줄(문단) 단위로 분리"""
+    if PAGE_SEPARATOR.strip() in text:
+        units = text.split(PAGE_SEPARATOR.strip())
+    else:
+        units = re.split(r"\n\s*\n", text)
+    return [unit.strip() for unit in units if unit.strip()]
+
+
+def split_into_chunks(text: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """페이지/문단 경계를 지키면서 max_tokens 이하의 청크로 묶기"""
+    chunks = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for unit in split_units(text):
+        unit_tokens = count_tokens(unit)
+        if unit_tokens > max_tokens:
+            # 한 페이지가 너무 길면 줄 단위로 다시 나눔
+            flush()
+            for line in unit.split("\n"):
+                line_tokens = count_tokens(line)
+                if current_tokens + line_tokens > max_tokens:
+                    flush()
+                current.append(line)
+                current_tokens += line_tokens
+            flush()
+            continue
+        if current_tokens + unit_tokens > max_tokens:
+            flush()
+        current.append(unit)
+        current_tokens += unit_tokens
+    flush()
+    return chunks
+
+
+def _complete(client, prompt: str, model: str, max_tokens: int = 800) -> str:
+    response = client.chat.completions.create(
+        model=model,
+        temperature=0.1,
+        max_tokens=max_tokens,
+        messages=[{"role": "system", "content": prompt}],
+    )
+    return response.choices[0].message.content
+
+
+def _map_parallel(func, items, max_workers):
+    """순서를 유지하면서 동시에 실행"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(func, items))
+
+
+def summarize_document(text: str, client, model: str = "gpt-4o-mini",
+                       chunk_tokens: int = CHUNK_TOKENS, reduce_tokens: int = REDUCE_TOKENS,
+                       max_workers: int = MAX_WORKERS, verbose: bool = True) -> str:
+    """긴 문서를 map-reduce 방식으로 요약해 '# 제목 / 저자의 문제 인식' 형식으로 반환"""
+    chunks = split_into_chunks(text, chunk_tokens)
+    if len(chunks) <= 1:
+        # 짧은 문서는 한 번에 요약
+        return _complete(client, FINAL_PROMPT.format(format=FINAL_FORMAT, text=text), model, max_tokens=1500)
+
+    if verbose:
+        print(f"📄 {len(chunks)}개 청크로 나누어 요약합니다. (동시 {max_workers}개)")
+
+    # map: 청크별 부분 요약
+    summaries = _map_parallel(
+        lambda item: _complete(client, MAP_PROMPT.format(index=item[0] + 1, total=len(chunks), text=item[1]), model),
+        list(enumerate(chunks)),
+        max_workers,
+    )
+
+    # reduce: 한 번에 넣을 수 있을 때까지 부분 요약을 묶어서 합침
+    level = 1
+    while count_tokens("\n\n".join(summaries)) > reduce_tokens and len(summaries) > 1:
+        groups = _group_by_tokens(summaries, reduce_tokens)
+        if len(groups) == len(summaries):
+            # 더 이상 묶이지 않으면 두 개씩 강제로 묶음
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        if verbose:
+            print(f"🔁 {level}단계 합치기: {len(summaries)}개 → {len(groups)}개")
+        summaries = _map_parallel(
+            lambda group: _complete(client, COMBINE_PROMPT.format(text="\n\n---\n\n".join(group)), model),
+            groups,
+            max_workers,
+        )
+        level += 1
+
+    return _complete(
+        client,
+        FINAL_PROMPT.format(format=FINAL_FORMAT, text="\n\n---\n\n".join(summaries)),
+        model,
+        max_tokens=1500,
+    )
+
+
+def _group_by_tokens(texts: list, max_tokens: int) -> list:
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
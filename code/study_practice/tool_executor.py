@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+도구 호출 동시 실행기
+모델이 한 번에 여러 도구를 요청하면 (예: AAPL, MSFT, NVDA 주가) 차례로 실행하지 않고
+제한된 스레드 풀에서 동시에 실행합니다.
+결과는 항상 원래 tool_call 순서대로 돌려줍니다.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "4"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "20"))
+
+
+def _run_tool(dispatch, tool_name, arguments_json, timing):
+    timing.append(time.perf_counter())
+    try:
+        arguments = json.loads(arguments_json or "{}")
+        return dispatch(tool_name, arguments)
+    finally:
+        timing.append(time.perf_counter())
+
+
+def execute_tool_calls(tool_calls, dispatch, timeout: float = TOOL_TIMEOUT,
+                       max_workers: int = MAX_WORKERS):
+    """tool_calls를 동시에 실행하고 원래 순서대로 결과를 반환
+
+    dispatch(tool_name, arguments) 는 실제 함수를 호출해 결과 문자열을 돌려주는 함수입니다.
+    각 호출은 제출한 시점부터 timeout초가 지나면 (아직 시작하지 못했더라도) 실패로 처리됩니다.
+    스레드 풀은 호출마다 따로 만들어 (최대 max_workers개) 멈춘 도구가 다른 세션의 도구 실행을 막지 않게 합니다.
+
+    반환값: [{"tool_call_id", "name", "content", "ok", "latency"}, ...]
+    """
+    if not tool_calls:
+        return []
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(tool_calls)),
+                                  thread_name_prefix="tool")
+    submitted = time.perf_counter()
+    deadline = submitted + timeout
+    jobs = []
+    for tool_call in tool_calls:
+        timing = []  # [시작 시각, 종료 시각]
+        future = executor.submit(
+            _run_tool, dispatch,
+            tool_call["function"]["name"], tool_call["function"]["arguments"], timing,
+        )
+        jobs.append((tool_call, future, timing))
+
+    results = [None] * len(jobs)
+    pending = {future: i for i, (_, future, _) in enumerate(jobs)}
+
+    try:
+        while pending:
+            done, _ = wait(list(pending), timeout=max(0.0, min(0.05, deadline - time.perf_counter())),
+                           return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+
+            for future in done:
+                i = pending.pop(future)
+                tool_call, _, timing = jobs[i]
+                latency = timing[-1] - timing[0] if len(timing) == 2 else now - submitted
+                try:
+                    content = future.result()
+                    results[i] = _result(tool_call, str(content), True, latency)
+                except Exception as e:
+                    results[i] = _result(tool_call, f"도구 실행 중 오류 발생: {e}", False, latency)
+
+            # 제출한 뒤 timeout을 넘긴 호출은 기다리지 않음 (아직 시작 전이면 실행 자체를 취소)
+            if now >= deadline:
+                for future, i in list(pending.items()):
+                    pending.pop(future)
+                    future.cancel()
+                    results[i] = _result(
+                        jobs[i][0], f"도구 실행 시간 초과 ({timeout:g}초)", False, now - submitted
+                    )
+    finally:
+        # 멈춘 호출이 있어도 기다리지 않음 (그 스레드는 이 풀에만 묶여 있다가 끝나면 정리됨)
+        executor.shutdown(wait=False)
+
+    return results
+
+
+def _result(tool_call, content, ok, latency):
+    name = tool_call["function"]["name"]
+    status = "✅" if ok else "❌"
+    print(f"{status} {name} 실행 {'완료' if ok else '실패'} ({latency * 1000:.0f}ms)")
+    return {
+        "tool_call_id": tool_call["id"],
+        "name": name,
+        "content": content,
+        "ok": ok,
+        "latency": latency,
+    }
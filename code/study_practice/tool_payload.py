@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+도구 결과 압축
+str(stock.info)나 DataFrame.to_markdown()을 그대로 프롬프트에 넣으면
+한 번의 조회로도 수만 토큰이 이후 모든 요청에 따라붙습니다.
+필요한 필드만 골라 반올림하고, 긴 주가 기록은 구간별 OHLC로 줄여
+크기 상한이 있는 짧은 JSON/CSV로 돌려줍니다.
+상한을 넘으면 문자열을 자르지 않고 봉/행/필드 수를 줄여 다시 만들므로 결과는 항상 올바른 JSON/CSV입니다.
+"""
+
+import json
+import math
+
+import numpy as np
+
+MAX_PAYLOAD_CHARS = 4000  # 도구 결과 하나의 최대 글자 수
+MAX_HISTORY_BARS = 30     # 주가 기록을 최대 몇 개의 봉으로 줄일지
+
+# 상담에 필요한 종목 정보 필드만 선택
+INFO_FIELDS = [
+    "symbol", "longName", "sector", "industry", "country", "currency", "exchange",
+    "currentPrice", "previousClose", "open", "dayLow", "dayHigh",
+    "fiftyTwoWeekLow", "fiftyTwoWeekHigh", "fiftyDayAverage", "twoHundredDayAverage",
+    "marketCap", "volume", "averageVolume",
+    "trailingPE", "forwardPE", "trailingEps", "forwardEps", "priceToBook",
+    "dividendYield", "payoutRatio", "beta",
+    "totalRevenue", "revenueGrowth", "earningsGrowth", "profitMargins", "returnOnEquity",
+    "debtToEquity", "freeCashflow",
+    "recommendationKey", "targetMeanPrice", "targetHighPrice", "targetLowPrice",
+    "numberOfAnalystOpinions", "fullTimeEmployees",
+]
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def round_number(value, digits: int = 4):
+    """숫자를 유효숫자 digits자리로 반올림 (큰 정수는 그대로)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+        return value
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    if isinstance(value, int) or value == 0 or abs(value) >= 10 ** digits:
+        return int(round(value)) if abs(value) >= 10 ** digits else value
+    return round(value, max(digits - 1 - int(math.floor(math.log10(abs(value)))), 0))
+
+
+def dumps(payload) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def fit_payload(candidates, max_chars: int = MAX_PAYLOAD_CHARS) -> str:
+    """큰 것부터 작은 것 순서의 후보 중 크기 상한 안에 드는 첫 번째를 JSON으로 반환
+
+    candidates는 필요할 때만 만들도록 제너레이터로 넘기면 됩니다.
+    어느 후보도 들어가지 않으면 오류 JSON을 반환합니다.
+    """
+    text = ""
+    for payload in candidates:
+        text = dumps(payload)
+        if len(text) <= max_chars:
+            return text
+    return dumps({"error": f"결과가 너무 커서 보낼 수 없습니다 ({len(text)}자)."})
+
+
+def _shrinking_bars(max_bars: int):
+    """봉 개수 후보: max_bars, 절반, 절반 ... 1"""
+    while max_bars > 1:
+        yield max_bars
+        max_bars //= 2
+    yield 1
+
+
+def compact_info(info: dict, max_chars: int = MAX_PAYLOAD_CHARS) -> str:
+    """종목 정보에서 주요 필드만 골라 JSON으로 반환"""
+    info = info or {}
+    selected = {}
+    for key in INFO_FIELDS:
+        value = round_number(info.get(key))
+        if isinstance(value, str) and len(value) > 200:
+            value = value[:200] + "..."
+        if value is not None:
+            selected[key] = value
+    # 넘치면 덜 중요한 (목록 뒤쪽) 필드부터 뺌
+    keys = list(selected)
+    return fit_payload(({key: selected[key] for key in keys[:count]}
+                        for count in range(len(keys), 0, -1)), max_chars)
+
+
+def resample_ohlc(history, max_bars: int = MAX_HISTORY_BARS):
+    """주가 기록을 최대 max_bars개의 구간 OHLC 봉으로 묶음"""
+    columns = [col for col in OHLCV_COLUMNS if col in history.columns]
+    history = history[columns]
+    if len(history) <= max_bars:
+        return history
+
+    bucket = np.arange(len(history)) * max_bars // len(history)
+    grouped = history.groupby(bucket)
+    aggregations = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    bars = grouped.agg({col: aggregations[col] for col in columns})
+    bars.index = grouped.apply(lambda frame: frame.index[-1])  # 구간의 마지막 날짜
+    return bars
+
+
+def summarize_history(history) -> dict:
+    """기간 전체 요약 (시작/끝 종가, 수익률, 최고/최저가, 변동성)"""
+    close = history["Close"]
+    daily_returns = close.pct_change().dropna()
+    return {
+        "start": str(history.index[0].date()) if hasattr(history.index[0], "date") else str(history.index[0]),
+        "end": str(history.index[-1].date()) if hasattr(history.index[-1], "date") else str(history.index[-1]),
+        "rows": len(history),
+        "first_close": round_number(close.iloc[0]),
+        "last_close": round_number(close.iloc[-1]),
+        "return_pct": round_number((close.iloc[-1] / close.iloc[0] - 1) * 100, 3),
+        "high": round_number(history["High"].max()) if "High" in history else None,
+        "low": round_number(history["Low"].min()) if "Low" in history else None,
+        "volatility_pct": round_number(daily_returns.std() * 100, 3) if len(daily_returns) > 1 else None,
+    }
+
+
+def compact_history(history, max_bars: int = MAX_HISTORY_BARS, max_chars: int = MAX_PAYLOAD_CHARS) -> str:
+    """주가 기록을 요약 + 압축된 CSV로 반환"""
+    if history is None or len(history) == 0:
+        return json.dumps({"error": "주가 데이터가 없습니다."}, ensure_ascii=False)
+
+    intraday = _is_intraday(history)
+    summary = summarize_history(history)
+
+    def candidates():
+        # 봉 수를 절반씩 줄이다가, 그래도 넘치면 요약만 보냄
+        for bars_count in _shrinking_bars(max_bars):
+            bars = _format_bars(resample_ohlc(history, bars_count), intraday)
+            payload = {"summary": summary, "bars": bars.to_csv()}
+            if len(history) > len(bars):
+                payload["note"] = f"{len(history)}개 데이터를 {len(bars)}개 구간 봉으로 묶었습니다."
+            yield payload
+        yield {"summary": summary, "note": "결과가 길어 구간 봉은 생략했습니다."}
+
+    return fit_payload(candidates(), max_chars)
+
+
+def _format_bars(bars, intraday: bool):
+    bars = bars.copy()
+    for col in ["Open", "High", "Low", "Close"]:
+        if col in bars:
+            bars[col] = bars[col].round(2)
+    if "Volume" in bars:
+        bars["Volume"] = bars["Volume"].astype("int64")
+    if hasattr(bars.index, "strftime"):
+        bars.index = bars.index.strftime("%Y-%m-%d %H:%M" if intraday else "%Y-%m-%d")
+    bars.index.name = "Date"
+    return bars
+
+
+def compact_table(frame, max_rows: int = 12, max_chars: int = MAX_PAYLOAD_CHARS) -> str:
+    """추천 정보 같은 작은 표를 최근 max_rows행만 CSV로 반환"""
+    if frame is None or len(frame) == 0:
+        return json.dumps({"error": "데이터가 없습니다."}, ensure_ascii=False)
+    # 넘치면 행을 줄이고, 한 행도 넘치면 뒤쪽 열부터 뺌 (CSV를 중간에서 자르지 않음)
+    for rows in range(min(max_rows, len(frame)), 0, -1):
+        text = frame.head(rows).to_csv(index=False)
+        if len(text) <= max_chars:
+            return text
+    for columns in range(len(frame.columns) - 1, 0, -1):
+        text = frame.iloc[:1, :columns].to_csv(index=False)
+        if len(text) <= max_chars:
+            return text
+    return json.dumps({"error": "결과가 너무 커서 보낼 수 없습니다."}, ensure_ascii=False)
+
+
+def _is_intraday(history) -> bool:
+    index = history.index
+    return len(index) > 1 and hasattr(index, "normalize") and (index != index.normalize()).any()
+
+
+def compare_histories(histories: dict, max_bars: int = MAX_HISTORY_BARS,
+                      max_chars: int = MAX_PAYLOAD_CHARS, errors: dict = None) -> str:
+    """여러 종목의 주가 기록을 날짜를 맞춘 종가 표 + 비교 지표로 반환
+
+    histories: {티커: 주가 DataFrame}
+    errors: {티커: 데이터를 받지 못한 이유} (종목별 오류를 결과에 함께 알려줌)
+    """
+    import pandas as pd
+
+    closes = {
+        ticker: frame["Close"].dropna()
+        for ticker, frame in histories.items()
+        if frame is not None and len(frame) and "Close" in frame
+    }
+    missing = sorted(set(histories) - set(closes))
+    errors = {ticker: errors[ticker] for ticker in missing if ticker in (errors or {})}
+    if not closes:
+        return json.dumps({"error": "주가 데이터가 없습니다.", "missing": missing, "errors": errors}, ensure_ascii=False)
+
+    for ticker, close in closes.items():
+        # 시간대가 다른 인덱스도 같은 날짜끼리 맞추도록 날짜만 남김
+        if getattr(close.index, "tz", None) is not None:
+            closes[ticker] = close.tz_localize(None)
+    aligned = pd.DataFrame(closes).sort_index().ffill().dropna()
+    if aligned.empty:
+        return json.dumps({"error": "겹치는 거래일이 없습니다.", "missing": missing, "errors": errors}, ensure_ascii=False)
+
+    returns = aligned.pct_change().dropna()
+    running_max = aligned.cummax()
+    metrics = {}
+    for ticker in aligned.columns:
+        metrics[ticker] = {
+            "first_close": round_number(aligned[ticker].iloc[0]),
+            "last_close": round_number(aligned[ticker].iloc[-1]),
+            "return_pct": round_number((aligned[ticker].iloc[-1] / aligned[ticker].iloc[0] - 1) * 100, 3),
+            "volatility_pct": round_number(returns[ticker].std() * 100, 3) if len(returns) > 1 else None,
+            "max_drawdown_pct": round_number(((aligned[ticker] / running_max[ticker]) - 1).min() * 100, 3),
+        }
+
+    intraday = _is_intraday(aligned)
+    payload = {
+        "start": str(aligned.index[0])[:10],
+        "end": str(aligned.index[-1])[:10],
+        "metrics": metrics,
+        "ranking_by_return": sorted(metrics, key=lambda t: metrics[t]["return_pct"] or 0, reverse=True),
+    }
+    if missing:
+        payload["missing"] = missing
+    if errors:
+        payload["errors"] = errors
+    correlation = returns.corr().round(2).to_dict() if len(aligned.columns) > 1 and len(returns) > 2 else None
+
+    def candidates():
+        # 종가 표의 구간 수를 절반씩 줄이다가, 그래도 넘치면 상관계수, 마지막으로 표를 뺌
+        for bars_count in _shrinking_bars(max_bars):
+            full = {**payload, "close": _close_table(aligned, bars_count, intraday)}
+            if correlation is not None:
+                full["return_correlation"] = correlation
+            yield full
+        yield {**payload, "close": _close_table(aligned, 1, intraday)}
+        yield payload
+        yield {"start": payload["start"], "end": payload["end"],
+               "return_pct": {ticker: values["return_pct"] for ticker, values in metrics.items()}}
+
+    return fit_payload(candidates(), max_chars)
+
+
+def _close_table(aligned, max_bars: int, intraday: bool) -> str:
+    """구간 종가 (각 구간의 마지막 값) CSV"""
+    if len(aligned) > max_bars:
+        bucket = np.arange(len(aligned)) * max_bars // len(aligned)
+        table = aligned.groupby(bucket).last()
+        table.index = aligned.groupby(bucket).apply(lambda frame: frame.index[-1])
+    else:
+        table = aligned
+    table = table.round(2)
+    if hasattr(table.index, "strftime"):
+        table.index = table.index.strftime("%Y-%m-%d %H:%M" if intraday else "%Y-%m-%d")
+    table.index.name = "Date"
+    return table.to_csv()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+도구 레지스트리
+함수에 @registry.tool(...)만 붙이면
+- 함수 시그니처와 타입 힌트로 OpenAI 도구 JSON 스키마를 만들고 (import 시 한 번)
+- 호출 전에 인자를 검사하고
+- 이름으로 바로 찾아 실행하며 (if/elif 없이)
+- 도구별 호출 수, 실행 시간 분포, 오류율을 기록합니다.
+
+사용 예:
+    registry = ToolRegistry()
+
+    @registry.tool("해당 종목의 정보를 반환합니다.", ticker="종목 티커 (예: AAPL)")
+    def get_stock_info(ticker: str):
+        ...
+
+    @registry.tool("현재 시간을 반환합니다.", required=("timezone",), timezone="타임존")
+    def get_current_time(timezone: str = "Asia/Seoul"):  # 기본값이 있어도 스키마에서는 필수
+        ...
+
+    client.chat.completions.create(..., tools=registry.schemas)
+    result = registry.call("get_stock_info", {"ticker": "AAPL"})
+"""
+
+import inspect
+import threading
+import time
+import typing
+
+# 실행 시간 분포를 기록할 구간 (초)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, float("inf"))
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    dict: "object",
+}
+_PYTHON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+}
+
+
+class ToolArgumentError(ValueError):
+    """도구 인자가 스키마와 맞지 않을 때 발생"""
+
+
+def type_to_schema(annotation) -> dict:
+    """파이썬 타입 힌트를 JSON 스키마로 변환"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        # Optional[X] 는 X로 취급
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return type_to_schema(args[0]) if args else {"type": "string"}
+    if origin is typing.Literal:
+        values = list(typing.get_args(annotation))
+        return {"type": _JSON_TYPES.get(type(values[0]), "string"), "enum": values}
+    if origin in (list, tuple):
+        args = typing.get_args(annotation)
+        schema = {"type": "array"}
+        if args:
+            schema["items"] = type_to_schema(args[0])
+        return schema
+    if origin is dict:
+        return {"type": "object"}
+    if annotation in _JSON_TYPES:
+        schema = {"type": _JSON_TYPES[annotation]}
+        if annotation in (list, tuple):
+            schema["items"] = {"type": "string"}
+        return schema
+    return {"type": "string"}
+
+
+class ToolStats:
+    """도구 하나의 호출 통계"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+
+    def record(self, latency: float, ok: bool):
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.total_latency += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.histogram[i] += 1
+                break
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "avg_latency": self.total_latency / self.calls if self.calls else 0.0,
+            "latency_histogram": {
+                (f"<={bound}s" if bound != float("inf") else f">{LATENCY_BUCKETS[-2]}s"): count
+                for bound, count in zip(LATENCY_BUCKETS, self.histogram)
+            },
+        }
+
+
+class ToolRegistry:
+    """도구 함수 등록, 스키마 생성, 인자 검사, 실행, 통계를 한 곳에서 관리"""
+
+    def __init__(self):
+        self._tools = {}  # 이름 -> (함수, 스키마)
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.schemas = []  # chat.completions.create(tools=...)에 그대로 넘기는 목록
+
+    def tool(self, description: str, name: str = None, required=(), **param_descriptions):
+        """함수를 도구로 등록하는 데코레이터 (param_descriptions: 인자별 설명)
+
+        기본값이 없는 인자는 자동으로 필수가 되고, 기본값이 있어도 모델이 꼭 채워야 하는 인자는
+        required=("timezone",)처럼 지정합니다.
+        """
+        def decorator(func):
+            tool_name = name or func.__name__
+            schema = self._build_schema(func, tool_name, description, param_descriptions, required)
+            self._tools[tool_name] = (func, schema)
+            self._stats[tool_name] = ToolStats()
+            self.schemas.append(schema)
+            return func
+        return decorator
+
+    def call(self, tool_name: str, arguments: dict):
+        """인자를 검사한 뒤 도구를 실행하고 통계를 기록"""
+        entry = self._tools.get(tool_name)
+        if entry is None:
+            raise ToolArgumentError(f"알 수 없는 도구: {tool_name}")
+        func, schema = entry
+
+        started = time.perf_counter()
+        ok = False
+        try:
+            self.validate(schema, arguments)
+            result = func(**arguments)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._stats[tool_name].record(time.perf_counter() - started, ok)
+
+    def stats(self) -> dict:
+        """도구별 호출 수, 평균 실행 시간, 오류율, 실행 시간 분포"""
+        with self._lock:
+            return {tool_name: stats.as_dict() for tool_name, stats in self._stats.items()}
+
+    def __contains__(self, tool_name):
+        return tool_name in self._tools
+
+    @staticmethod
+    def validate(schema: dict, arguments: dict):
+        """필수 인자 누락, 모르는 인자, 타입 불일치 확인"""
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError("도구 인자는 JSON 객체여야 합니다.")
+        parameters = schema["function"]["parameters"]
+        properties = parameters["properties"]
+
+        missing = [key for key in parameters["required"] if key not in arguments]
+        if missing:
+            raise ToolArgumentError(f"필수 인자 누락: {', '.join(missing)}")
+        unknown = [key for key in arguments if key not in properties]
+        if unknown:
+            raise ToolArgumentError(f"알 수 없는 인자: {', '.join(unknown)}")
+
+        for key, value in arguments.items():
+            prop = properties[key]
+            expected = _PYTHON_TYPES.get(prop.get("type"))
+            if expected and (not isinstance(value, expected)
+                             or (prop["type"] in ("integer", "number") and isinstance(value, bool))):
+                raise ToolArgumentError(f"'{key}' 인자는 {prop['type']} 타입이어야 합니다.")
+            if "enum" in prop and value not in prop["enum"]:
+                raise ToolArgumentError(f"'{key}' 인자는 {prop['enum']} 중 하나여야 합니다.")
+            item_types = _PYTHON_TYPES.get(prop.get("items", {}).get("type"))
+            if prop.get("type") == "array" and item_types and not all(isinstance(item, item_types) for item in value):
+                raise ToolArgumentError(f"'{key}' 인자의 항목은 {prop['items']['type']} 타입이어야 합니다.")
+
+    @staticmethod
+    def _build_schema(func, tool_name, description, param_descriptions, always_required=()):
+        hints = typing.get_type_hints(func)
+        parameters = inspect.signature(func).parameters
+        unknown = [key for key in always_required if key not in parameters]
+        if unknown:
+            raise TypeError(f"{tool_name}: required에 없는 인자가 있습니다: {', '.join(unknown)}")
+        properties = {}
+        required = []
+        for param in parameters.values():
+            prop = type_to_schema(hints.get(param.name, str))
+            if param.name in param_descriptions:
+                prop["description"] = param_descriptions[param.name]
+            properties[param.name] = prop
+            if param.default is inspect.Parameter.empty or param.name in always_required:
+                required.append(param.name)
+        return {
+            "type": "function",
+            "function": {
+                "name": tool_name,
+                "description": description,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": required,
+                },
+            },
+        }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+yfinance 조회 결과 캐시
+같은 종목을 반복해서 물어볼 때 Yahoo 서버를 다시 호출하지 않도록
+메모리(LRU) + SQLite 디스크 캐시를 함께 사용합니다.
+디스크 캐시는 Streamlit을 재시작해도 유지됩니다.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+
+CACHE_DIR = os.getenv(
+    "YF_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", ".cache"),
+)
+DEFAULT_DB_PATH = os.path.join(CACHE_DIR, "yf_cache.sqlite")
+
+# 데이터 종류별 캐시 유지 시간 (초)
+TTL_SECONDS = {
+    "info": 5 * 60,                   # 종목 정보: 5분
+    "history_intraday": 5 * 60,       # 장중 주가: 5분 (마지막 봉이 계속 바뀜)
+    "recommendations": 6 * 60 * 60,   # 애널리스트 추천: 6시간
+}
+
+MARKET_TZ = pytz.timezone("America/New_York")
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+
+def is_market_open(now: datetime = None) -> bool:
+    """미국 정규장이 열려 있는지 확인 (공휴일은 고려하지 않음)"""
+    now = now or datetime.now(MARKET_TZ)
+    if now.weekday() >= 5:
+        return False
+    open_time = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    close_time = now.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    return open_time <= now < close_time
+
+
+def seconds_until_next_open(now: datetime = None) -> float:
+    """다음 정규장 개장까지 남은 시간 (초)"""
+    now = now or datetime.now(MARKET_TZ)
+    next_open = now.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1], second=0, microsecond=0)
+    if now >= next_open:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return (next_open - now).total_seconds()
+
+
+def history_ttl(now: datetime = None) -> float:
+    """일봉 주가의 캐시 시간
+    장중에는 오늘 봉이 계속 바뀌므로 짧게, 장이 닫혀 있으면 다음 개장까지 유지합니다.
+    """
+    if is_market_open(now):
+        return TTL_SECONDS["history_intraday"]
+    return seconds_until_next_open(now)
+
+
+class PersistentTTLCache:
+    """메모리 LRU + SQLite 디스크 캐시
+
+    - 메모리에는 최근에 쓴 max_memory_entries개만 유지 (LRU)
+    - 디스크에는 max_disk_entries개까지 저장하고, 오래 안 쓴 것부터 삭제
+    - 항목마다 만료 시각을 저장하므로 데이터 종류별로 TTL을 다르게 줄 수 있음
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_memory_entries: int = 128,
+                 max_disk_entries: int = 2048):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " value BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        except Exception as e:
+            # 디스크를 쓸 수 없는 환경이면 메모리 캐시만 사용
+            print(f"⚠️ 디스크 캐시를 사용할 수 없습니다: {e}")
+            self._conn = None
+
+    def get(self, key: str):
+        """캐시에서 값을 찾음. 없거나 만료되었으면 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT expires_at, value FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    expires_at, blob = row
+                    if expires_at > now:
+                        value = pickle.loads(blob)
+                        self._conn.execute(
+                            "UPDATE cache SET last_access = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        self._remember(key, expires_at, value)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value, ttl: float):
+        """값을 ttl초 동안 저장"""
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn is None:
+                return
+            try:
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                print(f"⚠️ 캐시 저장 실패 ({key}): {e}")
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires_at, last_access, value) VALUES (?, ?, ?, ?)",
+                (key, expires_at, now, blob),
+            )
+            self._evict_disk(now)
+            self._conn.commit()
+
+    def get_or_fetch(self, key: str, fetch, ttl: float):
+        """캐시에 있으면 바로 반환하고, 없으면 fetch()로 가져와서 저장"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = fetch()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> dict:
+        """히트/미스 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            disk_entries = 0
+            if self._conn is not None:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache")
+                self._conn.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+
+# gpt_functions에서 함께 쓰는 캐시 (프로세스당 하나)
+yf_cache = PersistentTTLCache()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 호출 대시보드
+llm_telemetry.py가 남긴 호출 기록으로 페이지/프롬프트 유형별
+지연 시간 백분위, 첫 토큰 시간, 오류율, 토큰 사용량, 프롬프트 캐시 비율과 예상 비용을 보여줍니다.
+
+사용 예:
+    streamlit run code/telemetry_dashboard.py
+"""
+
+import plotly.express as px
+import streamlit as st
+
+from llm_telemetry import load_records, sink, summarize
+
+st.set_page_config(
+    page_title="LLM 호출 대시보드",
+    page_icon="📡",
+    layout="wide"
+)
+
+st.title("📡 LLM 호출 대시보드")
+st.markdown("---")
+
+df = load_records()
+if df.empty:
+    st.info("아직 기록된 LLM 호출이 없습니다. 다른 페이지에서 AI를 사용하면 여기에 표시됩니다.")
+    st.caption(f"기록 위치: {sink.path}")
+    st.stop()
+
+# 사이드바 - 필터
+with st.sidebar:
+    st.header("🔍 필터")
+    pages = st.multiselect("페이지", sorted(df["page"].dropna().unique()))
+    models = st.multiselect("모델", sorted(df["model"].dropna().unique()))
+    recent = len(df)
+    if len(df) > 50:
+        recent = st.slider("최근 호출 수", 50, len(df), len(df), step=50)
+    if st.button("🔄 새로고침"):
+        st.rerun()
+    st.caption(f"기록 위치: {sink.path}")
+
+df = df.sort_values("ts").tail(recent)
+if pages:
+    df = df[df["page"].isin(pages)]
+if models:
+    df = df[df["model"].isin(models)]
+if df.empty:
+    st.warning("조건에 맞는 기록이 없습니다.")
+    st.stop()
+
+# 전체 요약
+col1, col2, col3, col4, col5, col6 = st.columns(6)
+col1.metric("호출 수", f"{len(df):,}")
+col2.metric("지연 시간 p50", f"{df['latency_s'].quantile(0.5):.2f}초")
+col3.metric("지연 시간 p95", f"{df['latency_s'].quantile(0.95):.2f}초")
+col4.metric("오류율", f"{df['status'].eq('error').mean() * 100:.1f}%")
+prompt_tokens = df["prompt_tokens"].fillna(0).sum()
+col5.metric("캐시된 입력", f"{df['cached_tokens'].fillna(0).sum() / prompt_tokens * 100:.1f}%" if prompt_tokens else "-")
+col6.metric("예상 비용", f"${df['cost_usd'].fillna(0).sum():.4f}")
+
+# 페이지/프롬프트 유형별 백분위
+st.subheader("📊 페이지 · 프롬프트 유형별")
+table = summarize(df)
+st.dataframe(
+    table.rename(columns={
+        "page": "페이지", "prompt_type": "프롬프트 유형", "calls": "호출",
+        "error_rate": "오류율", "latency_p50": "지연 p50(초)", "latency_p95": "지연 p95(초)",
+        "ttft_p50": "첫 토큰 p50(초)", "ttft_p95": "첫 토큰 p95(초)",
+        "queue_wait_p95": "대기 p95(초)", "retries": "재시도",
+        "prompt_tokens": "입력 토큰", "completion_tokens": "출력 토큰", "cached_ratio": "캐시 비율",
+        "cost_usd": "비용(USD)",
+    }).style.format({
+        "오류율": "{:.1%}", "지연 p50(초)": "{:.2f}", "지연 p95(초)": "{:.2f}",
+        "첫 토큰 p50(초)": "{:.2f}", "첫 토큰 p95(초)": "{:.2f}",
+        "대기 p95(초)": "{:.2f}", "재시도": "{:,.0f}",
+        "입력 토큰": "{:,.0f}", "출력 토큰": "{:,.0f}", "캐시 비율": "{:.1%}", "비용(USD)": "{:.4f}",
+    }, na_rep="-"),
+    use_container_width=True,
+    hide_index=True,
+)
+
+col_left, col_right = st.columns(2)
+with col_left:
+    st.subheader("⏱️ 지연 시간 분포")
+    chart_df = df.assign(group=df["page"] + " / " + df["prompt_type"].fillna("-"))
+    fig = px.box(chart_df, x="group", y="latency_s", points="outliers",
+                 labels={"group": "페이지 / 프롬프트 유형", "latency_s": "지연 시간(초)"})
+    st.plotly_chart(fig, use_container_width=True)
+
+with col_right:
+    st.subheader("📈 시간별 지연 시간")
+    fig = px.scatter(df, x="ts", y="latency_s", color="page", symbol="status",
+                     labels={"ts": "시각", "latency_s": "지연 시간(초)", "page": "페이지"})
+    st.plotly_chart(fig, use_container_width=True)
+
+# 모델별 토큰/비용
+st.subheader("💰 모델별 토큰 · 비용")
+by_model = summarize(df, by=("model",))
+st.dataframe(
+    by_model[["model", "calls", "prompt_tokens", "completion_tokens", "cost_usd"]].rename(columns={
+        "model": "모델", "calls": "호출", "prompt_tokens": "입력 토큰",
+        "completion_tokens": "출력 토큰", "cost_usd": "비용(USD)",
+    }),
+    use_container_width=True,
+    hide_index=True,
+)
+
+# 등록된 시스템 프롬프트별 캐시 비율 (prompt_registry에 등록한 프롬프트만)
+if "prompt_key" in df and df["prompt_key"].notna().any():
+    st.subheader("🧊 시스템 프롬프트별 캐시")
+    st.caption("같은 시스템 프롬프트로 시작하는 요청은 앞부분(1024토큰 이상)이 캐시되어 더 싸고 빠릅니다.")
+    by_prompt = summarize(df, by=("prompt_key",))
+    st.dataframe(
+        by_prompt[["prompt_key", "calls", "prompt_tokens", "cached_ratio", "latency_p50"]].rename(columns={
+            "prompt_key": "프롬프트(이름@해시)", "calls": "호출", "prompt_tokens": "입력 토큰",
+            "cached_ratio": "캐시 비율", "latency_p50": "지연 p50(초)",
+        }).style.format({"입력 토큰": "{:,.0f}", "캐시 비율": "{:.1%}", "지연 p50(초)": "{:.2f}"}, na_rep="-"),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+# 최근 실패
+errors = df[df["status"] == "error"]
+if not errors.empty:
+    st.subheader("❌ 최근 실패한 호출")
+    st.dataframe(errors.sort_values("ts", ascending=False).head(20)[
+        ["ts", "page", "prompt_type", "model", "error", "latency_s"]
+    ], use_container_width=True, hide_index=True)
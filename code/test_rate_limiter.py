@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rate_limiter 대기열 순서 테스트 (API 키 없이 실행)
+
+사용 예:
+    cd code && python -m unittest test_rate_limiter
+"""
+
+import unittest
+from collections import deque
+
+from rate_limiter import QueueTimeout, RequestScheduler, _Ticket
+
+
+class FairQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = RequestScheduler(rpm=60, tpm=100000, max_queue_wait=0.05)
+
+    def enqueue(self, session_id):
+        ticket = _Ticket(session_id, 1)
+        self.scheduler._queues.setdefault(session_id, deque()).append(ticket)
+        return ticket
+
+    def order(self):
+        return list(self.scheduler._queues)
+
+    def test_grant_sends_session_to_back(self):
+        a1, b1, a2 = self.enqueue("A"), self.enqueue("B"), self.enqueue("A")
+        with self.scheduler._cond:
+            self.scheduler._grant(a1)
+        self.assertEqual(self.order(), ["B", "A"])
+        self.assertIs(self.scheduler._head(), b1)
+        with self.scheduler._cond:
+            self.scheduler._grant(b1)
+        self.assertEqual(self.order(), ["A"])
+        self.assertIs(self.scheduler._head(), a2)
+
+    def test_cancel_keeps_session_position(self):
+        a1 = self.enqueue("A")
+        self.enqueue("B")
+        self.enqueue("C")
+        c2 = self.enqueue("C")
+        with self.scheduler._cond:
+            self.scheduler._cancel(c2)
+        self.assertEqual(self.order(), ["A", "B", "C"])
+        self.assertIs(self.scheduler._head(), a1)
+
+    def test_cancel_last_request_removes_session(self):
+        self.enqueue("A")
+        b1 = self.enqueue("B")
+        with self.scheduler._cond:
+            self.scheduler._cancel(b1)
+        self.assertEqual(self.order(), ["A"])
+
+    def test_queue_timeout_keeps_session_position(self):
+        # 모든 요청이 멈춘 상태에서 C의 두 번째 요청이 시간 초과로 빠져도 차례는 그대로
+        a1 = self.enqueue("A")
+        self.enqueue("B")
+        self.enqueue("C")
+        self.scheduler.pause(60)
+        with self.assertRaises(QueueTimeout):
+            self.scheduler.acquire("C")
+        self.assertEqual(self.order(), ["A", "B", "C"])
+        self.assertEqual([len(queue) for queue in self.scheduler._queues.values()], [1, 1, 1])
+        self.assertIs(self.scheduler._head(), a1)
+
+
+if __name__ == "__main__":
+    unittest.main()
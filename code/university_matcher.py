@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+대학교 추천 엔진
+학생 한 명, 대학교 하나씩 과목별로 나눗셈을 반복하는 대신
+대학교 입시 기준을 NumPy 행렬로 만들어
+(학생 수 × 대학교 수 × 과목 수) 달성도를 한 번에 계산합니다.
+계산해 둔 행렬로 학생별 추천 순위, 학년 전체 추천표, 일괄 내보내기를 만듭니다.
+
+사용 예:
+    matcher = UniversityMatcher(university_standards).fit(df)
+    matcher.ranked("S001")        # 한 학생의 대학교별 합격 가능성
+    matcher.best_matches(top_n=3)  # 전체 학생 추천표
+"""
+
+import numpy as np
+import pandas as pd
+
+SUBJECT_COLUMNS = ["math_score", "korean_score", "english_score", "science_score", "social_score"]
+SUBJECT_NAMES = ["수학", "국어", "영어", "과학", "사회"]
+
+# 총점 달성도(%) 기준 합격 가능성 등급
+GRADE_THRESHOLDS = [95, 85, 75, 65]
+GRADE_LABELS = ["🟢 매우 높음", "🟡 높음", "🟠 보통", "🔴 낮음", "⚫ 매우 낮음"]
+GRADE_DESCRIPTIONS = [
+    "합격 가능성이 매우 높습니다. 안정권으로 분류됩니다.",
+    "합격 가능성이 높습니다. 노력하면 충분히 합격할 수 있습니다.",
+    "합격 가능성이 보통입니다. 추가 학습이 필요합니다.",
+    "합격 가능성이 낮습니다. 대폭적인 성적 향상이 필요합니다.",
+    "합격 가능성이 매우 낮습니다. 다른 대학교를 고려해보세요.",
+]
+REACHABLE_GRADE = 2  # 이 등급(보통)까지를 지원 가능한 대학교로 봄
+
+
+def grade_index(total_ratio):
+    """총점 달성도 → 등급 번호 (0: 매우 높음 ~ 4: 매우 낮음), 배열도 그대로 처리"""
+    total_ratio = np.asarray(total_ratio)
+    conditions = [total_ratio >= threshold for threshold in GRADE_THRESHOLDS]
+    return np.select(conditions, range(len(GRADE_THRESHOLDS)), default=len(GRADE_THRESHOLDS))
+
+
+class UniversityMatcher:
+    """학생 × 대학교 달성도 행렬을 미리 계산해 두는 추천 엔진"""
+
+    def __init__(self, standards: dict, subjects: list = SUBJECT_COLUMNS):
+        self.subjects = list(subjects)
+        self.universities = list(standards)
+        self.descriptions = [standards[name].get("description", "") for name in self.universities]
+        # (대학교 수, 과목 수) 기준 점수 행렬과 총점 기준
+        self.standard_matrix = np.array(
+            [[standards[name][col] for col in self.subjects] for name in self.universities], dtype=float
+        )
+        self.standard_totals = np.array(
+            [standards[name].get("total_score", row.sum()) for name, row in zip(self.universities, self.standard_matrix)],
+            dtype=float,
+        )
+
+        self.student_ids = []
+        self.names = []
+        self._positions = {}
+        self.scores = np.zeros((0, len(self.subjects)))
+        self.achievement = np.zeros((0, len(self.universities), len(self.subjects)))
+        self.total_ratio = np.zeros((0, len(self.universities)))
+        self.grades = np.zeros((0, len(self.universities)), dtype=int)
+
+    def fit(self, df: pd.DataFrame, id_column: str = "student_id", name_column: str = "name"):
+        """학생 표 전체에 대해 달성도와 등급을 한 번에 계산"""
+        self.student_ids = df[id_column].tolist() if id_column in df else list(range(len(df)))
+        self.names = df[name_column].astype(str).tolist() if name_column in df else [str(i) for i in self.student_ids]
+        self._positions = {student_id: pos for pos, student_id in enumerate(self.student_ids)}
+
+        self.scores = df[self.subjects].to_numpy(dtype=float)                  # (학생, 과목)
+        # (학생, 대학교, 과목) 과목별 달성도 %
+        self.achievement = self.scores[:, None, :] / self.standard_matrix[None, :, :] * 100
+        # (학생, 대학교) 총점 달성도 %
+        self.total_ratio = self.scores.sum(axis=1)[:, None] / self.standard_totals[None, :] * 100
+        self.grades = grade_index(self.total_ratio)
+        return self
+
+    def position(self, student_id) -> int:
+        """학번 → 행렬의 행 번호"""
+        return self._positions[student_id]
+
+    def ranked(self, student_id, reachable_only: bool = False) -> pd.DataFrame:
+        """한 학생의 대학교별 달성도와 합격 가능성 (입시 기준이 높은 대학교부터)"""
+        pos = self.position(student_id)
+        achievement = self.achievement[pos]
+        weakest = achievement.argmin(axis=1)
+        table = pd.DataFrame({
+            "대학교": self.universities,
+            "총점 기준": self.standard_totals.astype(int),
+            "총점 달성도(%)": self.total_ratio[pos].round(1),
+            "합격 가능성": [GRADE_LABELS[g] for g in self.grades[pos]],
+            "가장 부족한 과목": [SUBJECT_NAMES[i] if i < len(SUBJECT_NAMES) else self.subjects[i] for i in weakest],
+            "부족 과목 달성도(%)": achievement[np.arange(len(self.universities)), weakest].round(1),
+        })
+        if reachable_only:
+            table = table[self.grades[pos] <= REACHABLE_GRADE]
+        return table.sort_values(["총점 기준", "총점 달성도(%)"], ascending=False).reset_index(drop=True)
+
+    def best_matches(self, top_n: int = 3) -> pd.DataFrame:
+        """전체 학생의 추천 대학교 (지원 가능한 대학교 중 입시 기준이 높은 순서로 top_n개)"""
+        reachable = self.grades <= REACHABLE_GRADE
+        # 지원 가능한 대학교만 남기고 입시 기준이 높은 순으로 정렬 (동점이면 달성도가 높은 쪽)
+        priority = np.where(reachable, self.standard_totals[None, :] * 1000 + self.total_ratio, -np.inf)
+        order = np.argsort(-priority, axis=1)[:, :top_n]
+        rows = np.arange(len(self.student_ids))[:, None]
+        chosen_reachable = reachable[rows, order]
+        chosen_ratio = self.total_ratio[rows, order]
+        chosen_grade = self.grades[rows, order]
+
+        table = pd.DataFrame({
+            "학번": self.student_ids,
+            "이름": self.names,
+            "총점": self.scores.sum(axis=1).astype(int),
+            "지원 가능 대학 수": reachable.sum(axis=1),
+        })
+        universities = np.array(self.universities, dtype=object)
+        labels = np.array(GRADE_LABELS, dtype=object)
+        for rank in range(order.shape[1]):
+            text = (universities[order[:, rank]] + " (" + labels[chosen_grade[:, rank]] + ", "
+                    + np.char.mod("%.1f", chosen_ratio[:, rank]).astype(object) + "%)")
+            table[f"추천 {rank + 1}"] = np.where(chosen_reachable[:, rank], text, "-")
+        return table
+
+    def export_frame(self) -> pd.DataFrame:
+        """학생 × 대학교 전체 결과를 한 행씩 펼친 표 (일괄 내보내기용)"""
+        n_students, n_universities = self.total_ratio.shape
+        table = pd.DataFrame({
+            "학번": np.repeat(self.student_ids, n_universities),
+            "이름": np.repeat(self.names, n_universities),
+            "대학교": np.tile(self.universities, n_students),
+            "총점 달성도(%)": self.total_ratio.reshape(-1).round(1),
+            "합격 가능성": np.array(GRADE_LABELS, dtype=object)[self.grades.reshape(-1)],
+        })
+        for i, subject in enumerate(self.subjects):
+            name = SUBJECT_NAMES[i] if i < len(SUBJECT_NAMES) else subject
+            table[f"{name} 달성도(%)"] = self.achievement[:, :, i].reshape(-1).round(1)
+        return table